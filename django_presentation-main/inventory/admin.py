@@ -1,5 +1,12 @@
-from django.contrib import admin
+import io
 
+from django import forms
+from django.contrib import admin, messages
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+
+from inventory.importers import CatalogImporter
 from inventory.permissions import assign_store_manager_permissions
 from .models import Category, Product, Store
 from django.contrib.auth.models import Group, Permission
@@ -12,11 +19,51 @@ class CategoryAdmin(admin.ModelAdmin):
     list_display = ('name', 'description')
     search_fields = ('name',)
 
+class CatalogImportForm(forms.Form):
+    file = forms.FileField(help_text="CSV with name, category[, description, store, price, quantity] columns.")
+
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ('name', 'category',)
     list_filter = ('category',)
     search_fields = ('name', 'category__name')
+    change_list_template = 'admin/inventory/product/change_list.html'
+
+    def get_urls(self):
+        return [
+            path('import/', self.admin_site.admin_view(self.import_catalog), name='inventory_product_import'),
+        ] + super().get_urls()
+
+    def import_catalog(self, request):
+        if not self.has_add_permission(request):
+            return redirect('admin:inventory_product_changelist')
+
+        form = CatalogImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            # Read the upload as a text stream instead of loading it whole
+            file = io.TextIOWrapper(form.cleaned_data['file'].file, encoding='utf-8-sig', newline='')
+            try:
+                result = CatalogImporter().run(file)
+            except forms.ValidationError as exc:
+                form.add_error('file', exc)
+            except UnicodeDecodeError:
+                form.add_error('file', 'The file must be UTF-8 encoded CSV.')
+            else:
+                messages.success(request, (
+                    f"Imported {result.imported} of {result.rows} rows "
+                    f"({result.rows_per_second:,.0f} rows/s), rejected {len(result.rejected)}."
+                ))
+                for line, errors in result.rejected[:50]:
+                    messages.warning(request, f"Line {line}: {'; '.join(errors)}")
+                return redirect('admin:inventory_product_changelist')
+
+        return TemplateResponse(request, 'admin/inventory/product/import_catalog.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'form': form,
+            'title': 'Import catalog',
+        })
 
 @admin.register(Store)
 class StoreAdmin(admin.ModelAdmin):
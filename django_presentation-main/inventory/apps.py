@@ -1,4 +1,7 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+from inventory_manage.db import configure_sqlite
 
 
 
@@ -10,3 +13,6 @@ class MyAppConfig(AppConfig):
     def ready(self):
         # Automatically assign the permissions when the app is ready
         import inventory.signals
+
+        # Tune SQLite connections for concurrent use (see inventory_manage.db)
+        connection_created.connect(configure_sqlite, dispatch_uid='inventory_manage.db.configure_sqlite')
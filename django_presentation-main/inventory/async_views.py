@@ -0,0 +1,48 @@
+# inventory/async_views.py
+"""
+Async versions of the catalog list views, routed in place of the sync ones
+when ASYNC_VIEWS is set (see inventory.urls).
+
+The catalog version and the page count are read from the cache, and the
+count from the database on a miss, without holding a thread. The page
+rows stay a lazy queryset: like CatalogCacheMixin, they are only read when
+the cached fragment has to be rendered again, which happens on the sync
+side together with the rest of the template.
+"""
+from asgiref.sync import sync_to_async
+from django.core.paginator import Paginator
+from django.shortcuts import render
+from django.views import View
+
+from inventory.catalog import acatalog_count, aget_catalog_version, get_timeout
+from inventory.views import CategoryListView, ProductListView
+
+
+class AsyncCatalogListView(View):
+    """Async counterpart of a CatalogCacheMixin ListView, set as ``list_view``."""
+    list_view = None
+
+    async def get(self, request, *args, **kwargs):
+        view = self.list_view
+        queryset = view.queryset.all()
+        version = await aget_catalog_version()
+        paginator = Paginator(queryset, view.paginate_by)
+        paginator.count = await acatalog_count(queryset, version)
+        page = paginator.get_page(request.GET.get('page'))
+        return await sync_to_async(render)(request, view.template_name, {
+            'paginator': paginator,
+            'page_obj': page,
+            'is_paginated': page.has_other_pages(),
+            'object_list': page.object_list,
+            view.context_object_name: page.object_list,
+            'catalog_version': version,
+            'catalog_cache_timeout': get_timeout(),
+        })
+
+
+class AsyncCategoryListView(AsyncCatalogListView):
+    list_view = CategoryListView
+
+
+class AsyncProductListView(AsyncCatalogListView):
+    list_view = ProductListView
@@ -0,0 +1,113 @@
+# inventory/catalog.py
+import uuid
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+# Longest a per-process cache may keep catalog pages: bump_catalog_version()
+# only reaches the process that saw the change, so the others would keep
+# serving stale pages until the entry expires
+LOCAL_CACHE_MAX_TIMEOUT = 5
+
+
+def get_timeout():
+    timeout = getattr(settings, 'CATALOG_CACHE_TIMEOUT', 3600)
+    if isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache):
+        return min(timeout, LOCAL_CACHE_MAX_TIMEOUT)
+    return timeout
+
+
+def get_catalog_version():
+    """
+    Return the token that every cached catalog entry is keyed by.
+
+    Bumping it (see bump_catalog_version) orphans every entry at once, so
+    nothing has to be deleted. Only processes sharing the cache see the
+    bump; with a per-process cache, entries expire quickly instead (see
+    get_timeout).
+    """
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # A lost token must never resurrect old entries, so start from a
+        # fresh one rather than a counter.
+        cache.add(CATALOG_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+async def aget_catalog_version():
+    """Async get_catalog_version()."""
+    version = await cache.aget(CATALOG_VERSION_KEY)
+    if version is None:
+        await cache.aadd(CATALOG_VERSION_KEY, uuid.uuid4().hex, None)
+        version = await cache.aget(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog page; called when a Category or Product changes."""
+    cache.set(CATALOG_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def count_cache_key(version, count_key):
+    return f'catalog:{version}:count:{count_key}'
+
+
+async def acatalog_count(queryset, version):
+    """The cached row count of ``queryset`` (see CatalogPaginator), read asynchronously."""
+    key = count_cache_key(version, queryset.model._meta.label_lower)
+    count = await cache.aget(key)
+    if count is None:
+        count = await queryset.acount()
+        await cache.aset(key, count, get_timeout())
+    return count
+
+
+class CatalogPaginator(Paginator):
+    """
+    Paginator whose row count is cached under the catalog version, so a
+    page served from the fragment cache does not have to count the table.
+    """
+
+    def __init__(self, *args, count_key, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_key = count_key
+
+    @cached_property
+    def count(self):
+        key = count_cache_key(get_catalog_version(), self.count_key)
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(key, count, get_timeout())
+        return count
+
+
+class CatalogCacheMixin:
+    """
+    For catalog ListViews whose rendered rows are cached with
+    ``{% cache catalog_cache_timeout <name> catalog_version page_obj.number %}``.
+
+    On a cache hit the page costs no catalog query: the count comes from
+    the cache and the lazy page queryset is only evaluated inside the
+    fragment when it has to be rendered.
+    """
+    paginate_by = 50
+    paginator_class = CatalogPaginator
+
+    def get_paginator(self, queryset, per_page, orphans=0, allow_empty_first_page=True, **kwargs):
+        return self.paginator_class(
+            queryset, per_page, orphans=orphans, allow_empty_first_page=allow_empty_first_page,
+            count_key=queryset.model._meta.label_lower, **kwargs,
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['catalog_version'] = get_catalog_version()
+        context['catalog_cache_timeout'] = get_timeout()
+        return context
@@ -0,0 +1,165 @@
+# inventory/fanout.py
+import threading
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .ledger import record_opening
+from .models import Product, Store, StoreProduct
+
+
+def get_chunk_size(chunk_size=None):
+    return chunk_size or getattr(settings, 'STORE_PRODUCT_FANOUT_CHUNK_SIZE', 500)
+
+
+def get_default_price():
+    return Decimal(str(getattr(settings, 'STORE_PRODUCT_DEFAULT_PRICE', '10.00')))
+
+
+def get_default_quantity():
+    return getattr(settings, 'STORE_PRODUCT_DEFAULT_QUANTITY', 100)
+
+
+def _store_templates(stores=None):
+    """
+    Yield (store_id, price, quantity) for every store, reading only the
+    columns we need so thousands of stores never become model instances.
+    """
+    if stores is None:
+        stores = Store.objects.all()
+    default_price = get_default_price()
+    default_quantity = get_default_quantity()
+
+    rows = stores.order_by('id').values_list('id', 'default_price', 'default_quantity')
+    for store_id, price, quantity in rows.iterator(chunk_size=2000):
+        yield (
+            store_id,
+            default_price if price is None else price,
+            default_quantity if quantity is None else quantity,
+        )
+
+
+def _bulk_write(objects, chunk_size):
+    """
+    Write StoreProduct instances from the ``objects`` iterable in chunks.
+
+    ignore_conflicts keeps the fan-out idempotent: re-running it (or racing
+    the backfill command) never trips the (store, product) unique constraint.
+    """
+    written = 0
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= chunk_size:
+            StoreProduct.objects.bulk_create(batch, batch_size=chunk_size, ignore_conflicts=True)
+            written += len(batch)
+            batch = []
+    if batch:
+        StoreProduct.objects.bulk_create(batch, batch_size=chunk_size, ignore_conflicts=True)
+        written += len(batch)
+    return written
+
+
+def fan_out_product(product, stores=None, chunk_size=None):
+    """
+    Create a StoreProduct for ``product`` in every store (or in ``stores``)
+    using each store's price/quantity template.
+
+    Rows are written with chunked bulk_create inside a single transaction,
+    so either every store gets the product or none does, and their stock is
+    logged as opening movements. Returns the number of rows sent to the
+    database.
+    """
+    chunk_size = get_chunk_size(chunk_size)
+    product_id = getattr(product, 'pk', product)
+    objects = (
+        StoreProduct(store_id=store_id, product_id=product_id, price=price, quantity=quantity)
+        for store_id, price, quantity in _store_templates(stores)
+    )
+    with transaction.atomic():
+        written = _bulk_write(objects, chunk_size)
+        created = StoreProduct.objects.filter(product_id=product_id)
+        if stores is not None:
+            created = created.filter(store__in=stores)
+        record_opening(created)
+    return written
+
+
+def _run_in_background(product_id, chunk_size):
+    try:
+        fan_out_product(product_id, chunk_size=chunk_size)
+    finally:
+        # The worker thread owns its own connection; don't leak it.
+        connection.close()
+
+
+def schedule_fan_out(product, chunk_size=None):
+    """
+    Fan ``product`` out to every store on a background thread.
+
+    The thread is started only once the surrounding transaction commits so
+    it can see the product row. Returns immediately; missing rows left by a
+    crashed worker are picked up by ``manage.py backfill_store_products``.
+    """
+    product_id = getattr(product, 'pk', product)
+
+    def start():
+        worker = threading.Thread(
+            target=_run_in_background,
+            args=(product_id, chunk_size),
+            name=f'store-product-fanout-{product_id}',
+            daemon=True,
+        )
+        worker.start()
+
+    transaction.on_commit(start)
+
+
+def fan_out(product, chunk_size=None, background=None):
+    """
+    Entry point used by the views: honours STORE_PRODUCT_FANOUT_BACKGROUND
+    unless ``background`` is given explicitly.
+    """
+    if background is None:
+        background = getattr(settings, 'STORE_PRODUCT_FANOUT_BACKGROUND', False)
+    if background:
+        schedule_fan_out(product, chunk_size=chunk_size)
+        return None
+    return fan_out_product(product, chunk_size=chunk_size)
+
+
+def backfill_missing(stores=None, chunk_size=None):
+    """
+    Create the StoreProduct rows missing for every (store, product) pair,
+    e.g. after new stores have been added. Each store is filled in its own
+    transaction so a long backfill can be interrupted and simply re-run.
+    Returns the number of rows sent to the database.
+    """
+    chunk_size = get_chunk_size(chunk_size)
+    written = 0
+
+    # Materialise the (small) store list up front so no cursor stays open
+    # across the per-store transactions below.
+    for store_id, price, quantity in list(_store_templates(stores)):
+        existing = StoreProduct.objects.filter(store_id=store_id).values('product_id')
+        missing = list(
+            Product.objects.exclude(pk__in=existing)
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+        with transaction.atomic():
+            for start in range(0, len(missing), chunk_size):
+                product_ids = missing[start:start + chunk_size]
+                written += _bulk_write(
+                    (
+                        StoreProduct(store_id=store_id, product_id=product_id, price=price, quantity=quantity)
+                        for product_id in product_ids
+                    ),
+                    chunk_size,
+                )
+                # Only the rows just inserted: an opening movement timestamped
+                # now would rewrite the past stock of rows older than the ledger
+                record_opening(StoreProduct.objects.filter(store_id=store_id, product_id__in=product_ids))
+
+    return written
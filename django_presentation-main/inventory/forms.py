@@ -2,6 +2,20 @@ import re
 from django import forms
 from .models import Product
 
+
+def validate_product_name(name):
+    """Shared product name rules, also applied to catalog imports."""
+    # Check if the name is not empty
+    if not name or len(name) < 1:
+        raise forms.ValidationError('Name is required')
+
+    # Check if the name contains only letters and spaces
+    if not re.match(r'^[a-zA-Z\s]+$', name):
+        raise forms.ValidationError('Name must contain only letters and spaces')
+
+    return name
+
+
 class ProductCreateForm(forms.ModelForm):
     class Meta:
         model = Product
@@ -9,17 +23,7 @@ class ProductCreateForm(forms.ModelForm):
 
     # Custom validation for name to ensure only letters and spaces
     def clean_name(self):
-        name = self.cleaned_data.get('name')
-
-        # Check if the name is not empty
-        if not name or len(name) < 1:
-            raise forms.ValidationError('Name is required')
-
-        # Check if the name contains only letters and spaces
-        if not re.match(r'^[a-zA-Z\s]+$', name):
-            raise forms.ValidationError('Name must contain only letters and spaces')
-
-        return name
+        return validate_product_name(self.cleaned_data.get('name'))
 
 
 
@@ -30,14 +34,4 @@ class ProductUpdateForm(forms.ModelForm):
 
     # Reusing the same validations from the create form
     def clean_name(self):
-        name = self.cleaned_data.get('name')
-
-        # Check if the name is not empty
-        if not name or len(name) < 1:
-            raise forms.ValidationError('Name is required')
-
-        # Check if the name contains only letters and spaces
-        if not re.match(r'^[a-zA-Z\s]+$', name):
-            raise forms.ValidationError('Name must contain only letters and spaces')
-
-        return name
+        return validate_product_name(self.cleaned_data.get('name'))
@@ -0,0 +1,251 @@
+# inventory/importers.py
+import csv
+import time
+from decimal import Decimal, InvalidOperation
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from .catalog import bump_catalog_version
+from .forms import validate_product_name
+from .models import Category, Product, StockMovement, Store, StoreProduct
+from .search import get_backend
+
+REQUIRED_COLUMNS = {'name', 'category'}
+OPTIONAL_COLUMNS = {'description', 'store', 'price', 'quantity'}
+
+
+class ImportResult:
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.rejected = []  # (line number, [errors])
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+
+class CatalogImporter:
+    """
+    Stream a CSV of products, categories and per-store price/quantity into
+    the catalog.
+
+    Columns: ``name`` and ``category`` are required; ``description`` is
+    optional; ``store`` (a store id), ``price`` and ``quantity`` add or
+    update that store's StoreProduct. Rows are validated and written
+    ``chunk_size`` at a time, each chunk in its own transaction: categories
+    come from one lookup map, products are matched on (name, category) and
+    store products are upserted with bulk_create(update_conflicts=True).
+    Invalid rows are reported, not written.
+    """
+
+    def __init__(self, chunk_size=1000):
+        self.chunk_size = chunk_size
+
+    def run(self, file):
+        result = ImportResult()
+        started = time.perf_counter()
+
+        reader = csv.DictReader(file)
+        columns = set(reader.fieldnames or [])
+        missing = REQUIRED_COLUMNS - columns
+        if missing:
+            raise forms.ValidationError(
+                'Missing CSV columns: %s' % ', '.join(sorted(missing))
+            )
+
+        # Lookup maps loaded once for the whole file
+        self.categories = dict(Category.objects.values_list('name', 'pk'))
+        self.store_ids = set(Store.objects.values_list('pk', flat=True))
+
+        chunk = []  # (line number, cleaned row)
+        try:
+            # Line 1 is the header
+            for line, row in enumerate(reader, start=2):
+                result.rows += 1
+                cleaned = self.clean_row(row)
+                if isinstance(cleaned, list):
+                    result.rejected.append((line, cleaned))
+                    continue
+                chunk.append((line, cleaned))
+                if len(chunk) >= self.chunk_size:
+                    self.import_lines(chunk, result)
+                    chunk = []
+            if chunk:
+                self.import_lines(chunk, result)
+        finally:
+            if result.imported:
+                # Bulk writes send no model signals, so invalidate the
+                # cached catalog pages for every committed chunk here
+                bump_catalog_version()
+
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    def clean_row(self, row):
+        """Return the cleaned row as a dict, or the list of its errors."""
+        errors = []
+        name = (row.get('name') or '').strip()
+        try:
+            validate_product_name(name)
+            # The model field checks a ModelForm would run (max_length)
+            Product._meta.get_field('name').run_validators(name)
+        except ValidationError as exc:
+            errors.extend(exc.messages)
+
+        category = (row.get('category') or '').strip()
+        if not category:
+            errors.append('Category is required')
+        elif len(category) > Category._meta.get_field('name').max_length:
+            errors.append('Category name is too long')
+
+        cleaned = {
+            'name': name,
+            'category': category,
+            'description': (row.get('description') or '').strip() or None,
+            'store': None,
+        }
+        if cleaned['description'] is not None:
+            try:
+                Product._meta.get_field('description').run_validators(cleaned['description'])
+            except ValidationError as exc:
+                errors.extend(exc.messages)
+
+        store = (row.get('store') or '').strip()
+        if store:
+            try:
+                cleaned['store'] = int(store)
+                if cleaned['store'] not in self.store_ids:
+                    errors.append(f'Unknown store {store}')
+            except ValueError:
+                errors.append(f'Invalid store id {store}')
+            try:
+                cleaned['price'] = Decimal(row.get('price') or '')
+                if cleaned['price'] < 0:
+                    errors.append('Price cannot be negative')
+                StoreProduct._meta.get_field('price').run_validators(cleaned['price'])
+            except InvalidOperation:
+                errors.append('A valid price is required with a store')
+            except ValidationError as exc:
+                errors.extend(exc.messages)
+            try:
+                cleaned['quantity'] = int(row.get('quantity') or 0)
+                if cleaned['quantity'] < 0:
+                    errors.append('Stock cannot be negative')
+            except ValueError:
+                errors.append('Invalid quantity')
+
+        return errors or cleaned
+
+    def import_lines(self, chunk, result):
+        """Import one chunk of (line, row); if the database refuses it, reject its lines."""
+        categories = dict(self.categories)
+        try:
+            result.imported += self.import_chunk([row for _, row in chunk])
+        except DatabaseError as exc:
+            # The chunk's transaction was rolled back, categories it added too
+            self.categories = categories
+            error = f'Not saved, the database refused its chunk: {exc}'
+            result.rejected.extend((line, [error]) for line, _ in chunk)
+
+    def import_chunk(self, rows):
+        with transaction.atomic():
+            self.ensure_categories({row['category'] for row in rows})
+            products = self.upsert_products(rows)
+            self.upsert_store_products(rows, products)
+            # Bulk writes send no signals to keep the search index in sync
+            get_backend().index(products.values())
+        return len(rows)
+
+    def ensure_categories(self, names):
+        missing = [name for name in names if name not in self.categories]
+        if not missing:
+            return
+        Category.objects.bulk_create(
+            [Category(name=name) for name in missing], ignore_conflicts=True
+        )
+        self.categories.update(
+            Category.objects.filter(name__in=missing).values_list('name', 'pk')
+        )
+
+    def upsert_products(self, rows):
+        """Create or update the chunk's products; return {(name, category_id): product_id}."""
+        wanted = {}
+        for row in rows:
+            key = (row['name'], self.categories[row['category']])
+            # The last description given for a product wins
+            if key not in wanted or row['description'] is not None:
+                wanted[key] = row['description']
+
+        existing = {}
+        for pk, name, category_id, description in Product.objects.filter(
+            name__in={name for name, _ in wanted}
+        ).values_list('pk', 'name', 'category_id', 'description'):
+            existing.setdefault((name, category_id), (pk, description))
+
+        new = [
+            Product(name=name, category_id=category_id, description=description)
+            for (name, category_id), description in wanted.items()
+            if (name, category_id) not in existing
+        ]
+        Product.objects.bulk_create(new)
+
+        # bulk_update() does not fill in auto_now fields
+        now = timezone.now()
+        changed = [
+            Product(pk=pk, description=wanted[key], updated=now)
+            for key, (pk, description) in existing.items()
+            if key in wanted and wanted[key] is not None and wanted[key] != description
+        ]
+        Product.objects.bulk_update(changed, ['description', 'updated'])
+
+        products = {key: pk for key, (pk, _) in existing.items()}
+        products.update({(product.name, product.category_id): product.pk for product in new})
+        return products
+
+    def upsert_store_products(self, rows, products):
+        """Upsert the chunk's store products and log each quantity change as an import movement."""
+        # One row per (store, product); a later line overrides an earlier one
+        store_products = {}
+        for row in rows:
+            if row['store'] is None:
+                continue
+            product_id = products[(row['name'], self.categories[row['category']])]
+            store_products[(row['store'], product_id)] = StoreProduct(
+                store_id=row['store'],
+                product_id=product_id,
+                price=row['price'],
+                quantity=row['quantity'],
+            )
+        if not store_products:
+            return
+
+        # Quantities before the upsert, to log what changed
+        before = {
+            (store_id, product_id): quantity
+            for store_id, product_id, quantity in StoreProduct.objects.filter(
+                store_id__in={store_id for store_id, _ in store_products},
+                product_id__in={product_id for _, product_id in store_products},
+            ).values_list('store_id', 'product_id', 'quantity')
+        }
+        StoreProduct.objects.bulk_create(
+            store_products.values(),
+            update_conflicts=True,
+            unique_fields=['store', 'product'],
+            update_fields=['price', 'quantity', 'updated'],
+        )
+        # bulk_create sets the primary keys of upserted rows on SQLite and PostgreSQL
+        StockMovement.objects.bulk_create(
+            StockMovement(
+                store_product_id=store_product.pk,
+                store_id=store_id,
+                change=store_product.quantity - before.get((store_id, product_id), 0),
+                reason=StockMovement.IMPORT,
+            )
+            for (store_id, product_id), store_product in store_products.items()
+            if store_product.quantity != before.get((store_id, product_id), 0)
+        )
@@ -0,0 +1,142 @@
+# inventory/ledger.py
+import datetime
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Now
+from django.utils import timezone
+
+from .models import StockMovement, StockSnapshot, StoreProduct
+
+
+def movement(store_product, change, reason, user=None):
+    """An unsaved StockMovement of ``change`` units for ``store_product``."""
+    return StockMovement(
+        store_product_id=store_product.pk,
+        store_id=store_product.store_id,
+        change=change,
+        reason=reason,
+        user=user,
+    )
+
+
+def record_movement(store_product, change, reason, user=None):
+    stock_movement = movement(store_product, change, reason, user=user)
+    stock_movement.save()
+    return stock_movement
+
+
+def record_opening(store_products):
+    """
+    Log the stock of newly created ``store_products`` (a queryset) as their
+    opening movement. Rows that already have movements are skipped, so
+    this is safe to call after an idempotent bulk insert.
+    """
+    rows = store_products.filter(movements__isnull=True).values_list('pk', 'store_id', 'quantity')
+    StockMovement.objects.bulk_create(
+        (
+            StockMovement(store_product_id=pk, store_id=store_id, change=quantity, reason=StockMovement.OPENING)
+            for pk, store_id, quantity in rows.iterator(chunk_size=2000)
+            if quantity
+        ),
+        batch_size=1000,
+    )
+
+
+def adjust_quantity(store_product, quantity, user=None):
+    """
+    Set the stock of ``store_product`` to ``quantity`` and log the
+    difference as a restock or an adjustment.
+
+    The difference is applied with an F() expression rather than by
+    writing ``quantity`` back, so a dispatch recorded in the meantime is
+    never overwritten.
+    """
+    with transaction.atomic():
+        current = (
+            StoreProduct.objects.select_for_update()
+            .values_list('quantity', flat=True)
+            .get(pk=store_product.pk)
+        )
+        change = quantity - current
+        if change:
+            StoreProduct.objects.filter(pk=store_product.pk).update(quantity=F('quantity') + change, updated=Now())
+            reason = StockMovement.RESTOCK if change > 0 else StockMovement.ADJUSTMENT
+            record_movement(store_product, change, reason, user=user)
+    store_product.quantity = quantity
+    return change
+
+
+def start_of_today():
+    return timezone.make_aware(datetime.datetime.combine(timezone.localdate(), datetime.time.min))
+
+
+def take_snapshot(store, taken_at=None):
+    """
+    Snapshot the stock of every product of ``store`` at ``taken_at``
+    (the start of today by default) and return the number of rows written.
+
+    Quantities are the live ones minus the movements since ``taken_at``,
+    read in a single statement so they are consistent with each other.
+    Taking the same snapshot twice is a no-op.
+    """
+    taken_at = taken_at or start_of_today()
+    since = (
+        StockMovement.objects.filter(store_product=OuterRef('pk'), timestamp__gt=taken_at)
+        .order_by()
+        .values('store_product')
+        .annotate(total=Sum('change'))
+        .values('total')
+    )
+    rows = (
+        StoreProduct.objects.filter(store=store)
+        .annotate(since=Coalesce(Subquery(since), 0))
+        .values_list('pk', 'quantity', 'since')
+    )
+    snapshots = [
+        StockSnapshot(store=store, store_product_id=pk, taken_at=taken_at, quantity=quantity - since)
+        for pk, quantity, since in rows
+    ]
+    StockSnapshot.objects.bulk_create(snapshots, batch_size=1000, ignore_conflicts=True)
+    return len(snapshots)
+
+
+def _changes(store, after, until=None):
+    movements = StockMovement.objects.filter(store=store, timestamp__gt=after)
+    if until is not None:
+        movements = movements.filter(timestamp__lte=until)
+    return movements.values('store_product').annotate(total=Sum('change')).values_list('store_product', 'total')
+
+
+def stock_as_of(store, when):
+    """
+    Return {store_product_id: quantity} for ``store`` at the moment ``when``.
+
+    Starts from whichever is closer in time, the latest snapshot taken
+    before ``when`` or the live quantities, and replays only the movements
+    between the two, so the cost is bounded by the snapshot interval
+    rather than by the age of the ledger.
+    """
+    now = timezone.now()
+    if when >= now:
+        return dict(StoreProduct.objects.filter(store=store).values_list('pk', 'quantity'))
+
+    taken_at = (
+        StockSnapshot.objects.filter(store=store, taken_at__lte=when)
+        .order_by('-taken_at')
+        .values_list('taken_at', flat=True)
+        .first()
+    )
+    if taken_at is not None and when - taken_at <= now - when:
+        quantities = dict(
+            StockSnapshot.objects.filter(store=store, taken_at=taken_at).values_list('store_product_id', 'quantity')
+        )
+        for store_product_id, change in _changes(store, taken_at, when):
+            quantities[store_product_id] = quantities.get(store_product_id, 0) + change
+        return quantities
+
+    quantities = dict(StoreProduct.objects.filter(store=store).values_list('pk', 'quantity'))
+    for store_product_id, change in _changes(store, when):
+        if store_product_id in quantities:
+            quantities[store_product_id] -= change
+    return quantities
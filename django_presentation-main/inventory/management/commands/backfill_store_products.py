@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from inventory.fanout import backfill_missing
+from inventory.models import Store
+
+
+class Command(BaseCommand):
+    help = "Create the StoreProduct rows missing for any (store, product) pair, e.g. after adding stores."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--store', type=int, action='append', dest='stores',
+            help="Only backfill this store id (can be repeated).",
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=None,
+            help="Rows per bulk INSERT (defaults to STORE_PRODUCT_FANOUT_CHUNK_SIZE).",
+        )
+
+    def handle(self, *args, **options):
+        stores = Store.objects.all()
+        if options['stores']:
+            stores = stores.filter(pk__in=options['stores'])
+
+        written = backfill_missing(stores=stores, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {written} store products."))
@@ -0,0 +1,113 @@
+import datetime
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.template import engines
+from django.template.backends.django import DjangoTemplates
+from django.utils import timezone
+
+from inventory.models import Category, Product
+
+ROW_TEMPLATE = 'inventory/_product_row.html'
+
+# The same table twice: every row rendered, or rows read from the row cache
+INLINE_ROWS = (
+    "{% for product in products %}<tr><td>{{ forloop.counter }}</td>"
+    "{% include '" + ROW_TEMPLATE + "' with object=product %}</tr>{% endfor %}"
+)
+CACHED_ROWS = (
+    "{% load rows %}{% cached_rows products '" + ROW_TEMPLATE + "' 'category' as rows %}"
+    "{% for product, row in rows %}<tr><td>{{ forloop.counter }}</td>{{ row }}</tr>{% endfor %}"
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Time product listings rendered in memory (no database): a large listing with every row "
+        "rendered versus rows from the row fragment cache (cold, warm, and with a few rows "
+        "changed), and a catalog page with and without the cached template loader. Clears the "
+        "default cache."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000, help="Rows in the large listing.")
+        parser.add_argument('--page-size', type=int, default=50, help="Rows on a catalog page.")
+        parser.add_argument('--repeat', type=int, default=5, help="Renders per measurement.")
+        parser.add_argument('--changed', type=float, default=0.01, help="Share of rows changed between renders.")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        products = self.products(options['rows'])
+        repeat = options['repeat']
+        engine = engines['django']
+        inline, cached = engine.from_string(INLINE_ROWS), engine.from_string(CACHED_ROWS)
+        context = {'products': products}
+
+        def changed():
+            # New versions for a sample of rows, as saves would give them
+            now = timezone.now()
+            for product in rng.sample(products, int(len(products) * options['changed'])):
+                product.updated = now
+            return context
+
+        results = [
+            (f"{len(products):,} rows, every row rendered", self.time(lambda: inline.render(context), repeat)),
+            (f"{len(products):,} rows, row cache cold", self.time(lambda: cached.render(context), repeat, cache.clear)),
+            (f"{len(products):,} rows, row cache warm", self.time(lambda: cached.render(context), repeat)),
+            (f"{len(products):,} rows, {options['changed']:.0%} changed",
+             self.time(lambda: cached.render(context), repeat, changed)),
+        ]
+
+        page = Paginator(products, options['page_size']).page(1)
+        page_context = {
+            'products': page.object_list, 'page_obj': page, 'paginator': page.paginator, 'is_paginated': True,
+            # Expired at once, so the page fragment is rendered every time
+            'catalog_cache_timeout': 0, 'catalog_version': 'benchmark',
+        }
+        for label, loaders in self.loaders():
+            backend = self.backend(loaders)
+            results.append((
+                f"page of {options['page_size']}, {label}",
+                self.time(lambda: backend.get_template('inventory/product_list.html').render(page_context), repeat * 20),
+            ))
+
+        width = max(len(label) for label, _ in results)
+        self.stdout.write(self.style.MIGRATE_HEADING("render time (ms)"))
+        for label, timings in results:
+            self.stdout.write(f"{label:<{width}}  median {statistics.median(timings):9.2f}  max {max(timings):9.2f}")
+
+    def products(self, count):
+        """Unsaved products with ids and versions: rendering never touches the database."""
+        updated = timezone.now() - datetime.timedelta(days=1)
+        categories = [Category(pk=i, name=f'Category {i}', updated=updated) for i in range(1, 21)]
+        return [
+            Product(pk=i, name=f'Product {i:05}', category=categories[i % len(categories)], updated=updated)
+            for i in range(1, count + 1)
+        ]
+
+    def loaders(self):
+        plain = [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]
+        return [('templates compiled per render', plain), ('cached loader', [('django.template.loaders.cached.Loader', plain)])]
+
+    def backend(self, loaders):
+        options = dict(settings.TEMPLATES[0]['OPTIONS'], loaders=loaders)
+        return DjangoTemplates({'NAME': 'benchmark', 'DIRS': [], 'APP_DIRS': False, 'OPTIONS': options})
+
+    def time(self, render, repeat, before=None):
+        timings = []
+        for _ in range(repeat):
+            if before:
+                before()
+            started = time.perf_counter()
+            render()
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
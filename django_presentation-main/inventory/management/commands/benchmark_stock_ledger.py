@@ -0,0 +1,145 @@
+import datetime
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from inventory.ledger import stock_as_of
+from inventory.models import Category, Product, StockMovement, StockSnapshot, Store, StoreProduct
+from inventory.synthetic import BENCHMARK_OWNER, check_disposable
+
+STORE_NAME = 'Ledger benchmark'
+PRODUCT_PREFIX = 'Ledger product '
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a multi-year stock movement ledger with periodic snapshots for one store, then "
+        "compare stock_as_of (snapshot + bounded replay) with replaying the whole ledger. "
+        "The seeded store and products are deleted when the run finishes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--years', type=int, default=3)
+        parser.add_argument('--products', type=int, default=200)
+        parser.add_argument('--movements-per-day', type=int, default=300)
+        parser.add_argument('--snapshot-days', type=int, default=7, help="Days between snapshots.")
+        parser.add_argument('--queries', type=int, default=20, help="Random past moments to look up.")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--yes', action='store_true',
+            help="Seed even if the database holds stores not created by a benchmark or seed_inventory.",
+        )
+
+    def handle(self, *args, **options):
+        check_disposable("seed a stock ledger benchmark", force=options['yes'])
+        rng = random.Random(options['seed'])
+        # Left behind by a run that was killed before it could clean up
+        self.cleanup()
+        store = self.seed(rng, options)
+        try:
+            self.run(store, rng, options)
+        finally:
+            self.cleanup()
+
+    def run(self, store, rng, options):
+        movements = StockMovement.objects.filter(store=store).count()
+        first = StockMovement.objects.filter(store=store).order_by('timestamp').values_list('timestamp', flat=True)[0]
+        self.stdout.write(f"{movements:,} movements since {first:%Y-%m-%d}, "
+                          f"{StockSnapshot.objects.filter(store=store).count():,} snapshot rows.")
+
+        now = timezone.now()
+        moments = sorted(first + (now - first) * rng.random() for _ in range(options['queries']))
+        snapshot_times, replay_times = [], []
+        for when in moments:
+            started = time.perf_counter()
+            quantities = stock_as_of(store, when)
+            snapshot_times.append((time.perf_counter() - started) * 1000)
+
+            started = time.perf_counter()
+            replayed = self.full_replay(store, when)
+            replay_times.append((time.perf_counter() - started) * 1000)
+
+            mismatched = [pk for pk, quantity in replayed.items() if quantities.get(pk, 0) != quantity]
+            if mismatched:
+                self.stderr.write(f"Mismatch at {when.isoformat()} for store products {mismatched[:5]}")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("stock as of a random moment (ms)"))
+        for label, timings in (('snapshot + replay', snapshot_times), ('full ledger replay', replay_times)):
+            self.stdout.write(f"{label:<20} median {statistics.median(timings):8.2f}  max {max(timings):8.2f}")
+
+    def full_replay(self, store, when):
+        """The unbounded alternative: sum every movement up to ``when``."""
+        return dict(
+            StockMovement.objects.filter(store=store, timestamp__lte=when)
+            .values('store_product').annotate(total=Sum('change')).values_list('store_product', 'total')
+        )
+
+    def cleanup(self):
+        """Delete the seeded store and products; their movements and snapshots cascade."""
+        Store.objects.filter(name=STORE_NAME, owner__username=BENCHMARK_OWNER).delete()
+        Product.objects.filter(category__name='Benchmark', name__startswith=PRODUCT_PREFIX).delete()
+
+    def seed(self, rng, options):
+        started = time.perf_counter()
+        days = options['years'] * 365
+        with transaction.atomic():
+            owner, _ = User.objects.get_or_create(username=BENCHMARK_OWNER)
+            category, _ = Category.objects.get_or_create(name='Benchmark')
+            store = Store.objects.create(name=STORE_NAME, address='Benchmark street', owner=owner)
+            products = Product.objects.bulk_create(
+                Product(name=f'{PRODUCT_PREFIX}{i}', category=category) for i in range(options['products'])
+            )
+            store_products = StoreProduct.objects.bulk_create(
+                StoreProduct(store=store, product=product, price=1, quantity=0) for product in products
+            )
+
+        ops = connection.ops
+        movement_sql = 'INSERT INTO %s (%s) VALUES (%s)' % (
+            ops.quote_name(StockMovement._meta.db_table),
+            ', '.join(ops.quote_name(c) for c in ('store_product_id', 'store_id', 'change', 'reason', 'timestamp')),
+            ', '.join(['%s'] * 5),
+        )
+        snapshot_sql = 'INSERT INTO %s (%s) VALUES (%s)' % (
+            ops.quote_name(StockSnapshot._meta.db_table),
+            ', '.join(ops.quote_name(c) for c in ('store_id', 'store_product_id', 'taken_at', 'quantity')),
+            ', '.join(['%s'] * 4),
+        )
+
+        # Every store product starts at zero and only changes through the
+        # ledger, so the seeded snapshots and final quantities are exact.
+        quantities = {store_product.pk: 0 for store_product in store_products}
+        pks = list(quantities)
+        start = timezone.now() - datetime.timedelta(days=days)
+        with transaction.atomic(), connection.cursor() as cursor:
+            for day in range(days):
+                day_start = start + datetime.timedelta(days=day)
+                if day and day % options['snapshot_days'] == 0:
+                    taken_at = ops.adapt_datetimefield_value(day_start)
+                    cursor.executemany(snapshot_sql, [
+                        (store.pk, pk, taken_at, quantity) for pk, quantity in quantities.items()
+                    ])
+                rows = []
+                for second in sorted(rng.sample(range(86400), options['movements_per_day'])):
+                    pk = rng.choice(pks)
+                    if quantities[pk] < 5 or rng.random() < 0.1:
+                        change, reason = rng.randint(20, 100), StockMovement.RESTOCK
+                    else:
+                        change, reason = -rng.randint(1, min(5, quantities[pk])), StockMovement.DISPATCH
+                    quantities[pk] += change
+                    timestamp = day_start + datetime.timedelta(seconds=second)
+                    rows.append((pk, store.pk, change, reason, ops.adapt_datetimefield_value(timestamp)))
+                cursor.executemany(movement_sql, rows)
+
+        with transaction.atomic():
+            for pk, quantity in quantities.items():
+                StoreProduct.objects.filter(pk=pk).update(quantity=quantity)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"Seeded {days * options['movements_per_day']:,} movements in {elapsed:.1f}s.")
+        return store
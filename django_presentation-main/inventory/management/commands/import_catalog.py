@@ -0,0 +1,28 @@
+from django import forms
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.importers import CatalogImporter
+
+
+class Command(BaseCommand):
+    help = "Import products, categories and per-store price/quantity from a CSV file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV with name, category[, description, store, price, quantity] columns.")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Rows validated and written per transaction.")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as file:
+                result = CatalogImporter(chunk_size=options['chunk_size']).run(file)
+        except OSError as exc:
+            raise CommandError(exc)
+        except forms.ValidationError as exc:
+            raise CommandError(' '.join(exc.messages))
+
+        for line, errors in result.rejected:
+            self.stderr.write(f"Line {line}: {'; '.join(errors)}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.imported} of {result.rows} rows in {result.elapsed:.2f}s "
+            f"({result.rows_per_second:,.0f} rows/s), rejected {len(result.rejected)}."
+        ))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from inventory.models import StoreProduct
+
+
+class Command(BaseCommand):
+    help = "List store products at or below their reorder threshold, grouped by store."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--store', type=int, action='append', dest='stores',
+            help="Only report this store id (can be repeated).",
+        )
+
+    def handle(self, *args, **options):
+        store_products = StoreProduct.objects.low_stock()
+        if options['stores']:
+            store_products = store_products.filter(store_id__in=options['stores'])
+
+        # Walks the partial low-stock index in (store, quantity) order and
+        # streams the rows, so memory stays flat however many are low.
+        rows = store_products.order_by('store_id', 'quantity', 'pk').values_list(
+            'store_id', 'store__name', 'product__name', 'quantity', 'reorder_threshold',
+        )
+        current_store = None
+        total = 0
+        for store_id, store_name, product_name, quantity, threshold in rows.iterator(chunk_size=2000):
+            if store_id != current_store:
+                current_store = store_id
+                self.stdout.write(self.style.MIGRATE_HEADING(f"{store_name} (#{store_id})"))
+            self.stdout.write(f"  {product_name}: {quantity} left (reorder at {threshold})")
+            total += 1
+
+        self.stdout.write(self.style.SUCCESS(f"{total} store products below threshold."))
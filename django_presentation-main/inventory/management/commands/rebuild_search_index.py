@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from inventory.search import get_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the product search index from the catalog."
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        indexed = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {indexed} products with {type(backend).__name__}."
+        ))
@@ -0,0 +1,40 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from inventory.ledger import stock_as_of
+from inventory.models import Store, StoreProduct
+
+
+class Command(BaseCommand):
+    help = "Print a store's stock at a past moment, from the nearest snapshot and the stock movement ledger."
+
+    def add_arguments(self, parser):
+        parser.add_argument('store', type=int, help="Store id.")
+        parser.add_argument('at', help="ISO date or datetime in the current timezone; a date means its end.")
+
+    def handle(self, *args, **options):
+        try:
+            store = Store.objects.get(pk=options['store'])
+        except Store.DoesNotExist:
+            raise CommandError(f"Store {options['store']} does not exist.")
+
+        try:
+            if len(options['at']) == 10:
+                day = datetime.date.fromisoformat(options['at'])
+                at = datetime.datetime.combine(day, datetime.time.max)
+            else:
+                at = datetime.datetime.fromisoformat(options['at'])
+        except ValueError:
+            raise CommandError(f"Invalid date: {options['at']}")
+        if timezone.is_naive(at):
+            at = timezone.make_aware(at)
+
+        quantities = stock_as_of(store, at)
+        names = dict(
+            StoreProduct.objects.filter(pk__in=quantities).values_list('pk', 'product__name')
+        )
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{store.name} at {at.isoformat()}"))
+        for pk, name in sorted(names.items(), key=lambda item: item[1]):
+            self.stdout.write(f"  {name}: {quantities[pk]}")
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storeproduct',
+            name='reorder_threshold',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='storeproduct',
+            index=models.Index(condition=models.Q(('quantity__lte', models.F('reorder_threshold'))), fields=['store', 'quantity'], name='storeproduct_low_stock_idx'),
+        ),
+    ]
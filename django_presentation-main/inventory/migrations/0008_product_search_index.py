@@ -0,0 +1,36 @@
+from django.db import migrations
+
+FTS_TABLE = 'inventory_product_fts'
+
+
+def create_index(apps, schema_editor):
+    # FTS5 is SQLite only; other databases use the configured search backend
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        "name, category, description, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    schema_editor.execute(
+        f"INSERT INTO {FTS_TABLE} (rowid, name, category, description) "
+        "SELECT p.id, p.name, c.name, COALESCE(p.description, '') "
+        "FROM inventory_product p JOIN inventory_category c ON c.id = p.category_id"
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_storeproduct_reorder_threshold'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def record_openings(apps, schema_editor):
+    """
+    Give every store product that predates the ledger its opening movement,
+    timestamped when the row was last written rather than now, so the stock
+    it held before then is not rewritten.
+    """
+    StoreProduct = apps.get_model('inventory', 'StoreProduct')
+    StockMovement = apps.get_model('inventory', 'StockMovement')
+    rows = (
+        StoreProduct.objects.filter(movements__isnull=True)
+        .exclude(quantity=0)
+        .values_list('pk', 'store_id', 'quantity', 'updated')
+    )
+    StockMovement.objects.bulk_create(
+        (
+            StockMovement(
+                store_product_id=pk, store_id=store_id, change=quantity, reason='opening', timestamp=updated,
+            )
+            for pk, store_id, quantity, updated in rows.iterator(chunk_size=2000)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0010_row_updated'),
+    ]
+
+    operations = [
+        migrations.RunPython(record_openings, migrations.RunPython.noop),
+    ]
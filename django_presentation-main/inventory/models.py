@@ -1,9 +1,16 @@
+from decimal import Decimal
+
 from django.db import models
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.contrib.auth.models import User
 
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True, null=True)
+    # Versions the cached fragments showing this row (see inventory.rendering).
+    # QuerySet.update() does not touch it: pass updated=Now() as well.
+    updated = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -11,31 +18,160 @@ class Category(models.Model):
 
 class Product(models.Model):
     name = models.CharField(max_length=200)
-    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    # Indexed by (category, name) below
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, db_index=False)
     description = models.TextField(blank=True, null=True)
+    # See Category.updated
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Name lookups and ordering in the catalog and the admin
+            models.Index(fields=['name'], name='product_name_idx'),
+            models.Index(fields=['category', 'name'], name='product_category_name_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class StoreQuerySet(models.QuerySet):
+    def with_stock_totals(self):
+        """
+        Annotate each store with its SKU count, units in stock, stock value
+        and low-stock count, grouped in one query over its store products.
+        """
+        return self.annotate(
+            sku_count=models.Count('store_products'),
+            stock_units=Coalesce(models.Sum('store_products__quantity'), 0),
+            stock_value=Coalesce(
+                models.Sum(
+                    models.F('store_products__price') * models.F('store_products__quantity'),
+                    output_field=models.DecimalField(max_digits=14, decimal_places=2),
+                ),
+                models.Value(Decimal('0.00')),
+                output_field=models.DecimalField(max_digits=14, decimal_places=2),
+            ),
+            low_stock_count=models.Count(
+                'store_products',
+                filter=models.Q(store_products__quantity__lte=models.F('store_products__reorder_threshold')),
+            ),
+        )
+
+
 class Store(models.Model):
     name = models.CharField(max_length=255)
     address = models.TextField()
-    owner = models.ForeignKey(User, related_name='stores', on_delete=models.CASCADE)
+    # Indexed by (owner, name) below
+    owner = models.ForeignKey(User, related_name='stores', on_delete=models.CASCADE, db_index=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Template used when a new product is fanned out to this store.
+    # Left empty, the global STORE_PRODUCT_DEFAULT_* settings apply.
+    default_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    default_quantity = models.IntegerField(blank=True, null=True)
+
+    objects = StoreQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Every store manager request looks up the user's stores
+            models.Index(fields=['owner', 'name'], name='store_owner_name_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
 
+# Stock at or below the reorder threshold
+LOW_STOCK = models.Q(quantity__lte=models.F('reorder_threshold'))
+
+
+class StoreProductQuerySet(models.QuerySet):
+    def low_stock(self):
+        """Store products at or below their reorder threshold (served by a partial index)."""
+        return self.filter(LOW_STOCK)
+
+
 class StoreProduct(models.Model):
-    store = models.ForeignKey(Store, related_name='store_products', on_delete=models.CASCADE)
+    # Indexed by the (store, product) unique constraint
+    store = models.ForeignKey(Store, related_name='store_products', on_delete=models.CASCADE, db_index=False)
     product = models.ForeignKey(Product, related_name='store_products', on_delete=models.CASCADE)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     quantity = models.IntegerField(default=0)
+    reorder_threshold = models.PositiveIntegerField(default=0)
+    # See Category.updated
+    updated = models.DateTimeField(auto_now=True)
+
+    objects = StoreProductQuerySet.as_manager()
 
     class Meta:
         unique_together = ('store', 'product')
+        indexes = [
+            # Store dashboards sorted or filtered by stock level
+            models.Index(fields=['store', 'quantity'], name='storeproduct_store_qty_idx'),
+            # Only low-stock rows are in this index: the database adds or
+            # removes a row as its quantity crosses the threshold, so listing
+            # low stock never scans the table and dispatches pay no extra query.
+            models.Index(fields=['store', 'quantity'], name='storeproduct_low_stock_idx', condition=LOW_STOCK),
+        ]
 
     def __str__(self):
         return f'{self.product.name} at {self.store.name}'
+
+
+class StockMovement(models.Model):
+    """
+    Append-only ledger of StoreProduct.quantity changes. Rows are never
+    updated; the stock at any past moment is a snapshot plus the movements
+    since (see inventory.ledger).
+    """
+    OPENING = 'opening'
+    DISPATCH = 'dispatch'
+    RESTOCK = 'restock'
+    ADJUSTMENT = 'adjustment'
+    IMPORT = 'import'
+    REASONS = [
+        (OPENING, 'Opening stock'),
+        (DISPATCH, 'Dispatch'),
+        (RESTOCK, 'Restock'),
+        (ADJUSTMENT, 'Adjustment'),
+        (IMPORT, 'Import'),
+    ]
+
+    # Both indexed with the timestamp below
+    store_product = models.ForeignKey(
+        StoreProduct, related_name='movements', on_delete=models.CASCADE, db_index=False
+    )
+    store = models.ForeignKey(Store, related_name='stock_movements', on_delete=models.CASCADE, db_index=False)
+    change = models.IntegerField()
+    reason = models.CharField(max_length=20, choices=REASONS)
+    timestamp = models.DateTimeField(default=timezone.now)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['store_product', 'timestamp'], name='movement_sp_timestamp_idx'),
+            # Replaying a store's movements between two moments
+            models.Index(fields=['store', 'timestamp'], name='movement_store_timestamp_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.change:+d} {self.get_reason_display()} of store product {self.store_product_id}'
+
+
+class StockSnapshot(models.Model):
+    """The quantity of every store product of a store at ``taken_at``."""
+    store = models.ForeignKey(Store, related_name='stock_snapshots', on_delete=models.CASCADE, db_index=False)
+    # Indexed by the (store_product, taken_at) unique constraint
+    store_product = models.ForeignKey(
+        StoreProduct, related_name='snapshots', on_delete=models.CASCADE, db_index=False
+    )
+    taken_at = models.DateTimeField()
+    quantity = models.IntegerField()
+
+    class Meta:
+        unique_together = ('store_product', 'taken_at')
+        indexes = [
+            # Finding a store's latest snapshot before a given moment
+            models.Index(fields=['store', 'taken_at'], name='snapshot_store_taken_at_idx'),
+        ]
@@ -14,15 +14,13 @@ def assign_store_manager_permissions():
     # Define the permissions you want to assign
     content_type = ContentType.objects.get_for_model(Product)
 
-    # Permissions for store managers (e.g., change stock and price)
-    permission_update_stock = Permission.objects.get(
+    # Permissions for store managers (e.g., change stock and price).
+    # Looked up with filter() since they are only present while Product
+    # declares them in Meta.permissions; a fresh database must still migrate.
+    permissions = Permission.objects.filter(
         content_type=content_type,
-        codename='change_stock'
-    )
-    permission_update_price = Permission.objects.get(
-        content_type=content_type,
-        codename='change_price'
+        codename__in=['change_stock', 'change_price'],
     )
 
     # Add permissions to the Store Manager group
-    group.permissions.add(permission_update_stock, permission_update_price)
+    group.permissions.add(*permissions)
@@ -0,0 +1,64 @@
+# inventory/rendering.py
+"""
+Per-row fragment caching for long listings.
+
+A row's cached HTML is keyed on the ``updated`` timestamp and the field
+values of the object it shows and of the related objects it displays
+(e.g. a product row shows its category's name). Any save, and every
+QuerySet.update() that sets ``updated=Now()``, moves the row to a new key,
+so nothing has to be deleted; stale keys simply expire. The field values
+cover two writes landing on the same timestamp, which SQLite's
+millisecond precision makes likely for a busy store product. A page whose
+fragment has expired is rebuilt from the rows that did not change, with
+one get_many and one set_many for the whole page.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+
+def get_timeout():
+    return getattr(settings, 'ROW_CACHE_TIMEOUT', 24 * 3600)
+
+
+def _version(obj):
+    # Read from __dict__ so a deferred field is left out rather than queried
+    values = repr([obj.__dict__.get(field.attname) for field in obj._meta.concrete_fields])
+    digest = hashlib.md5(values.encode(), usedforsecurity=False).hexdigest()[:12]
+    return f'{obj.pk}@{obj.updated.timestamp()}:{digest}'
+
+
+def _related(obj, path):
+    for attr in path.split('.'):
+        obj = getattr(obj, attr)
+    return obj
+
+
+def row_cache_key(template_name, obj, related=()):
+    """The key of ``obj`` rendered with ``template_name``; ``related`` are dotted paths from it."""
+    versions = [_version(obj)] + [_version(_related(obj, path)) for path in related]
+    return 'row:%s:%s' % (template_name, ':'.join(versions))
+
+
+def render_rows(template_name, objects, related=()):
+    """
+    Return [(obj, html)] with each object rendered by ``template_name``
+    (which sees it as ``object``), read from the cache where possible.
+    """
+    objects = list(objects)
+    keys = [row_cache_key(template_name, obj, related) for obj in objects]
+    cached = cache.get_many(keys)
+    template = None
+    rows, rendered = [], {}
+    for obj, key in zip(objects, keys):
+        html = cached.get(key)
+        if html is None:
+            template = template or get_template(template_name)
+            html = rendered[key] = template.render({'object': obj})
+        rows.append((obj, mark_safe(html)))
+    if rendered:
+        cache.set_many(rendered, get_timeout())
+    return rows
@@ -0,0 +1,138 @@
+# inventory/search.py
+import re
+from functools import reduce
+from operator import and_
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .models import Product
+
+FTS_TABLE = 'inventory_product_fts'
+
+# Words of a search query; everything else is ignored, so user input never
+# reaches the FTS5 query syntax unquoted.
+_WORD = re.compile(r'\w+')
+MAX_TERMS = 8
+
+
+def search_terms(query):
+    return _WORD.findall(query or '')[:MAX_TERMS]
+
+
+class SimpleSearchBackend:
+    """
+    Fallback for databases without a configured full-text backend: every
+    word must appear in the product or category name. Needs no index
+    maintenance, and no index helps it either.
+    """
+
+    def search(self, query, limit=20):
+        terms = search_terms(query)
+        if not terms:
+            return []
+        match = reduce(and_, (Q(name__icontains=term) | Q(category__name__icontains=term) for term in terms))
+        return list(Product.objects.filter(match).order_by('name', 'pk').values_list('pk', flat=True)[:limit])
+
+    def index(self, product_ids):
+        pass
+
+    def index_category(self, category_id):
+        pass
+
+    def remove(self, product_ids):
+        pass
+
+    def rebuild(self):
+        return Product.objects.count()
+
+
+class SQLiteFTSBackend:
+    """
+    SQLite FTS5 index over product name, category name and description.
+
+    Each word of the query is matched as a prefix ("wat" finds "Water") and
+    results are ranked by bm25 with the name weighted highest. The rowid of
+    an index row is the product id; the table is created by migration
+    0008 and kept in sync by the signals in inventory.signals.
+    """
+    weights = (10.0, 4.0, 1.0)  # name, category, description
+
+    _SELECT = (
+        'SELECT p.id, p.name, c.name, COALESCE(p.description, \'\') '
+        'FROM inventory_product p JOIN inventory_category c ON c.id = p.category_id'
+    )
+
+    def search(self, query, limit=20):
+        terms = search_terms(query)
+        if not terms:
+            return []
+        match = ' '.join('"%s"*' % term for term in terms)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}, %s, %s, %s) LIMIT %s',
+                [match, *self.weights, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def index(self, product_ids):
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        with connection.cursor() as cursor:
+            for offset in range(0, len(product_ids), 500):
+                chunk = product_ids[offset:offset + 500]
+                placeholders = ', '.join(['%s'] * len(chunk))
+                cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', chunk)
+                cursor.execute(
+                    f'INSERT INTO {FTS_TABLE} (rowid, name, category, description) '
+                    f'{self._SELECT} WHERE p.id IN ({placeholders})',
+                    chunk,
+                )
+
+    def index_category(self, category_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {FTS_TABLE} SET category = (SELECT name FROM inventory_category WHERE id = %s) '
+                f'WHERE rowid IN (SELECT id FROM inventory_product WHERE category_id = %s)',
+                [category_id, category_id],
+            )
+
+    def remove(self, product_ids):
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', product_ids)
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(f'INSERT INTO {FTS_TABLE} (rowid, name, category, description) {self._SELECT}')
+            cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+            cursor.execute(f'SELECT COUNT(*) FROM {FTS_TABLE}')
+            return cursor.fetchone()[0]
+
+
+def get_backend():
+    """
+    The backend named by the PRODUCT_SEARCH_BACKEND setting, or FTS5 on
+    SQLite and the simple backend elsewhere.
+    """
+    path = getattr(settings, 'PRODUCT_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    if connection.vendor == 'sqlite':
+        return SQLiteFTSBackend()
+    return SimpleSearchBackend()
+
+
+def search_products(query, limit=20):
+    """Products matching ``query``, best match first, with their category joined in."""
+    ids = get_backend().search(query, limit)
+    products = Product.objects.select_related('category').in_bulk(ids)
+    return [products[pk] for pk in ids if pk in products]
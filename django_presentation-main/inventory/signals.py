@@ -1,10 +1,40 @@
 # myapp/signals.py
-from django.db.models.signals import post_migrate
+from django.db.models.signals import post_delete, post_migrate, post_save
 from django.dispatch import receiver
+from .catalog import bump_catalog_version
+from .models import Category, Product
 from .permissions import assign_store_manager_permissions
+from .search import get_backend
 
 @receiver(post_migrate)
 def assign_permissions(sender, **kwargs):
     # Assign the permissions after migrations have been applied
     print("post_migrate signal triggered!")
     assign_store_manager_permissions()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_catalog(sender, **kwargs):
+    # Every cached catalog page is keyed by the version this replaces
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, raw=False, **kwargs):
+    if not raw:
+        get_backend().index([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    get_backend().remove([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def index_category(sender, instance, created=False, raw=False, **kwargs):
+    # A new category has no products to re-index yet
+    if not created and not raw:
+        get_backend().index_category(instance.pk)
@@ -0,0 +1,30 @@
+# inventory/synthetic.py
+"""
+Guards for the benchmark commands, which write synthetic stores, products
+and history into whatever database is configured.
+"""
+from django.core.management.base import CommandError
+
+from .models import Store
+
+# Owner of the stores the benchmark commands create
+BENCHMARK_OWNER = 'benchmark-owner'
+# Managers (and store owners) created by seed_inventory
+SEED_MANAGER_PREFIX = 'seed-manager-'
+
+
+def is_disposable():
+    """Whether every store, if any, is one a benchmark or seed_inventory created."""
+    real_stores = Store.objects.exclude(owner__username=BENCHMARK_OWNER).exclude(
+        owner__username__startswith=SEED_MANAGER_PREFIX
+    )
+    return not real_stores.exists()
+
+
+def check_disposable(action, force=False):
+    """Raise CommandError unless ``force`` or the database holds only synthetic data."""
+    if not force and not is_disposable():
+        raise CommandError(
+            f"Refusing to {action} in a database with real data. "
+            "Point DB_NAME at an empty or seeded database, or pass --yes."
+        )
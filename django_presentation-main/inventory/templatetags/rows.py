@@ -0,0 +1,17 @@
+from django import template
+
+from inventory.rendering import render_rows
+
+register = template.Library()
+
+
+@register.simple_tag
+def cached_rows(objects, template_name, *related):
+    """
+    {% cached_rows products 'inventory/_product_row.html' 'category' as rows %}
+
+    Pairs each object with its rendered row (see inventory.rendering).
+    Anything that varies per position, such as a row number, belongs
+    outside the row template.
+    """
+    return render_rows(template_name, objects, related)
@@ -0,0 +1,497 @@
+import datetime
+import gzip
+import re
+import tempfile
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+from unittest import mock
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DataError, connection
+from django.db.models.functions import Now
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from django.urls import reverse
+
+from inventory_manage.db import database_config
+from theme.views import serve_static
+
+from . import catalog
+from .fanout import fan_out_product
+from .importers import CatalogImporter
+from .ledger import adjust_quantity, stock_as_of, take_snapshot
+from .rendering import render_rows, row_cache_key
+from .models import Category, Product, StockMovement, StockSnapshot, Store, StoreProduct
+from .search import SimpleSearchBackend, search_products
+
+
+class StoreProductFanOutTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='owner', password='secret')
+        cls.category = Category.objects.create(name='Drinks')
+        cls.stores = [
+            Store.objects.create(name=f'Store {i}', address='Main street', owner=cls.owner)
+            for i in range(7)
+        ]
+
+    def test_fan_out_uses_chunked_inserts(self):
+        product = Product.objects.create(name='Water', category=self.category)
+        # 1 SELECT for the stores + 3 INSERTs of at most 3 rows, then the
+        # opening stock movements read and written once, plus the savepoint
+        with self.assertNumQueries(8):
+            written = fan_out_product(product, chunk_size=3)
+
+        self.assertEqual(written, 7)
+        self.assertEqual(StoreProduct.objects.filter(product=product).count(), 7)
+
+    def test_fan_out_applies_store_templates(self):
+        store = self.stores[0]
+        store.default_price = Decimal('2.50')
+        store.default_quantity = 5
+        store.save()
+        product = Product.objects.create(name='Juice', category=self.category)
+
+        fan_out_product(product)
+
+        custom = StoreProduct.objects.get(product=product, store=store)
+        self.assertEqual((custom.price, custom.quantity), (Decimal('2.50'), 5))
+        default = StoreProduct.objects.get(product=product, store=self.stores[1])
+        self.assertEqual((default.price, default.quantity), (Decimal('10.00'), 100))
+
+    def test_backfill_command_fills_new_stores(self):
+        product = Product.objects.create(name='Soda', category=self.category)
+        fan_out_product(product)
+        new_store = Store.objects.create(name='New store', address='Side street', owner=self.owner)
+
+        call_command('backfill_store_products', stdout=open('/dev/null', 'w'))
+        call_command('backfill_store_products', stdout=open('/dev/null', 'w'))
+
+        self.assertTrue(StoreProduct.objects.filter(product=product, store=new_store).exists())
+        self.assertEqual(StoreProduct.objects.filter(product=product).count(), 8)
+
+
+class CatalogCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Drinks')
+        Product.objects.bulk_create(
+            Product(name=f'Product {i:03}', category=cls.category) for i in range(60)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_product_list_is_served_from_cache(self):
+        with self.assertNumQueries(2):  # count, then the page with categories joined in
+            response = self.client.get(reverse('product-list'))
+        self.assertContains(response, 'Product 049')
+        self.assertNotContains(response, 'Product 050')
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('product-list'))
+        self.assertContains(response, 'Product 049')
+
+        response = self.client.get(reverse('product-list'), {'page': 2})
+        self.assertContains(response, 'Product 059')
+
+    def test_catalog_changes_invalidate_cached_pages(self):
+        self.client.get(reverse('product-list'))
+        self.client.get(reverse('category-list'))
+
+        self.category.name = 'Beverages'
+        self.category.save()
+        product = Product.objects.create(name='Product 000 bis', category=self.category)
+
+        response = self.client.get(reverse('product-list'))
+        self.assertContains(response, 'Beverages')
+        self.assertContains(response, 'Product 000 bis')
+        self.assertContains(response, 'Page 1 of 2')
+
+        product.delete()
+        response = self.client.get(reverse('product-list'))
+        self.assertNotContains(response, 'Product 000 bis')
+        response = self.client.get(reverse('category-list'))
+        self.assertContains(response, 'Beverages')
+        self.assertContains(response, reverse('category-delete', args=[self.category.pk]))
+
+    def test_per_process_cache_keeps_pages_briefly(self):
+        self.assertEqual(catalog.get_timeout(), catalog.LOCAL_CACHE_MAX_TIMEOUT)
+        # A shared cache sees every version bump, so the full timeout applies
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}):
+            self.assertEqual(catalog.get_timeout(), 3600)
+
+
+class RowCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Drinks')
+        Product.objects.bulk_create(Product(name=f'Product {i}', category=cls.category) for i in range(5))
+        cls.store = Store.objects.create(
+            name='Main', address='Main street', owner=User.objects.create_user(username='owner'),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def render(self):
+        products = Product.objects.select_related('category').order_by('pk')
+        return {product.name: html for product, html in render_rows('inventory/_product_row.html', products, ['category'])}
+
+    def test_rows_are_rendered_once_until_they_change(self):
+        self.assertIn('Product 0', self.render()['Product 0'])
+        with mock.patch('inventory.rendering.get_template') as get_template:
+            self.render()
+        get_template.assert_not_called()
+
+        product = Product.objects.get(name='Product 0')
+        product.name = 'Renamed'
+        product.save()
+        self.assertIn('Renamed', self.render()['Renamed'])
+
+    def test_related_and_queryset_updates_change_the_key(self):
+        product = Product.objects.select_related('category').first()
+        key = row_cache_key('inventory/_product_row.html', product, ['category'])
+
+        Category.objects.filter(pk=self.category.pk).update(name='Beverages', updated=Now())
+        product = Product.objects.select_related('category').get(pk=product.pk)
+        self.assertNotEqual(row_cache_key('inventory/_product_row.html', product, ['category']), key)
+
+        store_product = StoreProduct.objects.create(store=self.store, product=product, price=1, quantity=5)
+        key = row_cache_key('row', store_product)
+        adjust_quantity(store_product, 2)
+        store_product.refresh_from_db()
+        self.assertNotEqual(row_cache_key('row', store_product), key)
+
+        # A sale landing on the same timestamp as the previous write
+        key = row_cache_key('row', store_product)
+        StoreProduct.objects.filter(pk=store_product.pk).update(quantity=1, updated=store_product.updated)
+        store_product.refresh_from_db()
+        self.assertNotEqual(row_cache_key('row', store_product), key)
+
+
+class ProductSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.drinks = Category.objects.create(name='Drinks')
+        cls.snacks = Category.objects.create(name='Snacks')
+        cls.water = Product.objects.create(name='Sparkling Water', category=cls.drinks)
+        cls.juice = Product.objects.create(name='Orange Juice', category=cls.drinks, description='With water added')
+        cls.chips = Product.objects.create(name='Salted Chips', category=cls.snacks)
+
+    def names(self, query):
+        return [product.name for product in search_products(query)]
+
+    def test_prefix_match_ranks_name_above_description(self):
+        self.assertEqual(self.names('wat'), ['Sparkling Water', 'Orange Juice'])
+        self.assertEqual(self.names('spark wat'), ['Sparkling Water'])
+        self.assertEqual(self.names('snack'), ['Salted Chips'])
+        # Query syntax is never passed through: operators are plain words
+        self.assertEqual(self.names('"*)('), [])
+        self.assertEqual(self.names('OR*'), ['Orange Juice'])
+
+    def test_index_follows_product_and_category_changes(self):
+        self.chips.name = 'Salted Crisps'
+        self.chips.save()
+        self.snacks.name = 'Nibbles'
+        self.snacks.save()
+        self.water.delete()
+
+        self.assertEqual(self.names('crisp'), ['Salted Crisps'])
+        self.assertEqual(self.names('nibble'), ['Salted Crisps'])
+        self.assertEqual(self.names('chips'), [])
+        self.assertEqual(self.names('sparkling'), [])
+
+    def test_imported_products_are_indexed(self):
+        CatalogImporter().run(StringIO('name,category\nGinger Beer,Drinks\n'))
+
+        self.assertEqual(self.names('ging'), ['Ginger Beer'])
+
+    def test_rebuild_command_and_simple_backend(self):
+        Product.objects.bulk_create([Product(name='Mineral Water', category=self.drinks)])
+        self.assertEqual(self.names('mineral'), [])
+
+        call_command('rebuild_search_index', stdout=StringIO())
+
+        self.assertEqual(self.names('mineral'), ['Mineral Water'])
+        with self.settings(PRODUCT_SEARCH_BACKEND='inventory.search.SimpleSearchBackend'):
+            self.assertEqual(self.names('water drinks'), ['Mineral Water', 'Sparkling Water'])
+        self.assertEqual(SimpleSearchBackend().search(''), [])
+
+
+class StockLedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='owner', password='secret')
+        cls.store = Store.objects.create(name='Main', address='Main street', owner=cls.owner)
+        cls.category = Category.objects.create(name='Drinks')
+
+    def setUp(self):
+        self.product = Product.objects.create(name='Water', category=self.category)
+        fan_out_product(self.product)
+        self.store_product = StoreProduct.objects.get(product=self.product)
+
+    def backdate(self, days):
+        """Move the movements recorded just now ``days`` into the past."""
+        recent = timezone.now() - datetime.timedelta(hours=1)
+        for movement in StockMovement.objects.filter(timestamp__gt=recent):
+            movement.timestamp -= datetime.timedelta(days=days)
+            movement.save()
+
+    def test_every_change_is_logged(self):
+        adjust_quantity(self.store_product, 130)
+        # A sale recorded between the form being loaded and saved is kept
+        StoreProduct.objects.filter(pk=self.store_product.pk).update(quantity=120)
+        adjust_quantity(self.store_product, 125)
+
+        self.assertEqual(
+            list(StockMovement.objects.order_by('pk').values_list('reason', 'change')),
+            [('opening', 100), ('restock', 30), ('restock', 5)],
+        )
+        self.assertEqual(StoreProduct.objects.get(pk=self.store_product.pk).quantity, 125)
+
+    def test_stock_as_of_replays_from_nearest_snapshot(self):
+        now = timezone.now()
+        adjust_quantity(self.store_product, 150)
+        self.backdate(30)  # opening and restock 30 days ago
+        take_snapshot(self.store, now - datetime.timedelta(days=20))
+        adjust_quantity(self.store_product, 90)
+        self.backdate(10)  # adjustment 10 days ago
+        take_snapshot(self.store, now - datetime.timedelta(days=20))  # no-op
+
+        self.assertEqual(StockSnapshot.objects.get().quantity, 150)
+        for days_ago, expected in ((40, 0), (25, 150), (15, 150), (9, 90), (5, 90), (0, 90)):
+            with self.subTest(days_ago=days_ago):
+                when = now - datetime.timedelta(days=days_ago, minutes=-1)
+                self.assertEqual(stock_as_of(self.store, when), {self.store_product.pk: expected})
+
+        # From the snapshot, only the 10 days after it are replayed
+        with self.assertNumQueries(3):
+            stock_as_of(self.store, now - datetime.timedelta(days=18))
+
+    def test_backfill_leaves_rows_older_than_the_ledger_alone(self):
+        # A row from before the ledger: stock but no movements
+        StockMovement.objects.all().delete()
+        juice = Product.objects.create(name='Juice', category=self.category)
+        yesterday = timezone.now() - datetime.timedelta(days=1)
+
+        call_command('backfill_store_products', stdout=StringIO())
+
+        new_row = StoreProduct.objects.get(product=juice)
+        self.assertEqual(list(StockMovement.objects.values_list('store_product', 'change')), [(new_row.pk, 100)])
+        self.assertEqual(stock_as_of(self.store, yesterday), {self.store_product.pk: 100, new_row.pk: 0})
+
+    def test_migration_opens_rows_older_than_the_ledger_when_last_written(self):
+        StockMovement.objects.all().delete()
+        written = timezone.now() - datetime.timedelta(days=3)
+        StoreProduct.objects.filter(pk=self.store_product.pk).update(updated=written)
+
+        import_module('inventory.migrations.0011_opening_movements').record_openings(apps, None)
+
+        opening = StockMovement.objects.get()
+        self.assertEqual((opening.reason, opening.change, opening.timestamp), ('opening', 100, written))
+        self.assertEqual(stock_as_of(self.store, timezone.now() - datetime.timedelta(days=1)), {self.store_product.pk: 100})
+
+    def test_ledger_benchmark_refuses_real_data_and_cleans_up(self):
+        options = {'years': 1, 'products': 3, 'movements_per_day': 2, 'queries': 2}
+        with self.assertRaisesMessage(CommandError, 'real data'):
+            call_command('benchmark_stock_ledger', stdout=StringIO(), **options)
+        self.assertFalse(Store.objects.filter(name='Ledger benchmark').exists())
+
+        call_command('benchmark_stock_ledger', stdout=StringIO(), yes=True, **options)
+
+        self.assertEqual(list(Store.objects.all()), [self.store])
+        self.assertEqual(list(Product.objects.all()), [self.product])
+        self.assertEqual(StockMovement.objects.exclude(store=self.store).count(), 0)
+
+    def test_import_logs_quantity_changes(self):
+        CatalogImporter().run(StringIO(
+            'name,category,store,price,quantity\n'
+            f'Water,Drinks,{self.store.pk},1.00,110\n'
+            f'Juice,Drinks,{self.store.pk},2.00,12\n'
+        ))
+
+        self.assertEqual(
+            list(StockMovement.objects.filter(reason='import').order_by('pk').values_list('change', flat=True)),
+            [10, 12],
+        )
+
+
+class CatalogImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='owner', password='secret')
+        cls.store = Store.objects.create(name='Main', address='Main street', owner=cls.owner)
+
+    def run_import(self, text, chunk_size=2):
+        return CatalogImporter(chunk_size=chunk_size).run(StringIO(text))
+
+    def test_import_upserts_catalog_and_store_prices(self):
+        result = self.run_import(
+            'name,category,description,store,price,quantity\n'
+            f'Water,Drinks,Still,{self.store.pk},1.50,10\n'
+            'Juice,Drinks,,,,\n'
+            f'Chips,Snacks,,{self.store.pk},2.00,5\n'
+        )
+        self.assertEqual((result.rows, result.imported, result.rejected), (3, 3, []))
+
+        result = self.run_import(
+            'name,category,description,store,price,quantity\n'
+            f'Water,Drinks,Sparkling,{self.store.pk},1.75,20\n'
+        )
+
+        self.assertEqual(Category.objects.count(), 2)
+        self.assertEqual(Product.objects.count(), 3)
+        water = StoreProduct.objects.get(product__name='Water')
+        self.assertEqual((water.price, water.quantity), (Decimal('1.75'), 20))
+        self.assertEqual(water.product.description, 'Sparkling')
+        self.assertFalse(StoreProduct.objects.filter(product__name='Juice').exists())
+
+    def test_invalid_rows_are_rejected_with_line_numbers(self):
+        result = self.run_import(
+            'name,category,store,price,quantity\n'
+            'Water2,Drinks,,,\n'
+            'Soda,,,,\n'
+            'Tea,Drinks,999,1.00,1\n'
+            f'Milk,Drinks,{self.store.pk},abc,1\n'
+            'Coffee,Drinks,,,\n'
+        )
+
+        self.assertEqual(result.imported, 1)
+        self.assertEqual([line for line, _ in result.rejected], [2, 3, 4, 5])
+        self.assertIn('Name must contain only letters and spaces', result.rejected[0][1])
+        self.assertEqual(list(Product.objects.values_list('name', flat=True)), ['Coffee'])
+
+    def test_field_lengths_are_checked_like_the_form(self):
+        result = self.run_import(
+            'name,category,store,price,quantity\n'
+            f'{"A" * 201},Drinks,,,\n'
+            f'Water,Drinks,{self.store.pk},123456789012,1\n'
+            'Juice,Drinks,,,\n'
+        )
+
+        self.assertEqual([line for line, _ in result.rejected], [2, 3])
+        self.assertIn('Ensure this value has at most 200 characters (it has 201).', result.rejected[0][1])
+        self.assertEqual(list(Product.objects.values_list('name', flat=True)), ['Juice'])
+
+    def test_database_errors_reject_the_chunk(self):
+        text = (
+            'name,category,store,price,quantity\n'
+            f'Water,Drinks,{self.store.pk},1.00,1\n'
+            'Chips,Snacks,,,\n'
+            'Crisps,Snacks,,,\n'
+        )
+        with mock.patch.object(
+            CatalogImporter, 'upsert_store_products', side_effect=[DataError('value too long'), None],
+        ):
+            result = self.run_import(text)
+
+        self.assertEqual(result.imported, 1)
+        self.assertEqual([line for line, _ in result.rejected], [2, 3])
+        self.assertIn('value too long', result.rejected[0][1][0])
+        # The failed chunk's category was rolled back and is created again
+        self.assertEqual(list(Product.objects.values_list('name', 'category__name')), [('Crisps', 'Snacks')])
+
+    def test_admin_upload(self):
+        admin = User.objects.create_superuser(username='admin', password='secret')
+        self.client.force_login(admin)
+        upload = SimpleUploadedFile('catalog.csv', b'name,category\nWater,Drinks\nBad1,Drinks\n')
+
+        response = self.client.post(reverse('admin:inventory_product_import'), {'file': upload}, follow=True)
+
+        self.assertContains(response, 'Imported 1 of 2 rows')
+        self.assertContains(response, 'Line 3:')
+        self.assertTrue(Product.objects.filter(name='Water').exists())
+
+
+class DatabaseProfileTests(TestCase):
+    def test_sqlite_connections_are_tuned(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+
+    def test_sqlite_profile(self):
+        config = database_config('sqlite', Path('/srv/app'), environ={})
+        self.assertEqual(config['ENGINE'], 'django.db.backends.sqlite3')
+        self.assertEqual(config['NAME'], Path('/srv/app/db.sqlite3'))
+
+    def test_postgres_profile_keeps_connections(self):
+        config = database_config('postgres', Path('/srv/app'), environ={'DB_NAME': 'stock', 'DB_HOST': 'db'})
+        self.assertEqual(config['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual((config['NAME'], config['HOST']), ('stock', 'db'))
+        self.assertEqual(config['CONN_MAX_AGE'], 60)
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+        self.assertNotIn('pool', config['OPTIONS'])
+
+    def test_postgres_profile_with_pool(self):
+        config = database_config('postgres', Path('/srv/app'), environ={'DB_POOL_MAX_SIZE': '20'})
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertEqual(config['OPTIONS']['pool']['max_size'], 20)
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ValueError):
+            database_config('oracle', Path('/srv/app'), environ={})
+
+
+class StaticAssetsTests(TestCase):
+    def test_pages_use_the_built_stylesheet(self):
+        for url in (reverse('login'), reverse('product-list')):
+            response = self.client.get(url)
+            self.assertContains(response, '/static/css/dist/styles.css', count=1)
+            self.assertNotContains(response, 'cdn.tailwindcss.com')
+
+    def test_built_stylesheet_has_every_template_class(self):
+        # Run `manage.py tailwind build` after adding classes to a template
+        stylesheet = (settings.BASE_DIR / 'theme/static/css/dist/styles.css').read_text()
+        missing = set()
+        for template in settings.BASE_DIR.glob('*/templates/**/*.html'):
+            if 'admin' in template.parts:
+                continue  # Styled by the admin's own stylesheets
+            for classes in re.findall(r'class="([^"]*)"', template.read_text()):
+                # Tags and variables are not classes (built names cannot be checked)
+                for name in re.sub(r'{%.*?%}|\S*{{.*?}}\S*', ' ', classes).split():
+                    if '.' + re.sub(r'([:/.\[\]])', r'\\\1', name) not in stylesheet:
+                        missing.add(name)
+        self.assertEqual(missing, set())
+
+    def test_collected_files_are_fingerprinted_compressed_and_cached_for_good(self):
+        with tempfile.TemporaryDirectory() as static_root, override_settings(
+            STATIC_ROOT=static_root,
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'staticfiles': {'BACKEND': 'theme.storage.CompressedManifestStaticFilesStorage'},
+            },
+        ):
+            output = StringIO()
+            call_command('collectstatic', interactive=False, verbosity=2, stdout=output)
+            name = staticfiles_storage.stored_name('css/dist/styles.css')
+            self.assertRegex(name, r'^css/dist/styles\.[0-9a-f]{12}\.css$')
+            self.assertIn(f"Post-processed 'css/dist/styles.css' as '{name}.gz'", output.getvalue())
+            with staticfiles_storage.open(name) as original:
+                content = original.read()
+
+            request = RequestFactory().get('/static/' + name, HTTP_ACCEPT_ENCODING='gzip, deflate')
+            response = serve_static(request, name)
+
+            self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+            self.assertEqual(response.headers['Content-Type'], 'text/css')
+            self.assertIn('immutable', response.headers['Cache-Control'])
+            self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), content)
+            response.close()
+
+            # Plain names may change content, so they are only cached briefly
+            response = serve_static(RequestFactory().get('/'), 'css/dist/styles.css')
+            self.assertNotIn('immutable', response.headers['Cache-Control'])
+            self.assertNotIn('Content-Encoding', response.headers)
+            response.close()
@@ -1,14 +1,21 @@
+from django.conf import settings
 from django.urls import path
 from django.views.generic.base import RedirectView
 from . import views
 
+if settings.ASYNC_VIEWS:
+    from .async_views import AsyncCategoryListView as CategoryListView, AsyncProductListView as ProductListView
+else:
+    CategoryListView, ProductListView = views.CategoryListView, views.ProductListView
+
 urlpatterns = [
     path('', views.HomeView.as_view(), name='home'),
     path('inventory/', RedirectView.as_view(url='/', permanent=True)),  # Redirect /inventory/ to /
-    path('categories/', views.CategoryListView.as_view(), name='category-list'),
+    path('categories/', CategoryListView.as_view(), name='category-list'),
     path('categories/create/', views.CategoryCreateView.as_view(), name='category-create'),
     path('categories/<int:pk>/update/', views.CategoryUpdateView.as_view(), name='category-update'),
-    path('products/', views.ProductListView.as_view(), name='product-list'),
+    path('categories/<int:pk>/delete/', views.CategoryDeleteView.as_view(), name='category-delete'),
+    path('products/', ProductListView.as_view(), name='product-list'),
     path('products/create/', views.ProductCreateView.as_view(), name='product-create'),
     path('products/<int:pk>/update/', views.ProductUpdateView.as_view(), name='product-update'),
     path('products/<int:pk>/delete/', views.ProductDeleteView.as_view(), name='product-delete'),
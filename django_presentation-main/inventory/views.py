@@ -2,6 +2,7 @@
 from django.shortcuts import render, redirect
 from django.views.generic import TemplateView, ListView, CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy
+from inventory.catalog import CatalogCacheMixin
 from inventory.forms import ProductCreateForm, ProductUpdateForm
 from .models import Category, Product, Store
 from django.core.exceptions import PermissionDenied
@@ -11,10 +12,11 @@ class HomeView(TemplateView):
     template_name = 'inventory/home.html'
 
 # Category views
-class CategoryListView(ListView):
+class CategoryListView(CatalogCacheMixin, ListView):
     model = Category
     template_name = 'inventory/category_list.html'
     context_object_name = 'categories'
+    queryset = Category.objects.order_by('name', 'pk')
 
 class CategoryCreateView(CreateView):
     model = Category
@@ -28,16 +30,24 @@ class CategoryUpdateView(UpdateView):
     fields = ['name', 'description']
     success_url = reverse_lazy('category-list')
 
+class CategoryDeleteView(DeleteView):
+    model = Category
+    template_name = 'inventory/category_delete.html'
+    success_url = reverse_lazy('category-list')
+
 # Product views
-class ProductListView(ListView):
+class ProductListView(CatalogCacheMixin, ListView):
     model = Product
     template_name = 'inventory/product_list.html'
     context_object_name = 'products'
+    # The category is joined in rather than fetched once per row
+    queryset = Product.objects.select_related('category').order_by('name', 'pk')
 
 from django.shortcuts import redirect
 from django.urls import reverse_lazy
 from django.contrib import messages
-from .models import Product, StoreProduct, Store
+from .fanout import fan_out
+from .models import Product
 
 class ProductCreateView(CreateView):
     model = Product
@@ -47,20 +57,9 @@ class ProductCreateView(CreateView):
     def form_valid(self, form):
         response = super().form_valid(form)
 
-        # After the product is created, we need to create StoreProduct instances for all stores
-        product = self.object  # This is the product just created
-
-        # Fetch all stores
-        stores = Store.objects.all()
-
-        for store in stores:
-            # Create a StoreProduct instance for each store, with default price and quantity
-            StoreProduct.objects.create(
-                store=store,
-                product=product,
-                price=10.00,  # Default price (you can modify this)
-                quantity=100,  # Default quantity (you can modify this)
-            )
+        # After the product is created, add it to every store in batched
+        # INSERTs (or on a background thread, see STORE_PRODUCT_FANOUT_BACKGROUND)
+        fan_out(self.object)
 
         messages.success(self.request, "Product created successfully and added to all stores.")
         return redirect('product-list')  # Redirect to a success page or wherever you need
@@ -0,0 +1,92 @@
+# inventory_manage/db.py
+"""
+Database profiles, selected with the DB_PROFILE environment variable.
+
+``sqlite`` (the default) uses the local db.sqlite3 file. Every new
+connection is tuned by ``configure_sqlite`` for concurrent use, so that
+readers no longer wait for writers and writers queue for the lock instead
+of failing.
+
+``postgres`` connects to a server described by the DB_NAME, DB_USER,
+DB_PASSWORD, DB_HOST and DB_PORT variables. Connections are kept open
+between requests for DB_CONN_MAX_AGE seconds and health-checked before
+reuse. With DB_POOL_MAX_SIZE set, they come from a psycopg connection pool
+instead (Django 5.1+).
+"""
+import os
+
+import django
+from django.conf import settings
+
+SQLITE_PROFILE = 'sqlite'
+POSTGRES_PROFILE = 'postgres'
+
+# Applied to every new SQLite connection. Can be replaced with the
+# SQLITE_PRAGMAS setting.
+DEFAULT_SQLITE_PRAGMAS = {
+    # Readers keep reading the last committed state while a write is in
+    # progress, and a commit appends to the log instead of rewriting pages
+    'journal_mode': 'WAL',
+    # In WAL mode a crash can lose the last commits but never corrupts
+    # the database; FULL would sync the log on every commit
+    'synchronous': 'NORMAL',
+    # Milliseconds to wait for the write lock before "database is locked"
+    'busy_timeout': 5000,
+    # Read through a memory map rather than read() calls
+    'mmap_size': 256 * 1024 * 1024,
+}
+
+
+def database_config(profile, base_dir, environ=os.environ):
+    """The DATABASES['default'] entry for ``profile``."""
+    if profile == SQLITE_PROFILE:
+        options = {}
+        if django.VERSION >= (5, 1):
+            # Take the write lock when a transaction starts. A transaction that
+            # reads first and writes later cannot wait for the lock (it could
+            # deadlock), so SQLite fails it at once whatever busy_timeout says.
+            options['transaction_mode'] = 'IMMEDIATE'
+        return {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': environ.get('DB_NAME') or base_dir / 'db.sqlite3',
+            'OPTIONS': options,
+        }
+
+    if profile == POSTGRES_PROFILE:
+        config = {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': environ.get('DB_NAME', 'inventory_manage'),
+            'USER': environ.get('DB_USER', ''),
+            'PASSWORD': environ.get('DB_PASSWORD', ''),
+            'HOST': environ.get('DB_HOST', ''),
+            'PORT': environ.get('DB_PORT', ''),
+            'CONN_MAX_AGE': int(environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+        pool_size = int(environ.get('DB_POOL_MAX_SIZE', 0))
+        if pool_size:
+            # The pool keeps the connections; Django must close (return) them
+            # at the end of each request
+            config['CONN_MAX_AGE'] = 0
+            config['OPTIONS']['pool'] = {
+                'min_size': int(environ.get('DB_POOL_MIN_SIZE', 2)),
+                'max_size': pool_size,
+                'timeout': int(environ.get('DB_POOL_TIMEOUT', 10)),
+            }
+        return config
+
+    raise ValueError(f"Unknown DB_PROFILE {profile!r}, expected {SQLITE_PROFILE!r} or {POSTGRES_PROFILE!r}.")
+
+
+def get_sqlite_pragmas():
+    return getattr(settings, 'SQLITE_PRAGMAS', DEFAULT_SQLITE_PRAGMAS)
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """connection_created receiver applying the SQLite pragmas."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in get_sqlite_pragmas().items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
@@ -0,0 +1,62 @@
+# inventory_manage/sessions.py
+"""
+Session and message storage profiles, selected with the SESSION_PROFILE
+environment variable.
+
+``db`` (the default) keeps sessions in the django_session table: every
+login, logout and session change is a write that queues for the same
+SQLite lock as the dispatches.
+
+``cached_db`` still writes sessions through to the database, so they
+survive a restart, but reads them from the ``sessions`` cache; requests
+that do not change the session no longer query the table. That cache
+must be shared by every process (Redis, Memcached): with a per-process
+one, a logout or session change in one worker leaves the old session
+readable from the others.
+
+``cookie`` keeps the session in a signed cookie (readable by the client,
+not forgeable) and never touches the database. Logging out cannot revoke
+a copied cookie before it expires, so keep SESSION_COOKIE_AGE short.
+
+``cached_db`` and ``cookie`` keep flash messages in a cookie of their own,
+so a message never lands in the session.
+"""
+from django.core.exceptions import ImproperlyConfigured
+
+SESSION_PROFILES = {
+    'db': (
+        'django.contrib.sessions.backends.db',
+        'django.contrib.messages.storage.fallback.FallbackStorage',
+    ),
+    'cached_db': (
+        'django.contrib.sessions.backends.cached_db',
+        'django.contrib.messages.storage.cookie.CookieStorage',
+    ),
+    'cookie': (
+        'django.contrib.sessions.backends.signed_cookies',
+        'django.contrib.messages.storage.cookie.CookieStorage',
+    ),
+}
+
+
+# Cache backends each process keeps to itself
+PER_PROCESS_CACHE_BACKENDS = ('django.core.cache.backends.locmem.LocMemCache',)
+
+
+def session_config(profile, session_cache=None):
+    """
+    (SESSION_ENGINE, MESSAGE_STORAGE) for ``profile``. ``session_cache`` is
+    the CACHES entry ``cached_db`` reads sessions from.
+    """
+    try:
+        config = SESSION_PROFILES[profile]
+    except KeyError:
+        raise ValueError(
+            f"Unknown SESSION_PROFILE {profile!r}, expected one of {', '.join(map(repr, SESSION_PROFILES))}."
+        ) from None
+    if profile == 'cached_db' and (session_cache or {}).get('BACKEND') in PER_PROCESS_CACHE_BACKENDS:
+        raise ImproperlyConfigured(
+            "SESSION_PROFILE 'cached_db' needs a sessions cache shared by every process, "
+            "such as Redis or Memcached, not a local-memory one."
+        )
+    return config
@@ -10,8 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from inventory_manage.db import database_config
+from inventory_manage.sessions import session_config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -45,13 +49,26 @@ INSTALLED_APPS = [
 ]
 
 TAILWIND_APP_NAME = 'theme'
+# `manage.py tailwind build` runs the standalone Tailwind binary (no Node.js)
+# on theme/static_src/src/styles.css; pinned so rebuilds are reproducible
+TAILWIND_USE_STANDALONE_BINARY = True
+TAILWIND_STANDALONE_BINARY_VERSION = 'v4.3.3'
+
+# New products are added to every store in chunked bulk INSERTs.
+# Per-store defaults live on Store.default_price / default_quantity.
+STORE_PRODUCT_FANOUT_CHUNK_SIZE = 500
+STORE_PRODUCT_FANOUT_BACKGROUND = False
+STORE_PRODUCT_DEFAULT_PRICE = '10.00'
+STORE_PRODUCT_DEFAULT_QUANTITY = 100
 
 MIDDLEWARE = [
+    'store_management.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'store_management.middleware.RoleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -78,18 +95,90 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'inventory_manage.wsgi.application'
 
+# Route the read-heavy views (dashboard, dispatch report, catalog lists) to
+# their async versions when serving under ASGI; see store_management.async_views
+# and inventory.async_views.
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', '') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# DB_PROFILE=sqlite (default) or postgres; see inventory_manage.db for the
+# variables each profile reads.
+DB_PROFILE = os.environ.get('DB_PROFILE', 'sqlite')
+
 DATABASES = {
+    'default': database_config(DB_PROFILE, BASE_DIR),
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'inventory-manage',
+        # Room for a 10k-row listing's row fragments (see inventory.rendering)
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+    # Read-through copy of the sessions for SESSION_PROFILE=cached_db, which
+    # refuses this per-process backend: point it at Redis or Memcached first.
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'inventory-manage-sessions',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
 }
 
 
+# Sessions and messages
+# https://docs.djangoproject.com/en/4.2/topics/http/sessions/
+
+# SESSION_PROFILE=db (default), cached_db or cookie; see inventory_manage.sessions.
+# Purge expired database sessions with `manage.py purge_sessions` from cron.
+SESSION_PROFILE = os.environ.get('SESSION_PROFILE', 'db')
+SESSION_CACHE_ALIAS = 'sessions'
+SESSION_ENGINE, MESSAGE_STORAGE = session_config(SESSION_PROFILE, CACHES[SESSION_CACHE_ALIAS])
+
+# Seconds a rendered listing row stays cached; rows are keyed on their
+# ``updated`` timestamps and field values, so changes never wait for this
+# (see inventory.rendering)
+ROW_CACHE_TIMEOUT = 24 * 3600
+
+# Seconds a user's resolved roles and stores stay cached (see store_management.roles).
+# Only a shared default cache sees every process's invalidations; with the
+# per-process LocMemCache above, entries are capped at 5 seconds so revoked
+# roles and reassigned stores never outlive a change for long.
+ROLES_CACHE_TIMEOUT = 3600
+
+# Seconds rendered catalog pages stay cached; any Category or Product
+# change invalidates them sooner (see inventory.catalog). As with roles,
+# a per-process default cache caps this at 5 seconds, since only the
+# process that saw a change would otherwise drop its stale pages.
+CATALOG_CACHE_TIMEOUT = 3600
+
+# Per-view request profiling (see store_management.profiling), off unless
+# PROFILING_ENABLED is set. Stats are kept in the PROFILING_CACHE cache for
+# PROFILING_WINDOWS windows of PROFILING_WINDOW seconds. With a local-memory
+# cache each worker keeps its own stats and `manage.py profiling_report`,
+# a process of its own, sees none of them: point PROFILING_CACHE at a shared
+# backend with atomic incr (memcached, redis) to aggregate them.
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '') == '1'
+PROFILING_CACHE = 'default'
+PROFILING_WINDOW = 300
+PROFILING_WINDOWS = 12
+
+# Dispatches older than this many days are moved to DispatchArchive by
+# `manage.py archive_dispatches` (see store_management.archive)
+DISPATCH_ARCHIVE_AFTER_DAYS = 365
+
+# Dotted path of the product search backend (see inventory.search). Left
+# unset, SQLite databases use the FTS5 index and others a simple LIKE match.
+# PRODUCT_SEARCH_BACKEND = 'inventory.search.SimpleSearchBackend'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -126,6 +215,28 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# collectstatic target; build it with `manage.py build_assets`
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Outside DEBUG, collected files get content-hashed names and gzip/brotli
+# variants (see theme.storage), so they can be cached for good. DEBUG keeps
+# plain names, served straight from the apps' static directories.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'theme.storage.CompressedManifestStaticFilesStorage'
+        ),
+    },
+}
+
+# Serve STATIC_ROOT from Django (theme.views.serve_static) where no
+# front-end server does, e.g. on the store terminals
+SERVE_STATIC = os.environ.get('SERVE_STATIC', '') == '1'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -1,10 +1,18 @@
+from django.conf import settings
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.contrib.auth import views as auth_views
 
+from theme.views import serve_static
+
 urlpatterns = [
 
     path('admin/', admin.site.urls),              # Admin interface
     path('inventory/', include('inventory.urls')),  # Routes for inventory app  
     path('store/', include('store_management.urls')),     # Redirect root to inventory
 ]
+
+if settings.SERVE_STATIC:
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.+)$' % settings.STATIC_URL.lstrip('/'), serve_static, name='static'),
+    ]
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class StoreManagementConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'store_management'
+
+    def ready(self):
+        # Keep the daily sales rollup in step with recorded dispatches
+        import store_management.signals
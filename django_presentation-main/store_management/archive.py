@@ -0,0 +1,89 @@
+# store_management/archive.py
+"""
+Tiered storage for dispatch history.
+
+Dispatches older than DISPATCH_ARCHIVE_AFTER_DAYS are moved, oldest first,
+from Dispatch into DispatchArchive in batches. Each batch copies and
+deletes its rows in one transaction, so an interrupted run loses nothing
+and the next run carries on where it stopped. Because rows go in
+(timestamp, id) order, every archived dispatch is older than every
+dispatch left in the live table.
+
+Reports read the timestamp of the newest archived dispatch to tell
+whether their range reaches into the archive. It is read from the
+database each time, one probe of the timestamp index, rather than cached:
+the archive is filled by a separate process, whose changes a per-process
+cache would never see.
+"""
+import datetime
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Dispatch, DispatchArchive
+
+COLUMNS = ('id', 'store_product_id', 'quantity_sold', 'discount', 'total_amount', 'timestamp', 'sold_by_id')
+
+
+def get_archive_after_days():
+    return getattr(settings, 'DISPATCH_ARCHIVE_AFTER_DAYS', 365)
+
+
+def archive_cutoff(days=None):
+    """Dispatches before this instant are due for the archive."""
+    days = get_archive_after_days() if days is None else days
+    day = timezone.localdate() - datetime.timedelta(days=days)
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def archived_until():
+    """Timestamp of the newest archived dispatch, or None when nothing is archived."""
+    return DispatchArchive.objects.aggregate(newest=Max('timestamp'))['newest']
+
+
+async def aarchived_until():
+    return (await DispatchArchive.objects.aaggregate(newest=Max('timestamp')))['newest']
+
+
+def _copy_sql():
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(column) for column in COLUMNS)
+    return 'INSERT INTO %s (%s) SELECT %s FROM %s WHERE %s IN ' % (
+        quote(DispatchArchive._meta.db_table), columns, columns,
+        quote(Dispatch._meta.db_table), quote('id'),
+    )
+
+
+def archive_batch(cutoff, batch_size):
+    """Move up to ``batch_size`` of the oldest dispatches before ``cutoff``; return how many moved."""
+    with transaction.atomic():
+        ids = list(
+            Dispatch.objects.filter(timestamp__lt=cutoff)
+            .order_by('timestamp', 'id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(_copy_sql() + '(%s)' % ', '.join(['%s'] * len(ids)), ids)
+        Dispatch.objects.filter(pk__in=ids).delete()
+    return len(ids)
+
+
+def archive_dispatches(cutoff, batch_size=5000, max_batches=None, pause=0):
+    """
+    Move every dispatch before ``cutoff`` to the archive, batch by batch.
+    Yields the number of rows moved by each batch.
+    """
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        if batches and pause:
+            time.sleep(pause)
+        moved = archive_batch(cutoff, batch_size)
+        if not moved:
+            return
+        batches += 1
+        yield moved
@@ -0,0 +1,98 @@
+# store_management/async_views.py
+"""
+Async versions of the read-heavy store manager views, routed in place of
+the sync ones when ASYNC_VIEWS is set (see store_management.urls).
+
+Under ASGI a sync view holds a worker thread for the whole request. These
+use the async ORM and start their independent queries together with
+asyncio.gather, so the request only waits for the database. Templates are
+rendered once every row has been read.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.shortcuts import render
+
+from inventory.models import Category
+from store_management.reports import DispatchReport, parse_date
+from store_management.roles import aselected_stores, store_manager_required
+from store_management.views import DASHBOARD_PAGE_SIZE, dashboard_page, dashboard_queryset, store_summaries
+
+
+async def _alist(queryset):
+    return [obj async for obj in queryset]
+
+
+async def _aget_page(queryset, per_page, number):
+    """dashboard_page() with the count and the page rows read asynchronously."""
+    paginator = Paginator(queryset, per_page)
+    # count is a cached_property: setting it first spares the sync query
+    paginator.count = await queryset.acount()
+    page = dashboard_page(paginator, number)
+    page.object_list = await _alist(page.object_list)
+    return page
+
+
+async def _none():
+    return None
+
+
+@login_required
+@store_manager_required
+async def store_manager_dashboard(request):
+    store, stores = await aselected_stores(request)
+    if not stores:
+        return await sync_to_async(render)(request, "store_management/store_manager_dashboard.html", {
+            "error": "You are not managing any store at the moment."
+        })
+
+    store_products, category, sort = dashboard_queryset(request, stores)
+    page, summaries, categories = await asyncio.gather(
+        _aget_page(store_products, DASHBOARD_PAGE_SIZE, request.GET.get("page")),
+        _alist(store_summaries(stores)) if store is None else _none(),
+        _alist(Category.objects.order_by("name")),
+    )
+    return await sync_to_async(render)(request, "store_management/store_manager_dashboard.html", {
+        "store": store,
+        "store_summaries": summaries,
+        "page_obj": page,
+        "store_products": page.object_list,
+        "categories": categories,
+        "category": category,
+        "sort": sort,
+    })
+
+
+@login_required
+@store_manager_required
+async def dispatch_report(request):
+    store, stores = await aselected_stores(request)
+    if not stores:
+        return await sync_to_async(render)(request, "store_management/dispatch_report.html", {
+            "error": "You are not assigned to any store."
+        })
+
+    start_date = request.GET.get("start_date")
+    end_date = request.GET.get("end_date")
+    report = DispatchReport(stores, parse_date(start_date), parse_date(end_date))
+
+    (dispatches, next_cursor), totals, by_product, by_store, by_day = await asyncio.gather(
+        report.apage(request.GET.get("cursor")),
+        report.atotals(),
+        report.aby_product(),
+        report.aby_store() if store is None else _none(),
+        report.aby_day(),
+    )
+    return await sync_to_async(render)(request, "store_management/dispatch_report.html", {
+        "store": store,
+        "dispatches": dispatches,
+        "next_cursor": next_cursor,
+        "totals": totals,
+        "by_product": by_product,
+        "by_store": by_store,
+        "by_day": by_day,
+        "start_date": start_date,
+        "end_date": end_date,
+    })
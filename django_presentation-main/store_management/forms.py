@@ -5,7 +5,7 @@ from .models import Dispatch
 class ProductUpdateForm(forms.ModelForm):
     class Meta:
         model = StoreProduct
-        fields = ['price', 'quantity']
+        fields = ['price', 'quantity', 'reorder_threshold']
 
     # Custom validation for stock to ensure it's non-negative
     def clean_stock(self):
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from store_management.archive import archive_cutoff, archive_dispatches, get_archive_after_days
+
+
+class Command(BaseCommand):
+    help = (
+        "Move dispatches older than DISPATCH_ARCHIVE_AFTER_DAYS into DispatchArchive, oldest "
+        "first, one short transaction per batch. Rollups are left in place, so report totals do "
+        "not change. Safe to interrupt: the next run carries on where the last one stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help="Archive dispatches older than this many days (defaults to DISPATCH_ARCHIVE_AFTER_DAYS).",
+        )
+        parser.add_argument('--batch-size', type=int, default=5000, help="Dispatches moved per transaction.")
+        parser.add_argument('--max-batches', type=int, default=None, help="Stop after this many batches.")
+        parser.add_argument(
+            '--pause', type=float, default=0.05,
+            help="Seconds to wait between batches, leaving the lock to other writers.",
+        )
+
+    def handle(self, *args, **options):
+        days = get_archive_after_days() if options['days'] is None else options['days']
+        if days < 0:
+            raise CommandError("--days must not be negative.")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        cutoff = archive_cutoff(days)
+        moved = batches = 0
+        for count in archive_dispatches(
+            cutoff, batch_size=options['batch_size'], max_batches=options['max_batches'], pause=options['pause'],
+        ):
+            moved += count
+            batches += 1
+            if options['verbosity'] > 1:
+                self.stdout.write(f"Batch {batches}: {count:,} dispatches")
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {moved:,} dispatches from before {cutoff:%Y-%m-%d} in {batches} batches."
+        ))
@@ -0,0 +1,206 @@
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+
+from store_management.roles import STORE_MANAGER_GROUP
+
+SERVERS = ('wsgi', 'asgi')
+URL_NAMES = ('store_manager_dashboard', 'dispatch_report', 'product-list', 'category-list')
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Send concurrent requests for the read-heavy pages straight to the WSGI handler (from a "
+        "thread pool, like a threaded WSGI server) and to the ASGI handler (from one event loop, "
+        "like uvicorn), and compare throughput and latency. With --server both, each server runs "
+        "in its own process, ASGI with ASYNC_VIEWS=1. Run seed_inventory first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', choices=SERVERS + ('both',), default='both')
+        parser.add_argument('--requests', type=int, default=400, help="Requests per server.")
+        parser.add_argument('--concurrency', type=int, default=16, help="Requests in flight at once.")
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON.")
+
+    def handle(self, *args, **options):
+        if options['server'] == 'both':
+            results = [self.run_in_process(server, options) for server in SERVERS]
+        else:
+            results = [self.run(options['server'], options['requests'], options['concurrency'])]
+        if options['json']:
+            self.stdout.write(json.dumps(results[0] if len(results) == 1 else results))
+            return
+        for result in results:
+            self.report(result)
+        if len(results) == 2 and results[0]['requests_per_second']:
+            wsgi, asgi = results
+            self.stdout.write(self.style.SUCCESS(
+                f"ASGI/WSGI throughput x{asgi['requests_per_second'] / wsgi['requests_per_second']:.2f}"
+            ))
+
+    def run_in_process(self, server, options):
+        """Run one server in a fresh process, so each gets its own URLconf and connections."""
+        env = {**os.environ, 'ASYNC_VIEWS': '1' if server == 'asgi' else '0'}
+        completed = subprocess.run(
+            [
+                sys.executable, str(settings.BASE_DIR / 'manage.py'), 'benchmark_asgi', '--json',
+                '--server', server, '--requests', str(options['requests']),
+                '--concurrency', str(options['concurrency']),
+            ],
+            env=env, capture_output=True, text=True,
+        )
+        if completed.returncode:
+            raise CommandError(f"The {server} run failed:\n{completed.stderr}")
+        return json.loads(completed.stdout)
+
+    def headers(self):
+        """Host and session cookie of a seeded store manager."""
+        user = User.objects.filter(groups__name=STORE_MANAGER_GROUP, stores__isnull=False).order_by('pk').first()
+        if user is None:
+            raise CommandError("No store managers found; run seed_inventory first.")
+        client = Client()
+        client.force_login(user)
+        cookie = client.cookies[settings.SESSION_COOKIE_NAME].value
+        connections.close_all()
+        return {'host': 'localhost', 'cookie': f'{settings.SESSION_COOKIE_NAME}={cookie}'}
+
+    def run(self, server, requests, concurrency):
+        headers = self.headers()
+        paths = [(name, reverse(name)) for name in URL_NAMES]
+        plan = [paths[i % len(paths)] for i in range(requests)]
+        runner = self.run_asgi if server == 'asgi' else self.run_wsgi
+
+        started = time.perf_counter()
+        timings = runner(plan, headers, concurrency)
+        elapsed = time.perf_counter() - started
+
+        ok = [(name, ms) for name, status, ms in timings if status < 400]
+        errors = [status for _, status, _ in timings if status >= 400]
+        if not ok:
+            raise CommandError(f"Every {server} request failed (status {errors[0]}).")
+        by_url = {}
+        for name, _ in paths:
+            latencies = [ms for url, ms in ok if url == name]
+            if latencies:
+                by_url[name] = {
+                    'p50_ms': round(statistics.median(latencies), 2),
+                    'p95_ms': round(_percentile(latencies, 0.95), 2),
+                }
+        return {
+            'server': server,
+            'async_views': settings.ASYNC_VIEWS,
+            'requests': len(ok),
+            'errors': len(errors),
+            'requests_per_second': round(len(ok) / elapsed, 1),
+            'p50_ms': round(statistics.median(ms for _, ms in ok), 2),
+            'p95_ms': round(_percentile([ms for _, ms in ok], 0.95), 2),
+            'urls': by_url,
+        }
+
+    def run_wsgi(self, plan, headers, concurrency):
+        application = get_wsgi_application()
+
+        def call(item):
+            name, path = item
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+                'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+                'HTTP_HOST': headers['host'], 'HTTP_COOKIE': headers['cookie'],
+                'wsgi.input': BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+                'wsgi.version': (1, 0), 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+                'wsgi.run_once': False,
+            }
+            status = []
+            started = time.perf_counter()
+            body = application(environ, lambda line, response_headers, exc_info=None: status.append(line))
+            try:
+                for _ in body:
+                    pass
+            finally:
+                body.close()
+            return name, int(status[0].split()[0]), (time.perf_counter() - started) * 1000
+
+        def worker(items):
+            try:
+                return [call(item) for item in items]
+            finally:
+                connections.close_all()
+
+        chunks = [plan[i::concurrency] for i in range(concurrency)]
+        with ThreadPoolExecutor(concurrency) as pool:
+            return [timing for timings in pool.map(worker, chunks) for timing in timings]
+
+    def run_asgi(self, plan, headers, concurrency):
+        application = get_asgi_application()
+        raw_headers = [(key.encode(), value.encode()) for key, value in headers.items()]
+
+        async def call(name, path):
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'root_path': '',
+                'query_string': b'', 'headers': raw_headers,
+                'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+            }
+            request_sent = False
+            status = []
+
+            async def receive():
+                nonlocal request_sent
+                if not request_sent:
+                    request_sent = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                # The client stays connected; Django cancels this wait
+                await asyncio.Future()
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+
+            started = time.perf_counter()
+            await application(scope, receive, send)
+            return name, status[0], (time.perf_counter() - started) * 1000
+
+        async def main():
+            slots = asyncio.Semaphore(concurrency)
+
+            async def limited(name, path):
+                async with slots:
+                    return await call(name, path)
+
+            return await asyncio.gather(*(limited(name, path) for name, path in plan))
+
+        try:
+            return asyncio.run(main())
+        finally:
+            connections.close_all()
+
+    def report(self, result):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{result['server'].upper()} (async views {'on' if result['async_views'] else 'off'})"
+        ))
+        self.stdout.write(
+            f"  {result['requests_per_second']:>8} req/s  p50 {result['p50_ms']:>8} ms  "
+            f"p95 {result['p95_ms']:>8} ms  {result['errors']} errors"
+        )
+        for name, timings in result['urls'].items():
+            self.stdout.write(f"  {name:<24} p50 {timings['p50_ms']:>8} ms  p95 {timings['p95_ms']:>8} ms")
@@ -0,0 +1,168 @@
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connection, connections
+from django.db.backends.signals import connection_created
+
+from inventory.models import Category, Product, Store, StoreProduct
+from inventory_manage.db import configure_sqlite
+from store_management import stock
+
+STORE_NAME = 'Write benchmark'
+
+
+class Command(BaseCommand):
+    help = (
+        "Record dispatches from concurrent threads, each write ending like a request, and "
+        "compare write throughput, latency and lock errors with and without the database "
+        "profile's tuning (see inventory_manage.db)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help="Writer threads.")
+        parser.add_argument('--readers', type=int, default=4, help="Threads reading the store's stock meanwhile.")
+        parser.add_argument('--seconds', type=float, default=5, help="Duration of each run.")
+        parser.add_argument(
+            '--products', type=int, default=10,
+            help="Store products written to; fewer means more contention on the same rows.",
+        )
+
+    def handle(self, *args, **options):
+        store_products = self.setup(options['products'])
+        try:
+            if connection.vendor == 'sqlite':
+                modes = [('sqlite defaults', self.sqlite_defaults), ('sqlite tuned', self.configured)]
+            else:
+                modes = [('connection per request', self.connection_per_request), ('configured', self.configured)]
+            results = []
+            for label, mode in modes:
+                with mode() as end_request:
+                    result = self.run(store_products, options, end_request)
+                results.append((label, result))
+                self.stdout.write(
+                    f"{label:<24} {result['writes_per_second']:>8.1f} writes/s  "
+                    f"p50 {result['p50_ms']:>7.2f} ms  p95 {result['p95_ms']:>7.2f} ms  "
+                    f"p99 {result['p99_ms']:>7.2f} ms  {result['errors']} lock errors  "
+                    f"{result['reads_per_second']:>8.1f} reads/s"
+                )
+            (_, before), (_, after) = results
+            if before['writes_per_second']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"x{after['writes_per_second'] / before['writes_per_second']:.1f} write throughput"
+                ))
+        finally:
+            Store.objects.filter(name=STORE_NAME).delete()
+            Product.objects.filter(name__startswith='Write benchmark product').delete()
+
+    def setup(self, count):
+        Store.objects.filter(name=STORE_NAME).delete()
+        owner, _ = User.objects.get_or_create(username='benchmark-owner')
+        category, _ = Category.objects.get_or_create(name='Benchmark')
+        store = Store.objects.create(name=STORE_NAME, address='Benchmark street', owner=owner)
+        products = Product.objects.bulk_create(
+            Product(name=f'Write benchmark product {i}', category=category) for i in range(count)
+        )
+        return StoreProduct.objects.bulk_create(
+            StoreProduct(store=store, product=product, price=1, quantity=10 ** 9) for product in products
+        )
+
+    @contextmanager
+    def configured(self):
+        # Connections are kept or closed exactly as at the end of a request
+        yield close_old_connections
+
+    @contextmanager
+    def connection_per_request(self):
+        yield connection.close
+
+    @contextmanager
+    def sqlite_defaults(self):
+        """Plain SQLite connections: rollback journal, deferred transactions, no pragmas."""
+        options = connections.settings[connection.alias]['OPTIONS']
+        transaction_mode = options.pop('transaction_mode', None)
+        connection_created.disconnect(configure_sqlite, dispatch_uid='inventory_manage.db.configure_sqlite')
+        connection.close()
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode = DELETE')
+        connection.close()
+        try:
+            yield close_old_connections
+        finally:
+            if transaction_mode:
+                options['transaction_mode'] = transaction_mode
+            connection_created.connect(configure_sqlite, dispatch_uid='inventory_manage.db.configure_sqlite')
+            # Switch the file back to WAL before any thread connects
+            connection.close()
+            connection.ensure_connection()
+            connection.close()
+
+    def run(self, store_products, options, end_request):
+        latencies, errors, reads = [], [], []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options['seconds']
+        store_id = store_products[0].store_id
+
+        def writer(number):
+            done, failed = [], 0
+            try:
+                while time.perf_counter() < deadline:
+                    store_product = store_products[(number + len(done) + failed) % len(store_products)]
+                    started = time.perf_counter()
+                    try:
+                        stock.record_dispatch(store_product, 1)
+                    except OperationalError:
+                        failed += 1
+                    else:
+                        done.append((time.perf_counter() - started) * 1000)
+                    finally:
+                        end_request()
+            finally:
+                connection.close()
+                with lock:
+                    latencies.extend(done)
+                    errors.append(failed)
+
+        def reader():
+            done = 0
+            try:
+                while time.perf_counter() < deadline:
+                    try:
+                        list(StoreProduct.objects.filter(store_id=store_id).order_by('quantity')[:50])
+                    except OperationalError:
+                        pass
+                    else:
+                        done += 1
+                    finally:
+                        end_request()
+            finally:
+                connection.close()
+                with lock:
+                    reads.append(done)
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(options['threads'])]
+        threads += [threading.Thread(target=reader) for _ in range(options['readers'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+
+        def percentile(fraction):
+            return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] if latencies else 0
+
+        return {
+            'writes': len(latencies),
+            'errors': sum(errors),
+            'writes_per_second': len(latencies) / elapsed,
+            'reads_per_second': sum(reads) / elapsed,
+            'p50_ms': statistics.median(latencies) if latencies else 0,
+            'p95_ms': percentile(0.95),
+            'p99_ms': percentile(0.99),
+        }
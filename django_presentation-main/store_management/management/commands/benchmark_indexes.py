@@ -0,0 +1,196 @@
+import datetime
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, models, transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from inventory.models import Category, Product, Store, StoreProduct
+from inventory.synthetic import BENCHMARK_OWNER, check_disposable
+from store_management.models import Dispatch
+from store_management.reports import DispatchReport, day_start
+
+
+class Rollback(Exception):
+    pass
+
+
+# Indexes added for the hot query paths, and the single-column foreign key
+# indexes they replaced. Swapping one set for the other recreates the old
+# schema for the "before" measurements.
+NEW_INDEXES = [
+    (Dispatch, 'dispatch_sp_timestamp_idx'),
+    (Dispatch, 'dispatch_timestamp_idx'),
+    (Product, 'product_name_idx'),
+    (Product, 'product_category_name_idx'),
+    (Store, 'store_owner_name_idx'),
+    (StoreProduct, 'storeproduct_store_qty_idx'),
+]
+OLD_INDEXES = [
+    (Dispatch, models.Index(fields=['store_product'], name='bench_dispatch_sp_idx')),
+    (Product, models.Index(fields=['category'], name='bench_product_category_idx')),
+    (Store, models.Index(fields=['owner'], name='bench_store_owner_idx')),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed synthetic dispatches into the configured database and print the report "
+        "and dashboard query plans and timings before and after the hot-path indexes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dispatches', type=int, default=1_000_000, help="Dispatch rows to have in the database.")
+        parser.add_argument('--stores', type=int, default=50)
+        parser.add_argument('--products', type=int, default=200)
+        parser.add_argument('--days', type=int, default=365, help="Spread dispatches over this many past days.")
+        parser.add_argument('--repeat', type=int, default=5, help="Best-of runs per query.")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--yes', action='store_true',
+            help="Seed even though the database holds real data. Prefer a dedicated DB_NAME.",
+        )
+
+    def handle(self, *args, **options):
+        self.repeat = options['repeat']
+        missing = options['dispatches'] - Dispatch.objects.count()
+        if missing > 0:
+            check_disposable(f"add {missing:,} synthetic dispatches", force=options['yes'])
+            self.seed(missing, options)
+
+        store = Store.objects.order_by('pk').first()
+        queries = self.queries(store, options['days'])
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Without hot-path indexes (original schema)"))
+        try:
+            with transaction.atomic():
+                self.swap_indexes()
+                before = self.measure(queries)
+                # Restore the real schema; DDL is transactional on SQLite and PostgreSQL.
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(self.style.MIGRATE_HEADING("With hot-path indexes"))
+        after = self.measure(queries)
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Summary (best of %d, ms)" % self.repeat))
+        for label in queries:
+            speedup = before[label] / after[label] if after[label] else float('inf')
+            self.stdout.write(f"{label:<40} {before[label]:>10.2f} {after[label]:>10.2f}  x{speedup:.1f}")
+
+    def queries(self, store, days):
+        today = timezone.localdate()
+        month_ago = today - datetime.timedelta(days=30)
+        report = DispatchReport(store, month_ago, today)
+        one_day = Dispatch.objects.filter(
+            timestamp__gte=day_start(today - datetime.timedelta(days=days // 2)),
+            timestamp__lt=day_start(today - datetime.timedelta(days=days // 2 - 1)),
+        )
+        return {
+            'report: listing page (30 days)': lambda: report.rows()[:50],
+            'report: raw totals (30 days)': lambda: report.get_queryset().values('store_product__store').annotate(
+                quantity=Sum('quantity_sold'), revenue=Sum('total_amount'), count=Count('id')),
+            'rollup rebuild: one day grouped': lambda: one_day.values('store_product_id').annotate(
+                quantity=Sum('quantity_sold')).order_by(),
+            'dashboard: store products by stock': lambda: StoreProduct.objects.filter(store=store)
+                .select_related('product__category').order_by('quantity')[:50],
+            'manager: stores of owner': lambda: Store.objects.filter(owner_id=store.owner_id).order_by('name'),
+            'catalog: products by name prefix': lambda: Product.objects.filter(name__startswith='Product 1')
+                .order_by('name')[:50],
+        }
+
+    def measure(self, queries):
+        timings = {}
+        for label, build in queries.items():
+            self.stdout.write(self.style.SQL_KEYWORD(label))
+            self.stdout.write(build().explain())
+            best = None
+            for _ in range(self.repeat):
+                started = time.perf_counter()
+                list(build())
+                elapsed = (time.perf_counter() - started) * 1000
+                best = elapsed if best is None else min(best, elapsed)
+            timings[label] = best
+            self.stdout.write(f"  {best:.2f} ms\n")
+        return timings
+
+    def swap_indexes(self):
+        # Only used to render DDL; entering it would refuse to run inside
+        # the transaction on SQLite.
+        editor = connection.schema_editor()
+        editor.deferred_sql = []
+        with connection.cursor() as cursor:
+            for model, name in NEW_INDEXES:
+                index = next(index for index in model._meta.indexes if index.name == name)
+                cursor.execute(str(index.remove_sql(model, editor)))
+            for model, index in OLD_INDEXES:
+                cursor.execute(str(index.create_sql(model, editor)))
+
+    def seed(self, count, options):
+        rng = random.Random(options['seed'])
+        self.stdout.write(f"Seeding {count} dispatches...")
+        started = time.perf_counter()
+
+        # Only the benchmark's own stores and products are stocked and
+        # dispatched from; other stores never get the synthetic products.
+        with transaction.atomic():
+            owner, _ = User.objects.get_or_create(username=BENCHMARK_OWNER)
+            category, _ = Category.objects.get_or_create(name='Benchmark')
+            bench_stores = Store.objects.filter(owner=owner)
+            bench_products = Product.objects.filter(category=category)
+            have = bench_stores.count()
+            Store.objects.bulk_create(
+                Store(name=f'Bench store {i}', address='Benchmark street', owner=owner)
+                for i in range(have, options['stores'])
+            )
+            have = bench_products.count()
+            Product.objects.bulk_create(
+                Product(name=f'Product {i}', category=category) for i in range(have, options['products'])
+            )
+            stores = list(bench_stores.values_list('pk', flat=True))
+            products = list(bench_products.values_list('pk', flat=True))
+            existing = set(StoreProduct.objects.filter(store__owner=owner).values_list('store_id', 'product_id'))
+            StoreProduct.objects.bulk_create(
+                (
+                    StoreProduct(store_id=s, product_id=p, price=Decimal('2.50'), quantity=rng.randint(0, 500))
+                    for s in stores for p in products if (s, p) not in existing
+                ),
+                batch_size=1000,
+            )
+
+        store_products = list(StoreProduct.objects.filter(store__owner=owner).values_list('pk', 'price'))
+        ops = connection.ops
+        now = timezone.now()
+        table = Dispatch._meta.db_table
+        columns = ['store_product_id', 'quantity_sold', 'discount', 'total_amount', 'timestamp', 'sold_by_id']
+        # Raw executemany: bulk_create would overwrite the spread timestamps
+        # (auto_now_add) and build a model instance per row.
+        sql = 'INSERT INTO %s (%s) VALUES (%s)' % (
+            connection.ops.quote_name(table),
+            ', '.join(ops.quote_name(column) for column in columns),
+            ', '.join(['%s'] * len(columns)),
+        )
+        chunk = 10_000
+        with connection.cursor() as cursor:
+            for offset in range(0, count, chunk):
+                rows = []
+                for _ in range(min(chunk, count - offset)):
+                    pk, price = rng.choice(store_products)
+                    quantity = rng.randint(1, 5)
+                    timestamp = now - datetime.timedelta(seconds=rng.randint(0, options['days'] * 86400))
+                    rows.append((
+                        pk, quantity, ops.adapt_decimalfield_value(Decimal(0), 5, 2),
+                        ops.adapt_decimalfield_value(price * quantity, 10, 2),
+                        ops.adapt_datetimefield_value(timestamp), None,
+                    ))
+                with transaction.atomic():
+                    cursor.executemany(sql, rows)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"Seeded in {elapsed:.1f}s ({count / elapsed:,.0f} rows/s). "
+                          "Run rebuild_sales_rollup to roll them up.")
@@ -0,0 +1,84 @@
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from inventory.models import StoreProduct
+from inventory_manage.sessions import SESSION_PROFILES, session_config
+from store_management.management.commands.seed_inventory import PASSWORD
+from store_management.roles import STORE_MANAGER_GROUP
+
+WRITES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class Command(BaseCommand):
+    help = (
+        "Walk a store manager through the dispatch flow (log in, open the dashboard, record a "
+        "dispatch and see its message, log out) under each session profile, and count the "
+        "database writes and session reads per flow. Run seed_inventory first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--flows', type=int, default=20, help="Flows per profile.")
+        parser.add_argument('--profile', action='append', dest='profiles', choices=list(SESSION_PROFILES))
+
+    def handle(self, *args, **options):
+        manager = (
+            User.objects.filter(groups__name=STORE_MANAGER_GROUP, username__startswith='seed-manager-')
+            .order_by('pk').first()
+        )
+        store_product = manager and StoreProduct.objects.filter(store__owner=manager, quantity__gt=0).first()
+        if store_product is None:
+            raise CommandError("No seeded store manager with stock found; run seed_inventory first.")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("per flow"))
+        for profile in options['profiles'] or SESSION_PROFILES:
+            session_engine, message_storage = session_config(profile)
+            caches['sessions'].clear()
+            with override_settings(SESSION_ENGINE=session_engine, MESSAGE_STORAGE=message_storage):
+                result = self.run(manager, store_product, options['flows'])
+            self.stdout.write(
+                f"{profile:<10} {result['session_writes']:>5.1f} session writes  "
+                f"{result['session_reads']:>5.1f} session reads  {result['other_writes']:>5.1f} other writes  "
+                f"{result['ms']:>8.1f} ms"
+            )
+
+    def run(self, manager, store_product, flows):
+        statements = []
+
+        def record(execute, sql, params, many, context):
+            statements.append(sql)
+            return execute(sql, params, many, context)
+
+        timings = []
+        with connection.execute_wrapper(record):
+            for _ in range(flows):
+                # A new client per flow: a terminal starting from the login page
+                client = Client(HTTP_HOST='localhost')
+                started = time.perf_counter()
+                response = client.post(
+                    reverse('login'), {'username': manager.username, 'password': PASSWORD}, follow=True
+                )
+                if response.status_code != 200 or not response.redirect_chain:
+                    raise CommandError(f"Logging in as {manager.username} failed.")
+                client.post(reverse('record_dispatch'), {
+                    'store_product': store_product.pk, 'quantity_sold': 1, 'discount': '0',
+                }, follow=True)
+                client.get(reverse('logout'))
+                timings.append((time.perf_counter() - started) * 1000)
+
+        counts = {'session_writes': 0, 'session_reads': 0, 'other_writes': 0}
+        for sql in statements:
+            write = sql.lstrip().upper().startswith(WRITES)
+            if 'django_session' in sql:
+                counts['session_writes' if write else 'session_reads'] += 1
+            elif write:
+                counts['other_writes'] += 1
+        result = {name: count / flows for name, count in counts.items()}
+        result['ms'] = statistics.median(timings)
+        return result
@@ -0,0 +1,213 @@
+import datetime
+import json
+import logging
+import random
+import statistics
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from inventory.models import Category, Store, StoreProduct
+from inventory.synthetic import SEED_MANAGER_PREFIX, check_disposable
+from store_management.roles import STORE_MANAGER_GROUP
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'workflows.json'
+SCENARIOS = ('store_manager_dashboard', 'dispatch_report', 'record_dispatch', 'product-create')
+# Scenarios that write; new products are added to every store
+WRITE_SCENARIOS = ('record_dispatch', 'product-create')
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the store workflows through their real URLs with concurrent test clients and "
+        "report requests/sec, p50/p95/p99 latency and queries per request. Run seed_inventory first; "
+        "only its managers are logged in as."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Requests per scenario.")
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument(
+            '--scenario', action='append', dest='scenarios', choices=SCENARIOS,
+            help="Only run this scenario (can be repeated).",
+        )
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help="Baseline JSON file.")
+        parser.add_argument('--save-baseline', action='store_true', help="Store these results as the baseline.")
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help="Flag results this much worse than the baseline (0.2 = 20%%).",
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--yes', action='store_true',
+            help="Run the writing scenarios even if the database holds stores seed_inventory did not create.",
+        )
+
+    def handle(self, *args, **options):
+        scenarios = options['scenarios'] or SCENARIOS
+        if set(scenarios) & set(WRITE_SCENARIOS):
+            check_disposable("record benchmark dispatches and products", force=options['yes'])
+        self.rng = random.Random(options['seed'])
+        self.targets = self.load_targets()
+        results = {}
+        for scenario in scenarios:
+            results[scenario] = self.run(scenario, options['requests'], options['threads'])
+            self.report(scenario, results[scenario])
+
+        baseline_path = Path(options['baseline'])
+        if baseline_path.exists():
+            self.compare(json.loads(baseline_path.read_text())['results'], results, options['tolerance'])
+        if options['save_baseline']:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps({
+                'recorded_at': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'threads': options['threads'],
+                'results': results,
+            }, indent=2))
+            self.stdout.write(f"Baseline saved to {baseline_path}")
+
+    def load_targets(self):
+        """Seeded managers with their store's products, and a category for new products."""
+        stores = list(
+            Store.objects.filter(
+                owner__groups__name=STORE_MANAGER_GROUP, owner__username__startswith=SEED_MANAGER_PREFIX,
+            ).order_by('pk').values_list('pk', 'owner_id')[:50]
+        )
+        if not stores:
+            raise CommandError("No seeded store managers found; run seed_inventory first.")
+        targets = []
+        for store_id, owner_id in stores:
+            store_products = list(
+                StoreProduct.objects.filter(store_id=store_id, quantity__gt=0).values_list('pk', flat=True)[:200]
+            )
+            if store_products:
+                targets.append((User.objects.get(pk=owner_id), store_products))
+        self.category_id = Category.objects.values_list('pk', flat=True).first()
+        return targets
+
+    def request(self, client, scenario, store_products, number):
+        if scenario == 'store_manager_dashboard':
+            return client.get(reverse('store_manager_dashboard'), {'page': self.rng.randint(1, 5)})
+        if scenario == 'dispatch_report':
+            start = timezone.localdate() - datetime.timedelta(days=30)
+            return client.get(reverse('dispatch_report'), {'start_date': start.isoformat()})
+        if scenario == 'record_dispatch':
+            return client.post(reverse('record_dispatch'), {
+                'store_product': self.rng.choice(store_products), 'quantity_sold': 1, 'discount': '0',
+            })
+        return client.post(reverse('product-create'), {
+            'name': f'Benchmark product {time.time_ns()} {number}',
+            'category': self.category_id,
+            'description': '',
+        })
+
+    def run(self, scenario, requests, threads):
+        latencies, queries, errors = [], [], []
+        lock = threading.Lock()
+        counter = iter(range(requests))
+
+        def worker(user, store_products):
+            client = Client(HTTP_HOST='localhost')
+            client.force_login(user)
+            count = [0]
+
+            def count_queries(execute, sql, params, many, context):
+                count[0] += 1
+                return execute(sql, params, many, context)
+
+            try:
+                with connection.execute_wrapper(count_queries):
+                    while True:
+                        with lock:
+                            number = next(counter, None)
+                        if number is None:
+                            break
+                        count[0] = 0
+                        started = time.perf_counter()
+                        try:
+                            response = self.request(client, scenario, store_products, number)
+                            failed = response.status_code >= 400
+                        except Exception as exc:  # e.g. "database is locked" under write contention
+                            failed = exc
+                        elapsed = (time.perf_counter() - started) * 1000
+                        with lock:
+                            if failed:
+                                errors.append(repr(failed))
+                            else:
+                                latencies.append(elapsed)
+                                queries.append(count[0])
+            finally:
+                connection.close()
+
+        # Failures are counted and summarised below rather than logged one by one
+        request_logger = logging.getLogger('django.request')
+        level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        workers = [
+            threading.Thread(target=worker, args=self.targets[i % len(self.targets)])
+            for i in range(threads)
+        ]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        request_logger.setLevel(level)
+
+        if not latencies:
+            raise CommandError(f"Every {scenario} request failed: {errors[:3]}")
+        return {
+            'requests': len(latencies),
+            'errors': len(errors),
+            'requests_per_second': round(len(latencies) / elapsed, 1),
+            'p50_ms': round(_percentile(latencies, 0.50), 2),
+            'p95_ms': round(_percentile(latencies, 0.95), 2),
+            'p99_ms': round(_percentile(latencies, 0.99), 2),
+            'queries_per_request': round(statistics.mean(queries), 1),
+            'first_error': errors[0] if errors else None,
+        }
+
+    def report(self, scenario, result):
+        self.stdout.write(
+            f"{scenario:<24} {result['requests_per_second']:>8} req/s  p50 {result['p50_ms']:>8} ms  "
+            f"p95 {result['p95_ms']:>8} ms  p99 {result['p99_ms']:>8} ms  "
+            f"{result['queries_per_request']:>6} queries  {result['errors']} errors"
+        )
+        if result['first_error']:
+            self.stdout.write(self.style.WARNING(f"  first error: {result['first_error']}"))
+
+    def compare(self, baseline, results, tolerance):
+        self.stdout.write(self.style.MIGRATE_HEADING("Compared with the baseline"))
+        for scenario, result in results.items():
+            before = baseline.get(scenario)
+            if not before:
+                continue
+            changes = {
+                'req/s': (before['requests_per_second'], result['requests_per_second'], True),
+                'p95 ms': (before['p95_ms'], result['p95_ms'], False),
+                'queries': (before['queries_per_request'], result['queries_per_request'], False),
+            }
+            parts = []
+            regressed = False
+            for label, (old, new, higher_is_better) in changes.items():
+                change = (new - old) / old if old else 0
+                worse = -change if higher_is_better else change
+                regressed |= worse > tolerance
+                parts.append(f"{label} {old} -> {new} ({change:+.0%})")
+            style = self.style.ERROR if regressed else self.style.SUCCESS
+            self.stdout.write(style(f"{scenario:<24} " + ", ".join(parts)))
@@ -0,0 +1,57 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from store_management import profiling
+
+
+def _fmt(value):
+    return "over" if value is None else str(value)
+
+
+class Command(BaseCommand):
+    help = (
+        "Print per-view percentiles of wall time, query count and time and response size "
+        "recorded by ProfilingMiddleware, slowest p95 first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--windows', type=int, help="Only merge this many of the most recent windows.")
+        parser.add_argument('--json', action='store_true', help="Print the rows as JSON.")
+
+    def handle(self, *args, **options):
+        if not profiling.is_shared():
+            # This process has its own, empty copy of a local-memory cache
+            raise CommandError(
+                f"PROFILING_CACHE '{getattr(settings, 'PROFILING_CACHE', 'default')}' is kept in each "
+                "process's memory, so the stats the web workers recorded are not visible here. Point "
+                "it at a shared cache backend, or read /admin-dashboard/profiling/ from a worker."
+            )
+        rows = profiling.summarize(profiling.collect(options['windows']))
+        if options['json']:
+            self.stdout.write(json.dumps(rows, indent=2))
+            return
+        if not settings.PROFILING_ENABLED:
+            self.stdout.write(self.style.WARNING("PROFILING_ENABLED is off; showing whatever is still cached."))
+        if not rows:
+            self.stdout.write("No requests recorded.")
+            return
+
+        # Percentiles are bucket upper bounds ("over" = above the last bucket)
+        self.stdout.write(
+            f"{'view':<36} {'reqs':>6} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} "
+            f"{'db ms':>7} {'p95 q':>6} {'dupes':>6} {'p95 bytes':>10}"
+        )
+        for row in rows:
+            self.stdout.write(
+                f"{row['view'][:36]:<36} {row['requests']:>6} {_fmt(row['wall_ms_p50']):>7} "
+                f"{_fmt(row['wall_ms_p95']):>7} {_fmt(row['wall_ms_p99']):>7} {row['db_ms_mean']:>7} "
+                f"{_fmt(row['queries_p95']):>6} {row['duplicate_queries']:>6} {_fmt(row['bytes_p95']):>10}"
+            )
+        for row in rows:
+            if row['most_repeated']:
+                sql, count = row['most_repeated']
+                self.stdout.write(self.style.WARNING(
+                    f"{row['view']}: possible N+1, one statement ran {count} times in a request: {sql[:200]}"
+                ))
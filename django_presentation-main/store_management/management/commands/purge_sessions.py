@@ -0,0 +1,41 @@
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired database sessions in small batches, each its own short write, so that "
+        "dispatches waiting for the database lock are never held up for long (clearsessions "
+        "deletes them all in one statement). Schedule it, e.g. hourly from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Sessions deleted per statement.")
+        parser.add_argument(
+            '--pause', type=float, default=0.05,
+            help="Seconds to wait between batches, leaving the lock to other writers.",
+        )
+
+    def handle(self, *args, **options):
+        store = import_module(settings.SESSION_ENGINE).SessionStore
+        if not hasattr(store, 'get_model_class'):
+            self.stdout.write(f"{settings.SESSION_ENGINE} keeps no sessions in the database; nothing to purge.")
+            return
+        Session = store.get_model_class()
+        now = timezone.now()
+        deleted = batches = 0
+        while True:
+            keys = list(
+                Session.objects.filter(expire_date__lt=now).values_list('pk', flat=True)[:options['batch_size']]
+            )
+            if not keys:
+                break
+            if batches:
+                time.sleep(options['pause'])
+            deleted += Session.objects.filter(pk__in=keys).delete()[0]
+            batches += 1
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted:,} expired sessions in {batches} batches."))
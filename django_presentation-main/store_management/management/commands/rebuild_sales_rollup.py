@@ -0,0 +1,54 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from inventory.models import Store
+from store_management.models import Dispatch, DispatchArchive
+from store_management.rollups import rebuild
+
+
+def parse_day(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Invalid date '{value}', expected YYYY-MM-DD.")
+
+
+class Command(BaseCommand):
+    help = "Rebuild or backfill the DailyStoreProductSales rollup from raw and archived dispatches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=parse_day, help="First day to rebuild (defaults to the oldest dispatch).")
+        parser.add_argument('--end', type=parse_day, help="Last day to rebuild (defaults to today).")
+        parser.add_argument(
+            '--store', type=int, action='append', dest='stores',
+            help="Only rebuild this store id (can be repeated).",
+        )
+
+    def handle(self, *args, **options):
+        start, end = options['start'], options['end']
+        if start is None or end is None:
+            bounds = [
+                model.objects.aggregate(first=Min('timestamp'), last=Max('timestamp'))
+                for model in (DispatchArchive, Dispatch)
+            ]
+            firsts = [b['first'] for b in bounds if b['first'] is not None]
+            if not firsts:
+                self.stdout.write("No dispatches to roll up.")
+                return
+            lasts = [b['last'] for b in bounds if b['last'] is not None]
+            start = start or timezone.localdate(min(firsts))
+            end = end or max(timezone.localdate(max(lasts)), timezone.localdate())
+        if start > end:
+            raise CommandError("--start must not be after --end.")
+
+        stores = None
+        if options['stores']:
+            stores = Store.objects.filter(pk__in=options['stores'])
+
+        written = rebuild(start, end, stores=stores)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {written} rollup rows from {start} to {end}."
+        ))
@@ -0,0 +1,317 @@
+import datetime
+import random
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from inventory.catalog import bump_catalog_version
+from inventory.models import Category, Product, StockMovement, Store, StoreProduct
+from inventory.search import get_backend
+from store_management.models import DailyStoreProductSales, Dispatch
+from store_management.reports import day_start
+from store_management.roles import STORE_MANAGER_GROUP
+
+# Every seeded manager logs in with this password
+PASSWORD = 'benchmark'
+
+# Applied for the duration of the load only. Everything is written in one
+# transaction, so losing durability on a crash just means seeding again.
+SQLITE_BULK_PRAGMAS = {
+    'synchronous': 'OFF',
+    'cache_size': '-262144',  # 256 MiB of page cache
+    'temp_store': 'MEMORY',
+    'threads': '4',  # helper threads for the sorts that build the deferred indexes
+}
+
+
+def _insert_sql(model, columns):
+    quote = connection.ops.quote_name
+    return 'INSERT INTO %s (%s) VALUES (%s)' % (
+        quote(model._meta.db_table),
+        ', '.join(quote(column) for column in columns),
+        ', '.join(['%s'] * len(columns)),
+    )
+
+
+def _timestamp_param():
+    """
+    Function turning a naive datetime in the connection's time zone into a
+    query parameter. SQLite stores datetimes as that text, so it is produced
+    directly instead of going through adapt_datetimefield_value's time zone
+    checks for every row.
+    """
+    if connection.vendor == 'sqlite':
+        return str
+    return lambda value: connection.ops.adapt_datetimefield_value(timezone.make_aware(value, connection.timezone))
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed synthetic store managers, stores, categories, products, store products and "
+        "dispatch history at a configurable scale. The same --seed and --end-date always "
+        "produce the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stores', type=int, default=20, help="Stores, each with its own manager.")
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--products', type=int, default=500, help="Products, stocked by every store.")
+        parser.add_argument('--dispatches', type=int, default=100_000)
+        parser.add_argument('--days', type=int, default=90, help="Spread dispatches over this many days.")
+        parser.add_argument(
+            '--end-date', type=datetime.date.fromisoformat, default=None,
+            help="Last day of the dispatch history (YYYY-MM-DD, default today).",
+        )
+        parser.add_argument('--chunk-size', type=int, default=10_000, help="Rows per executemany call.")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if User.objects.filter(username='seed-manager-0').exists():
+            raise CommandError("This database is already seeded; seed a fresh one.")
+
+        self.rng = random.Random(options['seed'])
+        self.chunk_size = options['chunk_size']
+        self.rows = 0
+        started = time.perf_counter()
+
+        with self.bulk_load(), transaction.atomic(), connection.cursor() as cursor:
+            self.cursor = cursor
+            managers, stores, categories = self.seed_owners(options)
+            store_products = self.seed_catalog(stores, categories, options)
+            self.seed_history(store_products, managers, stores, options)
+            # Explicit ids leave sequences behind on PostgreSQL; a no-op on SQLite
+            for sql in connection.ops.sequence_reset_sql(no_style(), [Product, StoreProduct]):
+                cursor.execute(sql)
+
+        # Raw inserts send no signals: refresh what they would have
+        get_backend().rebuild()
+        bump_catalog_version()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {self.rows:,} rows in {elapsed:.1f}s ({self.rows / elapsed:,.0f} rows/s). "
+            f"Managers log in as seed-manager-<n> / {PASSWORD}."
+        ))
+
+    @contextmanager
+    def bulk_load(self):
+        # SQLite refuses to change the safety level inside a transaction,
+        # e.g. when called from another atomic block
+        if connection.vendor != 'sqlite' or connection.in_atomic_block:
+            yield
+            return
+        previous = {}
+        with connection.cursor() as cursor:
+            for pragma, value in SQLITE_BULK_PRAGMAS.items():
+                cursor.execute(f'PRAGMA {pragma}')
+                previous[pragma] = cursor.fetchone()[0]
+                cursor.execute(f'PRAGMA {pragma} = {value}')
+        try:
+            yield
+        finally:
+            with connection.cursor() as cursor:
+                for pragma, value in previous.items():
+                    cursor.execute(f'PRAGMA {pragma} = {value}')
+
+    def insert(self, model, columns, rows):
+        """executemany ``rows`` into ``model``'s table, ``chunk_size`` rows per call."""
+        sql = _insert_sql(model, columns)
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == self.chunk_size:
+                self.cursor.executemany(sql, chunk)
+                self.rows += len(chunk)
+                chunk = []
+        if chunk:
+            self.cursor.executemany(sql, chunk)
+            self.rows += len(chunk)
+
+    def seed_owners(self, options):
+        # A few rows each: the ORM is fast enough and fills in the defaults
+        group, _ = Group.objects.get_or_create(name=STORE_MANAGER_GROUP)
+        # Hashing is deliberately slow, so every manager shares one hash
+        password = make_password(PASSWORD)
+        managers = User.objects.bulk_create(
+            User(username=f'seed-manager-{i}', password=password) for i in range(options['stores'])
+        )
+        User.groups.through.objects.bulk_create(
+            User.groups.through(user_id=manager.pk, group_id=group.pk) for manager in managers
+        )
+        stores = Store.objects.bulk_create(
+            Store(name=f'Seed store {i}', address=f'{i} Seed street', owner=manager)
+            for i, manager in enumerate(managers)
+        )
+        categories = Category.objects.bulk_create(
+            Category(name=f'Seed category {i}') for i in range(options['categories'])
+        )
+        self.rows += len(managers) * 2 + len(stores) + len(categories)
+        return managers, stores, categories
+
+    def seed_catalog(self, stores, categories, options):
+        """
+        Insert products and store products with explicit ids, so that the
+        history can reference them without reading them back. Returns
+        [(store_product_id, store_index, price_cents, quantity)].
+        """
+        rng = self.rng
+        ops = connection.ops
+        category_ids = [category.pk for category in categories]
+        # Raw inserts skip auto_now
+        updated = ops.adapt_datetimefield_value(timezone.now())
+        first_product = (Product.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+        product_ids = range(first_product, first_product + options['products'])
+        self.insert(Product, ['id', 'name', 'category_id', 'updated'], (
+            (pk, f'Seed product {i}', rng.choice(category_ids), updated) for i, pk in enumerate(product_ids)
+        ))
+
+        store_product_id = StoreProduct.objects.aggregate(last=Max('pk'))['last'] or 0
+        store_products, rows = [], []
+        for store_index, store in enumerate(stores):
+            for product_id in product_ids:
+                store_product_id += 1
+                cents = 50 + int(rng.random() * 4950)
+                quantity = int(rng.random() * 1001)
+                store_products.append((store_product_id, store_index, cents, quantity))
+                rows.append((
+                    store_product_id, store.pk, product_id,
+                    ops.adapt_decimalfield_value(Decimal(cents).scaleb(-2), 10, 2),
+                    quantity, rng.choice((0, 5, 10, 20)), updated,
+                ))
+        self.insert(
+            StoreProduct, ['id', 'store_id', 'product_id', 'price', 'quantity', 'reorder_threshold', 'updated'], rows
+        )
+        return store_products
+
+    def seed_history(self, store_products, managers, stores, options):
+        """
+        Insert the dispatches with their stock movements and daily sales
+        rollup, and an opening movement per store product that the
+        dispatches bring down to its seeded quantity.
+        """
+        if not store_products or not options['days']:
+            return
+        rng = self.rng
+        ops = connection.ops
+        end = options['end_date'] or timezone.localdate()
+        days = [end - datetime.timedelta(days=offset) for offset in range(options['days'] - 1, -1, -1)]
+        # (date, first instant, length in seconds) of each local day; the
+        # length is not 86400 on daylight saving changes.
+        spans = []
+        for day in days:
+            start = day_start(day)
+            length = (day_start(day + datetime.timedelta(days=1)) - start).total_seconds()
+            spans.append((day, timezone.make_naive(start, connection.timezone), length))
+        to_param = _timestamp_param()
+        owner_ids = [manager.pk for manager in managers]
+        zero = ops.adapt_decimalfield_value(Decimal('0.00'), 5, 2)
+        # total_amount of each store product by quantity sold (1 to 5)
+        amounts = [
+            [ops.adapt_decimalfield_value(Decimal(cents * quantity).scaleb(-2), 10, 2) for quantity in range(6)]
+            for _, _, cents, _ in store_products
+        ]
+
+        sold = [0] * len(store_products)
+        # store product index * days + day index -> [quantity, revenue in cents, dispatches]
+        rollup = defaultdict(lambda: [0, 0, 0])
+
+        def dispatch_rows():
+            random_ = rng.random
+            timedelta = datetime.timedelta
+            product_count, day_count = len(store_products), len(spans)
+            for _ in range(options['dispatches']):
+                index = int(random_() * product_count)
+                day_index = int(random_() * day_count)
+                quantity = 1 + int(random_() * 5)
+                pk, store_index, cents, _ = store_products[index]
+                _, start, length = spans[day_index]
+                sold[index] += quantity
+                totals = rollup[index * day_count + day_index]
+                totals[0] += quantity
+                totals[1] += cents * quantity
+                totals[2] += 1
+                yield (
+                    pk, quantity, zero, amounts[index][quantity],
+                    to_param(start + timedelta(seconds=int(random_() * length))), owner_ids[store_index],
+                )
+
+        first_dispatch = (Dispatch.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+        with self.deferred_indexes([Dispatch, StockMovement, DailyStoreProductSales]):
+            self.insert(
+                Dispatch,
+                ['store_product_id', 'quantity_sold', 'discount', 'total_amount', 'timestamp', 'sold_by_id'],
+                dispatch_rows(),
+            )
+            self.copy_dispatch_movements(first_dispatch)
+
+            store_ids = [store.pk for store in stores]
+            opening = to_param(spans[0][1])
+            self.insert(StockMovement, ['store_product_id', 'store_id', 'change', 'reason', 'timestamp'], (
+                (pk, store_ids[store_index], quantity + sold[index], StockMovement.OPENING, opening)
+                for index, (pk, store_index, _, quantity) in enumerate(store_products)
+                if quantity + sold[index]
+            ))
+            no_discount = ops.adapt_decimalfield_value(Decimal('0.00'), 12, 2)
+            dates = [ops.adapt_datefield_value(day) for day, _, _ in spans]
+            self.insert(
+                DailyStoreProductSales,
+                ['store_id', 'store_product_id', 'date', 'quantity_sold', 'revenue', 'discount', 'dispatch_count'],
+                (
+                    (
+                        store_ids[store_products[key // len(spans)][1]], store_products[key // len(spans)][0],
+                        dates[key % len(spans)], quantity,
+                        ops.adapt_decimalfield_value(Decimal(cents).scaleb(-2), 14, 2), no_discount, count,
+                    )
+                    for key, (quantity, cents, count) in rollup.items()
+                ),
+            )
+
+    def copy_dispatch_movements(self, first_dispatch):
+        """Log every dispatch from ``first_dispatch`` on in the stock ledger, in one statement."""
+        quote = connection.ops.quote_name
+        columns = ['store_product_id', 'store_id', 'change', 'reason', 'timestamp', 'user_id']
+        self.cursor.execute(
+            'INSERT INTO %s (%s) SELECT d.store_product_id, sp.store_id, -d.quantity_sold, %%s, d.timestamp, '
+            'd.sold_by_id FROM %s d JOIN %s sp ON sp.id = d.store_product_id WHERE d.id >= %%s ORDER BY d.id' % (
+                quote(StockMovement._meta.db_table),
+                ', '.join(quote(column) for column in columns),
+                quote(Dispatch._meta.db_table),
+                quote(StoreProduct._meta.db_table),
+            ),
+            [StockMovement.DISPATCH, first_dispatch],
+        )
+        self.rows += self.cursor.rowcount
+
+    @contextmanager
+    def deferred_indexes(self, models):
+        """
+        On SQLite, drop every index of ``models`` while rows are loaded and
+        create them again from their stored definitions afterwards: building
+        an index once from all the rows is several times cheaper than updating
+        it for every insert. DDL is transactional, so a failed load leaves the
+        schema untouched.
+        """
+        if connection.vendor != 'sqlite':
+            yield
+            return
+        tables = [model._meta.db_table for model in models]
+        self.cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL "
+            "AND tbl_name IN (%s)" % ', '.join(['%s'] * len(tables)),
+            tables,
+        )
+        indexes = self.cursor.fetchall()
+        for name, _ in indexes:
+            self.cursor.execute('DROP INDEX %s' % connection.ops.quote_name(name))
+        yield
+        for _, sql in indexes:
+            self.cursor.execute(sql)
@@ -0,0 +1,93 @@
+# store_management/middleware.py
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.functional import SimpleLazyObject
+
+from . import profiling
+from .roles import get_roles
+
+
+class RoleMiddleware:
+    """
+    Expose the user's cached roles and stores as ``request.roles``.
+
+    Must come after AuthenticationMiddleware. The roles are only looked up
+    when a view or template first touches them; async views resolve them
+    with roles.aget_roles() instead.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.roles = SimpleLazyObject(lambda: get_roles(request.user))
+        # In async mode this returns the coroutine of the next handler,
+        # which the caller awaits
+        return self.get_response(request)
+
+
+class ProfilingMiddleware:
+    """
+    Record per-view wall time, query count and time, duplicate queries and
+    response size into the rolling histograms of store_management.profiling.
+
+    Opt-in: it removes itself unless PROFILING_ENABLED is set. List it
+    first so the time of the other middleware is included. Queries run
+    while a streaming response is iterated are not counted.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "PROFILING_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = profiling.QueryRecorder()
+        started = time.perf_counter()
+        with self.recording(recorder):
+            response = self.get_response(request)
+        profiling.record(*self.measurements(request, response, recorder, started))
+        return response
+
+    async def __acall__(self, request):
+        recorder = profiling.QueryRecorder()
+        started = time.perf_counter()
+        # The async ORM runs its queries on the request's sync thread, whose
+        # connections are not the ones seen here: install the wrappers there
+        stack = await sync_to_async(self.recording)(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            stack.close()
+        await sync_to_async(profiling.record)(*self.measurements(request, response, recorder, started))
+        return response
+
+    def recording(self, recorder):
+        """An ExitStack holding ``recorder`` on every connection of this thread."""
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        return stack
+
+    def measurements(self, request, response, recorder, started):
+        wall_ms = (time.perf_counter() - started) * 1000
+        match = request.resolver_match
+        view = (match.view_name or match._func_path) if match else "unresolved"
+        size = None if response.streaming else len(response.content)
+        return view, wall_ms, recorder, size
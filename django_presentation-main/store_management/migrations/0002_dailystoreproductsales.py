@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollup(apps, schema_editor):
+    Dispatch = apps.get_model('store_management', 'Dispatch')
+    DailyStoreProductSales = apps.get_model('store_management', 'DailyStoreProductSales')
+
+    grouped = (
+        Dispatch.objects.annotate(day=TruncDate('timestamp'))
+        .values('store_product_id', 'day', store_id=F('store_product__store_id'))
+        .annotate(
+            quantity=Sum('quantity_sold'),
+            revenue=Sum('total_amount'),
+            discount_total=Sum('discount'),
+            count=Count('id'),
+        )
+        .order_by()
+    )
+    DailyStoreProductSales.objects.bulk_create(
+        (
+            DailyStoreProductSales(
+                store_id=row['store_id'],
+                store_product_id=row['store_product_id'],
+                date=row['day'],
+                quantity_sold=row['quantity'],
+                revenue=row['revenue'],
+                discount=row['discount_total'] or 0,
+                dispatch_count=row['count'],
+            )
+            for row in grouped.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_store_default_price_quantity'),
+        ('store_management', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStoreProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity_sold', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('discount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('dispatch_count', models.PositiveIntegerField(default=0)),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='inventory.store')),
+                ('store_product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='inventory.storeproduct')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['store', 'date'], name='store_manag_store_i_6b846d_idx')],
+                'unique_together': {('store_product', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
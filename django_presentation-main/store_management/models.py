@@ -1,10 +1,11 @@
 from django.db import models
 from django.contrib.auth.models import User
-from inventory.models import StoreProduct
+from inventory.models import Store, StoreProduct
 
 class Dispatch(models.Model):
+    # Indexed by (store_product, timestamp) below
     store_product = models.ForeignKey(
-        StoreProduct, related_name="dispatches", on_delete=models.CASCADE
+        StoreProduct, related_name="dispatches", on_delete=models.CASCADE, db_index=False
     )
     quantity_sold = models.PositiveIntegerField()
     discount = models.DecimalField(
@@ -14,6 +15,14 @@ class Dispatch(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     sold_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Per-store reports: store products of a store, then a time range
+            models.Index(fields=["store_product", "timestamp"], name="dispatch_sp_timestamp_idx"),
+            # Cross-store exports, rollup rebuilds and archival by date
+            models.Index(fields=["timestamp"], name="dispatch_timestamp_idx"),
+        ]
+
     def save(self, *args, **kwargs):
         """
         Override save method to calculate the total amount dynamically.
@@ -26,3 +35,63 @@ class Dispatch(models.Model):
 
     def __str__(self):
         return f"Dispatch: {self.quantity_sold} x {self.store_product.product.name} at {self.store_product.store.name}"
+
+
+class DailyStoreProductSales(models.Model):
+    """
+    Per-day sales rollup of Dispatch, one row per store product and day.
+
+    Kept up to date incrementally as dispatches are recorded (see
+    store_management.rollups) and rebuilt with ``manage.py rebuild_sales_rollup``.
+    """
+    store = models.ForeignKey(Store, related_name="daily_sales", on_delete=models.CASCADE)
+    store_product = models.ForeignKey(
+        StoreProduct, related_name="daily_sales", on_delete=models.CASCADE
+    )
+    date = models.DateField()
+    quantity_sold = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    discount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    dispatch_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("store_product", "date")
+        indexes = [models.Index(fields=["store", "date"])]
+
+    def __str__(self):
+        return f"{self.store_product_id} on {self.date}: {self.quantity_sold} sold"
+
+
+class DispatchArchive(models.Model):
+    """
+    Dispatches older than DISPATCH_ARCHIVE_AFTER_DAYS, moved out of
+    Dispatch under their original ids by ``manage.py archive_dispatches``
+    (see store_management.archive).
+
+    The rollup is left as it was, so report totals never read these rows;
+    listings and exports union them in when their range reaches back this
+    far. The foreign keys are not enforced by the database and nothing
+    cascades into this table, so deleting a store or product does not have
+    to walk years of history.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    # Indexed by (store_product, timestamp) below
+    store_product = models.ForeignKey(
+        StoreProduct, related_name="+", on_delete=models.DO_NOTHING, db_constraint=False, db_index=False
+    )
+    quantity_sold = models.PositiveIntegerField()
+    discount = models.DecimalField(max_digits=5, decimal_places=2, null=True)
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    timestamp = models.DateTimeField()
+    sold_by = models.ForeignKey(
+        User, related_name="+", on_delete=models.DO_NOTHING, db_constraint=False, null=True
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["store_product", "timestamp"], name="dispatcharchive_sp_ts_idx"),
+            models.Index(fields=["timestamp"], name="dispatcharchive_ts_idx"),
+        ]
+
+    def __str__(self):
+        return f"Archived dispatch {self.pk}: {self.quantity_sold} sold"
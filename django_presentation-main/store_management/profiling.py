@@ -0,0 +1,218 @@
+# store_management/profiling.py
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+# Upper bounds of the histogram buckets; values above the last bound fall
+# into an overflow bucket. Only bucket counts and sums are kept, so the
+# stats take the same space however many requests are recorded.
+MS_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+BYTES_BUCKETS = (1_000, 5_000, 10_000, 50_000, 100_000, 500_000, 1_000_000)
+
+HISTOGRAMS = {
+    "wall_ms": MS_BUCKETS,
+    "db_ms": MS_BUCKETS,
+    "queries": QUERY_BUCKETS,
+    "bytes": BYTES_BUCKETS,
+}
+
+
+def get_window():
+    """Seconds covered by one window of the rolling stats."""
+    return getattr(settings, "PROFILING_WINDOW", 300)
+
+
+def get_windows():
+    """Number of windows kept, i.e. how far back the stats reach."""
+    return getattr(settings, "PROFILING_WINDOWS", 12)
+
+
+def get_cache():
+    """The cache the stats are kept in, named by the PROFILING_CACHE setting."""
+    return caches[getattr(settings, "PROFILING_CACHE", "default")]
+
+
+def is_shared():
+    """Whether every process reads and writes the same stats."""
+    return not isinstance(get_cache(), LocMemCache)
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper counting and timing the queries of a request.
+
+    Statements are counted by their SQL with placeholders, so the same
+    query run for every row of a loop (an N+1 pattern) shows up as
+    duplicates.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    @property
+    def duplicates(self):
+        return sum(count - 1 for count in self.statements.values() if count > 1)
+
+    def most_repeated(self):
+        """(sql, count) of the statement run most often, or None when nothing repeated."""
+        if not self.statements:
+            return None
+        sql, count = self.statements.most_common(1)[0]
+        return (sql, count) if count > 1 else None
+
+
+def _bucket(value, bounds):
+    for index, bound in enumerate(bounds):
+        if value <= bound:
+            return index
+    return len(bounds)
+
+
+def _key(window, view, name):
+    return f"profiling:{window}:{view}:{name}"
+
+
+def _views_key(window):
+    return f"profiling:{window}:views"
+
+
+def _incr(key, delta=1):
+    # add() then incr() is atomic on backends that support incr natively
+    # (memcached, redis); elsewhere concurrent requests may lose a count.
+    timeout = get_window() * (get_windows() + 1)
+    cache = get_cache()
+    cache.add(key, 0, timeout)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # Expired between add() and incr()
+        cache.set(key, delta, timeout)
+
+
+def record(view, wall_ms, recorder, size=None):
+    """Add one request of ``view`` to the current window's histograms."""
+    window = int(time.time() // get_window())
+    timeout = get_window() * (get_windows() + 1)
+    cache = get_cache()
+
+    views = cache.get(_views_key(window)) or set()
+    if view not in views:
+        # A concurrent request may drop a name here; the view's next
+        # request puts it back.
+        cache.set(_views_key(window), views | {view}, timeout)
+
+    values = {"wall_ms": wall_ms, "db_ms": recorder.seconds * 1000, "queries": recorder.count, "bytes": size}
+    _incr(_key(window, view, "requests"))
+    for name, bounds in HISTOGRAMS.items():
+        value = values[name]
+        if value is None:
+            continue
+        _incr(_key(window, view, f"{name}:{_bucket(value, bounds)}"))
+        # Sums are kept in thousandths so that incr() stays integral
+        _incr(_key(window, view, f"{name}:sum"), int(value * 1000))
+
+    duplicates = recorder.duplicates
+    if duplicates:
+        _incr(_key(window, view, "duplicates"), duplicates)
+        _incr(_key(window, view, "requests_with_duplicates"))
+        repeated = recorder.most_repeated()
+        key = _key(window, view, "most_repeated")
+        current = cache.get(key)
+        if current is None or repeated[1] > current[1]:
+            cache.set(key, repeated, timeout)
+
+
+def collect(windows=None):
+    """
+    Merge the last ``windows`` windows (all kept windows by default) into
+    {view: {"requests": n, "<histogram>": [bucket counts], "<histogram>_sum": x, ...}}.
+    """
+    current = int(time.time() // get_window())
+    recent = range(current - (windows or get_windows()) + 1, current + 1)
+    cache = get_cache()
+
+    views_by_window = cache.get_many([_views_key(window) for window in recent])
+    names = ["requests", "duplicates", "requests_with_duplicates", "most_repeated"]
+    for name, bounds in HISTOGRAMS.items():
+        names.append(f"{name}:sum")
+        names.extend(f"{name}:{index}" for index in range(len(bounds) + 1))
+
+    stats = {}
+    for window in recent:
+        views = views_by_window.get(_views_key(window)) or ()
+        keys = [_key(window, view, name) for view in views for name in names]
+        values = cache.get_many(keys)
+        for view in views:
+            entry = stats.setdefault(view, _empty_entry())
+            entry["requests"] += values.get(_key(window, view, "requests"), 0)
+            entry["duplicates"] += values.get(_key(window, view, "duplicates"), 0)
+            entry["requests_with_duplicates"] += values.get(_key(window, view, "requests_with_duplicates"), 0)
+            repeated = values.get(_key(window, view, "most_repeated"))
+            if repeated and (entry["most_repeated"] is None or repeated[1] > entry["most_repeated"][1]):
+                entry["most_repeated"] = repeated
+            for name, bounds in HISTOGRAMS.items():
+                entry[f"{name}_sum"] += values.get(_key(window, view, f"{name}:sum"), 0) / 1000
+                for index in range(len(bounds) + 1):
+                    entry[name][index] += values.get(_key(window, view, f"{name}:{index}"), 0)
+    return stats
+
+
+def _empty_entry():
+    entry = {"requests": 0, "duplicates": 0, "requests_with_duplicates": 0, "most_repeated": None}
+    for name, bounds in HISTOGRAMS.items():
+        entry[name] = [0] * (len(bounds) + 1)
+        entry[f"{name}_sum"] = 0.0
+    return entry
+
+
+def percentile(counts, bounds, fraction):
+    """
+    Upper bound of the bucket holding the ``fraction`` percentile, or None
+    when it falls in the overflow bucket (above the last bound).
+    """
+    total = sum(counts)
+    if not total:
+        return 0
+    seen = 0
+    for index, count in enumerate(counts):
+        seen += count
+        if seen >= fraction * total:
+            return bounds[index] if index < len(bounds) else None
+    return None
+
+
+def summarize(stats):
+    """One row per view, slowest p95 first, with percentiles and means."""
+    rows = []
+    for view, entry in stats.items():
+        row = {
+            "view": view,
+            "requests": entry["requests"],
+            "duplicate_queries": entry["duplicates"],
+            "requests_with_duplicates": entry["requests_with_duplicates"],
+            "most_repeated": entry["most_repeated"],
+        }
+        for name, bounds in HISTOGRAMS.items():
+            for label, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+                row[f"{name}_{label}"] = percentile(entry[name], bounds, fraction)
+            measured = sum(entry[name]) or 1
+            row[f"{name}_mean"] = round(entry[f"{name}_sum"] / measured, 2)
+        rows.append(row)
+    # None means beyond the last bucket, i.e. the slowest
+    rows.sort(key=lambda row: (row["wall_ms_p95"] is None, row["wall_ms_p95"] or 0), reverse=True)
+    return rows
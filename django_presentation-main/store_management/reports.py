@@ -0,0 +1,325 @@
+# store_management/reports.py
+import asyncio
+import base64
+import datetime
+from decimal import Decimal
+from itertools import chain
+
+from django.db.models import Count, DecimalField, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from inventory.models import Store
+from .archive import aarchived_until, archived_until
+from .models import DailyStoreProductSales, Dispatch, DispatchArchive
+
+PAGE_SIZE = 50
+EXPORT_CHUNK_SIZE = 2000
+
+# Aggregates over the daily rollup and over raw dispatches, under the same names.
+ROLLUP_METRICS = {
+    'quantity': Sum('quantity_sold'),
+    'revenue': Sum('revenue'),
+    'discount': Sum('discount'),
+    'count': Sum('dispatch_count'),
+}
+LIVE_METRICS = {
+    'quantity': Sum('quantity_sold'),
+    'revenue': Sum('total_amount'),
+    'discount': Sum('discount'),
+    'count': Count('id'),
+}
+
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD query parameter, returning None when missing or invalid."""
+    if not value:
+        return None
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def day_start(day):
+    """Aware datetime for the first instant of ``day`` in the current timezone."""
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def store_kpis(stores=None):
+    """
+    Annotate ``stores`` (every store by default) with their stock totals
+    (see StoreQuerySet.with_stock_totals) and ``today_revenue``, all in one
+    grouped query. Today's revenue is a correlated sum over today's
+    dispatches, which the (store_product, timestamp) index keeps cheap.
+    """
+    if stores is None:
+        stores = Store.objects.all()
+    revenue = DecimalField(max_digits=14, decimal_places=2)
+    today_revenue = (
+        Dispatch.objects.filter(
+            store_product__store=OuterRef('pk'),
+            timestamp__gte=day_start(timezone.localdate()),
+        )
+        .order_by()
+        .values('store_product__store')
+        .annotate(total=Sum('total_amount'))
+        .values('total')
+    )
+    return stores.with_stock_totals().annotate(
+        today_revenue=Coalesce(
+            Subquery(today_revenue, output_field=revenue), Value(Decimal('0.00')), output_field=revenue,
+        ),
+    )
+
+
+def encode_cursor(timestamp, pk):
+    raw = f'{timestamp.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return (timestamp, pk) from an opaque cursor, or None if it is malformed."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        timestamp, pk = raw.rsplit('|', 1)
+        return datetime.datetime.fromisoformat(timestamp), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _merge_row(merged, key, row, metrics):
+    current = merged.setdefault(row[key], dict(row, quantity=0, revenue=0, discount=0, count=0))
+    for metric in metrics:
+        current[metric] += row[metric] or 0
+
+
+def _totals(aggregates):
+    totals = {'quantity': 0, 'revenue': 0, 'discount': 0, 'count': 0}
+    for aggregate in aggregates:
+        for metric, value in aggregate.items():
+            totals[metric] += value or 0
+    return {
+        'total_quantity': totals['quantity'],
+        'total_revenue': totals['revenue'],
+        'total_discount': totals['discount'],
+        'dispatch_count': totals['count'],
+    }
+
+
+def _paginate(rows, page_size):
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(last['timestamp'], last['id'])
+    return rows, next_cursor
+
+
+# Each breakdown is (key, rollup grouping, live grouping, sort key)
+def _product_breakdown():
+    product = dict(product_id=F('store_product__product_id'), product_name=F('store_product__product__name'))
+    return 'product_id', product, product, lambda row: (-row['revenue'], row['product_name'])
+
+
+def _store_breakdown():
+    return (
+        'store_pk',
+        dict(store_pk=F('store_id'), store_name=F('store__name')),
+        dict(store_pk=F('store_product__store_id'), store_name=F('store_product__store__name')),
+        lambda row: (-row['revenue'], row['store_name']),
+    )
+
+
+def _day_breakdown():
+    return 'day', {'day': F('date')}, {'day': TruncDate('timestamp')}, lambda row: row['day']
+
+
+class DispatchReport:
+    """
+    Dispatch totals and listing for one store, a list of stores (or every
+    store, when ``stores`` is None) over an optional date range.
+
+    Totals and breakdowns read the DailyStoreProductSales rollup for whole
+    past days and only aggregate raw dispatches for the current, partial
+    day. The listing is read with the product joined in and paginated by
+    keyset on (timestamp, id), so memory use does not grow with the range.
+
+    The listing and the export also read DispatchArchive when the range
+    starts before its newest row (or has no start); totals come from the
+    rollup, which archival leaves in place.
+
+    Each read has an ``a``-prefixed coroutine version for async views.
+    """
+
+    def __init__(self, stores, start_date=None, end_date=None):
+        if isinstance(stores, Store):
+            stores = [stores]
+        self.stores = None if stores is None else list(stores)
+        self.start_date = start_date
+        self.end_date = end_date
+
+    def get_queryset(self, model=Dispatch):
+        dispatches = model.objects.all()
+        if self.stores is not None:
+            dispatches = dispatches.filter(store_product__store__in=self.stores)
+        # Compare the raw timestamp against day boundaries instead of using
+        # timestamp__date so the (store_product, timestamp) index can be used.
+        if self.start_date:
+            dispatches = dispatches.filter(timestamp__gte=day_start(self.start_date))
+        if self.end_date:
+            dispatches = dispatches.filter(
+                timestamp__lt=day_start(self.end_date + datetime.timedelta(days=1))
+            )
+        return dispatches
+
+    def get_rollup_queryset(self):
+        """Rollup rows for the whole days of the range before today, or None."""
+        today = timezone.localdate()
+        if self.start_date and self.start_date >= today:
+            return None
+        rollups = DailyStoreProductSales.objects.filter(date__lt=today)
+        if self.stores is not None:
+            rollups = rollups.filter(store__in=self.stores)
+        if self.start_date:
+            rollups = rollups.filter(date__gte=self.start_date)
+        if self.end_date:
+            rollups = rollups.filter(date__lte=self.end_date)
+        return rollups
+
+    def get_live_queryset(self):
+        """Raw dispatches from the start of today onwards, or None if the range ends earlier."""
+        today = timezone.localdate()
+        if self.end_date and self.end_date < today:
+            return None
+        return self.get_queryset().filter(timestamp__gte=day_start(today))
+
+    def _sources(self, rollup_group=None, live_group=None):
+        """
+        Yield (queryset, metrics) for the rollup and live parts of the range,
+        grouped by the given value expressions when provided.
+        """
+        rollups = self.get_rollup_queryset()
+        if rollups is not None:
+            if rollup_group:
+                rollups = rollups.values(**rollup_group).order_by()
+            yield rollups, ROLLUP_METRICS
+        live = self.get_live_queryset()
+        if live is not None:
+            if live_group:
+                live = live.values(**live_group).order_by()
+            yield live, LIVE_METRICS
+
+    def _breakdown(self, key, rollup_group, live_group, sort_key):
+        merged = {}
+        for queryset, metrics in self._sources(rollup_group, live_group):
+            for row in queryset.annotate(**metrics):
+                _merge_row(merged, key, row, metrics)
+        return sorted(merged.values(), key=sort_key)
+
+    async def _abreakdown(self, key, rollup_group, live_group, sort_key):
+        merged = {}
+        for queryset, metrics in self._sources(rollup_group, live_group):
+            async for row in queryset.annotate(**metrics):
+                _merge_row(merged, key, row, metrics)
+        return sorted(merged.values(), key=sort_key)
+
+    def totals(self):
+        return _totals(queryset.aggregate(**metrics) for queryset, metrics in self._sources())
+
+    async def atotals(self):
+        """totals() with the rollup and live aggregates run concurrently."""
+        return _totals(await asyncio.gather(*(
+            queryset.aaggregate(**metrics) for queryset, metrics in self._sources()
+        )))
+
+    def by_product(self):
+        return self._breakdown(*_product_breakdown())
+
+    async def aby_product(self):
+        return await self._abreakdown(*_product_breakdown())
+
+    def by_store(self):
+        return self._breakdown(*_store_breakdown())
+
+    async def aby_store(self):
+        return await self._abreakdown(*_store_breakdown())
+
+    def by_day(self):
+        return self._breakdown(*_day_breakdown())
+
+    async def aby_day(self):
+        return await self._abreakdown(*_day_breakdown())
+
+    def _reaches_archive(self, until):
+        return until is not None and day_start(self.start_date) <= until
+
+    def reaches_archive(self):
+        """Whether archived dispatches may fall in the range."""
+        # Without a start the range reaches back to the first dispatch; the
+        # archive is unioned in rather than looked up first
+        return self.start_date is None or self._reaches_archive(archived_until())
+
+    async def areaches_archive(self):
+        return self.start_date is None or self._reaches_archive(await aarchived_until())
+
+    def _rows(self, model, position=None):
+        rows = self.get_queryset(model)
+        if position:
+            timestamp, pk = position
+            rows = rows.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=pk))
+        return rows.values(
+            'id', 'quantity_sold', 'discount', 'total_amount', 'timestamp',
+            store_name=F('store_product__store__name'),
+            product_name=F('store_product__product__name'),
+            price=F('store_product__price'),
+        )
+
+    def rows(self, position=None, archive=False):
+        """
+        Listing rows as dicts, newest first, with store, product name and
+        price joined in; those after the keyset ``position`` when given.
+        With ``archive``, archived dispatches are unioned in.
+        """
+        rows = self._rows(Dispatch, position)
+        if archive:
+            rows = rows.order_by().union(self._rows(DispatchArchive, position).order_by(), all=True)
+        return rows.order_by('-timestamp', '-id')
+
+    def _page_queryset(self, cursor, page_size, archive):
+        # Fetch one extra row to know whether there is a next page.
+        return self.rows(decode_cursor(cursor), archive)[:page_size + 1]
+
+    def page(self, cursor=None, page_size=PAGE_SIZE):
+        """
+        Return (rows, next_cursor) for the page starting after ``cursor``.
+        ``next_cursor`` is None on the last page.
+        """
+        return _paginate(list(self._page_queryset(cursor, page_size, self.reaches_archive())), page_size)
+
+    async def apage(self, cursor=None, page_size=PAGE_SIZE):
+        rows = self._page_queryset(cursor, page_size, await self.areaches_archive())
+        return _paginate([row async for row in rows], page_size)
+
+    def _export_rows(self, model):
+        return (
+            self.get_queryset(model)
+            .order_by('timestamp', 'id')
+            .values_list(
+                'id', 'timestamp', 'store_product__store__name', 'store_product__product__name',
+                'quantity_sold', 'store_product__price', 'discount', 'total_amount', 'sold_by__username',
+            )
+            .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        )
+
+    def export_rows(self):
+        """
+        Every dispatch in the range as a flat tuple (see exports.EXPORT_HEADER),
+        oldest first, streamed from the database in chunks. Archived
+        dispatches, all older than the live ones, come first.
+        """
+        if self.reaches_archive():
+            return chain(self._export_rows(DispatchArchive), self._export_rows(Dispatch))
+        return self._export_rows(Dispatch)
@@ -0,0 +1,165 @@
+# store_management/roles.py
+import uuid
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+from inventory.models import Store
+
+STORE_MANAGER_GROUP = "Store Manager"
+
+# Session key of the store picked in the store selector, and the value
+# selecting the combined view of every store the manager runs
+SELECTED_STORE_SESSION_KEY = "selected_store"
+ALL_STORES = "all"
+
+# Longest a per-process cache may keep roles: invalidate_roles() only
+# reaches the process that saw the change, so the others would keep
+# serving revoked roles until the entry expires
+LOCAL_CACHE_MAX_TIMEOUT = 5
+
+
+class UserRoles:
+    """What a user may do in store_management, and the stores they manage."""
+
+    def __init__(self, is_admin=False, is_store_manager=False, stores=()):
+        self.is_admin = is_admin
+        self.is_store_manager = is_store_manager
+        self.stores = list(stores)
+
+    @property
+    def store(self):
+        """The store shown by default: the user's first store, or None."""
+        return self.stores[0] if self.stores else None
+
+    def get_store(self, store_id):
+        """The managed store with this id, or None. No query is made."""
+        try:
+            store_id = int(store_id)
+        except (TypeError, ValueError):
+            return None
+        for store in self.stores:
+            if store.pk == store_id:
+                return store
+        return None
+
+
+def _version_key(user_id):
+    return f"roles:version:{user_id}"
+
+
+def _roles_key(user_id, version):
+    return f"roles:{user_id}:{version}"
+
+
+def _timeout():
+    timeout = getattr(settings, "ROLES_CACHE_TIMEOUT", 3600)
+    if isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache):
+        return min(timeout, LOCAL_CACHE_MAX_TIMEOUT)
+    return timeout
+
+
+def resolve_roles(user):
+    """Read a user's roles from the database (two queries for a non-admin)."""
+    return UserRoles(
+        is_admin=user.is_superuser,
+        is_store_manager=user.groups.filter(name=STORE_MANAGER_GROUP).exists(),
+        stores=Store.objects.filter(owner=user).order_by("name", "pk"),
+    )
+
+
+def get_roles(user):
+    """
+    Return the cached UserRoles of ``user``, resolving them on a miss.
+
+    Entries are keyed by a per-user version token that invalidate_roles()
+    replaces, so a change in group membership or store ownership takes
+    effect on the next request without deleting anything. Other processes
+    only see the new token through a shared cache; with a per-process one
+    their entries are kept for LOCAL_CACHE_MAX_TIMEOUT seconds at most.
+    """
+    if not user.is_authenticated:
+        return UserRoles()
+
+    version = cache.get(_version_key(user.pk))
+    if version is None:
+        # A lost version token must never resurrect an old entry, so start
+        # from a fresh one rather than a counter.
+        version = uuid.uuid4().hex
+        cache.set(_version_key(user.pk), version, None)
+
+    key = _roles_key(user.pk, version)
+    roles = cache.get(key)
+    if roles is None:
+        roles = resolve_roles(user)
+        cache.set(key, roles, _timeout())
+    return roles
+
+
+def invalidate_roles(*user_ids):
+    """Make the next get_roles() call for these users read the database again."""
+    cache.set_many({_version_key(user_id): uuid.uuid4().hex for user_id in user_ids}, None)
+
+
+async def aget_roles(request):
+    """
+    get_roles() for async views, which must not touch the lazy
+    ``request.roles``: resolving it would query synchronously. The roles
+    replace it, so templates and later calls read them directly.
+    """
+    request.roles = await sync_to_async(get_roles)(await request.auser())
+    return request.roles
+
+
+def _select(roles, selected):
+    if selected == ALL_STORES and len(roles.stores) > 1:
+        return None, roles.stores
+    store = roles.get_store(selected) or roles.store
+    return store, [store] if store else []
+
+
+def selected_stores(request):
+    """
+    Return (store, stores) for the store selector kept in the session.
+
+    ``store`` is the selected store, or None when the manager chose the
+    combined view; ``stores`` is the list of stores the views are scoped
+    to. Both come from the cached roles, so no query is made.
+    """
+    return _select(request.roles, request.session.get(SELECTED_STORE_SESSION_KEY))
+
+
+async def aselected_stores(request):
+    """selected_stores() for async views; the roles must be resolved already (see aget_roles)."""
+    return _select(request.roles, await request.session.aget(SELECTED_STORE_SESSION_KEY))
+
+
+def roles_required(test):
+    """
+    Like user_passes_test, but ``test`` receives the request's cached
+    UserRoles instead of the user, so no query is needed to check it.
+    Works on sync and async views.
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def wrapped(request, *args, **kwargs):
+                if test(await aget_roles(request)):
+                    return await view_func(request, *args, **kwargs)
+                return redirect_to_login(request.get_full_path())
+            return wrapped
+
+        @wraps(view_func)
+        def wrapped(request, *args, **kwargs):
+            if test(request.roles):
+                return view_func(request, *args, **kwargs)
+            return redirect_to_login(request.get_full_path())
+        return wrapped
+    return decorator
+
+
+store_manager_required = roles_required(lambda roles: roles.is_store_manager)
@@ -0,0 +1,177 @@
+# store_management/rollups.py
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Q, Sum, When
+from django.utils import timezone
+
+from .models import DailyStoreProductSales, Dispatch, DispatchArchive
+from .reports import day_start
+
+
+def _group(dispatches):
+    """Sum dispatches per (store, store product, local date)."""
+    grouped = defaultdict(lambda: [0, Decimal(0), Decimal(0), 0])
+    for dispatch in dispatches:
+        key = (
+            dispatch.store_product.store_id,
+            dispatch.store_product_id,
+            timezone.localdate(dispatch.timestamp),
+        )
+        totals = grouped[key]
+        totals[0] += dispatch.quantity_sold
+        totals[1] += dispatch.total_amount
+        totals[2] += dispatch.discount or 0
+        totals[3] += 1
+    return grouped
+
+
+def _increment(totals):
+    quantity, revenue, discount, count = totals
+    return dict(
+        quantity_sold=F("quantity_sold") + quantity,
+        revenue=F("revenue") + revenue,
+        discount=F("discount") + discount,
+        dispatch_count=F("dispatch_count") + count,
+    )
+
+
+def _key_filter(key):
+    _, store_product_id, date = key
+    return Q(store_product_id=store_product_id, date=date)
+
+
+def _update_or_create(key, totals):
+    rollup = DailyStoreProductSales.objects.filter(_key_filter(key))
+    if rollup.update(**_increment(totals)):
+        return
+    store_id, store_product_id, date = key
+    quantity, revenue, discount, count = totals
+    try:
+        with transaction.atomic():
+            DailyStoreProductSales.objects.create(
+                store_id=store_id,
+                store_product_id=store_product_id,
+                date=date,
+                quantity_sold=quantity,
+                revenue=revenue,
+                discount=discount,
+                dispatch_count=count,
+            )
+    except IntegrityError:
+        # Another writer inserted the row first; add on top of it.
+        rollup.update(**_increment(totals))
+
+
+def apply_dispatches(dispatches):
+    """
+    Add newly recorded dispatches to the daily rollup.
+
+    Existing (store product, day) rows are bumped with F() expressions in a
+    single UPDATE, so concurrent writers never lose counts and a whole
+    basket costs one statement once its rows exist. Missing rows are then
+    inserted. Call it inside the transaction that writes the dispatches.
+    """
+    grouped = _group(dispatches)
+    if len(grouped) == 1:
+        _update_or_create(*next(iter(grouped.items())))
+        return
+
+    matching = reduce(or_, (_key_filter(key) for key in grouped))
+    increments = {
+        field: Case(
+            *(When(_key_filter(key), then=_increment(totals)[field]) for key, totals in grouped.items()),
+            default=F(field),
+            output_field=DailyStoreProductSales._meta.get_field(field),
+        )
+        for field in ("quantity_sold", "revenue", "discount", "dispatch_count")
+    }
+    rollups = DailyStoreProductSales.objects.filter(matching)
+    if rollups.update(**increments) == len(grouped):
+        return
+
+    present = set(rollups.values_list("store_product_id", "date"))
+    missing = {key: totals for key, totals in grouped.items() if key[1:] not in present}
+    try:
+        with transaction.atomic():
+            DailyStoreProductSales.objects.bulk_create([
+                DailyStoreProductSales(
+                    store_id=store_id,
+                    store_product_id=store_product_id,
+                    date=date,
+                    quantity_sold=quantity,
+                    revenue=revenue,
+                    discount=discount,
+                    dispatch_count=count,
+                )
+                for (store_id, store_product_id, date), (quantity, revenue, discount, count) in missing.items()
+            ])
+    except IntegrityError:
+        # Raced with another writer creating some of the rows
+        for key, totals in missing.items():
+            _update_or_create(key, totals)
+
+
+def rebuild(start, end, stores=None, batch_size=1000):
+    """
+    Recompute the rollup from raw dispatches for every day in [start, end].
+
+    Each day is replaced in its own transaction, so a long rebuild can be
+    interrupted and resumed from the last day reported. Archived dispatches
+    (see store_management.archive) are counted with the live ones. Returns
+    the number of rollup rows written.
+    """
+    written = 0
+    day = start
+    while day <= end:
+        next_day = day + datetime.timedelta(days=1)
+        rollups = DailyStoreProductSales.objects.filter(date=day)
+        if stores is not None:
+            rollups = rollups.filter(store__in=stores)
+
+        with transaction.atomic():
+            totals = defaultdict(lambda: [0, Decimal("0"), Decimal("0"), 0])
+            for model in (DispatchArchive, Dispatch):
+                dispatches = model.objects.filter(
+                    timestamp__gte=day_start(day), timestamp__lt=day_start(next_day)
+                )
+                if stores is not None:
+                    dispatches = dispatches.filter(store_product__store__in=stores)
+                grouped = (
+                    dispatches.values("store_product_id", store_id=F("store_product__store_id"))
+                    .annotate(
+                        quantity=Sum("quantity_sold"),
+                        revenue=Sum("total_amount"),
+                        discount_total=Sum("discount"),
+                        count=Count("id"),
+                    )
+                    .order_by()
+                )
+                for row in grouped:
+                    total = totals[(row["store_id"], row["store_product_id"])]
+                    total[0] += row["quantity"]
+                    total[1] += row["revenue"]
+                    total[2] += row["discount_total"] or 0
+                    total[3] += row["count"]
+
+            rollups.delete()
+            objects = [
+                DailyStoreProductSales(
+                    store_id=store_id,
+                    store_product_id=store_product_id,
+                    date=day,
+                    quantity_sold=quantity,
+                    revenue=revenue,
+                    discount=discount,
+                    dispatch_count=count,
+                )
+                for (store_id, store_product_id), (quantity, revenue, discount, count) in totals.items()
+            ]
+            DailyStoreProductSales.objects.bulk_create(objects, batch_size=batch_size)
+        written += len(objects)
+        day = next_day
+    return written
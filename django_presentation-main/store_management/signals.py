@@ -0,0 +1,59 @@
+# store_management/signals.py
+from django.contrib.auth.models import Group, User
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from inventory.models import Store
+from .models import Dispatch
+from .roles import invalidate_roles
+from .rollups import apply_dispatches
+
+
+@receiver(post_save, sender=Dispatch)
+def update_sales_rollup(sender, instance, created, raw=False, **kwargs):
+    # Only new dispatches count towards the rollup; fixture loading (raw)
+    # is left to manage.py rebuild_sales_rollup
+    if created and not raw:
+        apply_dispatches([instance])
+
+
+# Cached roles (see store_management.roles) are dropped whenever group
+# membership, superuser status or store ownership changes.
+
+@receiver(m2m_changed, sender=User.groups.through)
+def group_membership_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        invalidate_roles(instance.pk)
+    elif action == "pre_clear":
+        invalidate_roles(*instance.user_set.values_list("pk", flat=True))
+    elif pk_set:
+        invalidate_roles(*pk_set)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    invalidate_roles(*instance.user_set.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, **kwargs):
+    invalidate_roles(instance.pk)
+
+
+@receiver(pre_save, sender=Store)
+def store_owner_changing(sender, instance, raw=False, **kwargs):
+    # Remember the previous owner so both users are invalidated after saving
+    if instance.pk and not raw:
+        instance._previous_owner_id = (
+            Store.objects.filter(pk=instance.pk).values_list("owner_id", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Store)
+@receiver(post_delete, sender=Store)
+def store_changed(sender, instance, **kwargs):
+    owners = {instance.owner_id, getattr(instance, "_previous_owner_id", None)}
+    invalidate_roles(*(owner for owner in owners if owner is not None))
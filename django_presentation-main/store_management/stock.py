@@ -0,0 +1,173 @@
+# store_management/stock.py
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Case, F, Q, When
+from django.db.models.functions import Now
+
+from inventory.ledger import movement, record_movement
+from inventory.models import StockMovement, StoreProduct
+from .models import Dispatch
+from .rollups import apply_dispatches
+
+
+class InsufficientStock(Exception):
+    """Raised when a store product does not hold enough stock for a dispatch."""
+
+
+class DispatchBatchError(Exception):
+    """Raised when lines of a dispatch batch are invalid; nothing is written."""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def reserve_stock(store_product_id, quantity, store=None):
+    """
+    Take ``quantity`` units off a store product in one conditional UPDATE.
+
+    The ``quantity >= n`` check and the decrement happen in the same
+    statement, so concurrent reservations can never oversell and no row has
+    to be read (or locked) first. Returns True when the stock was reserved.
+    """
+    store_products = StoreProduct.objects.filter(pk=store_product_id, quantity__gte=quantity)
+    if store is not None:
+        store_products = store_products.filter(store=store)
+    return store_products.update(quantity=F('quantity') - quantity, updated=Now()) == 1
+
+
+def record_dispatch(store_product, quantity, discount=None, sold_by=None, store=None):
+    """
+    Reserve the stock and write the Dispatch row and its stock movement in
+    the same transaction.
+
+    ``store_product`` must be loaded already: its price is used for the
+    total. Raises InsufficientStock (and writes nothing) when there is not
+    enough stock left.
+    """
+    with transaction.atomic():
+        if not reserve_stock(store_product.pk, quantity, store=store):
+            raise InsufficientStock(f"Not enough stock of {store_product.pk} to dispatch {quantity}.")
+        record_movement(store_product, -quantity, StockMovement.DISPATCH, user=sold_by)
+        dispatch = Dispatch(
+            store_product=store_product,
+            quantity_sold=quantity,
+            discount=discount,
+            sold_by=sold_by,
+        )
+        dispatch.save()
+    return dispatch
+
+
+def _whole_number(value):
+    # int() would truncate 2.9 and accept True; only whole numbers (or
+    # their string form) are quantities
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(value)
+    return int(value)
+
+
+def _clean_line(line):
+    """
+    Return (store_product_id, quantity, discount) or raise ValueError.
+    Applies the checks DispatchForm gets from the model's fields.
+    """
+    try:
+        store_product_id = _whole_number(line["store_product"])
+        quantity = _whole_number(line["quantity"])
+        discount = line.get("discount") or 0
+        if isinstance(discount, bool):
+            raise ValueError(discount)
+        discount = Decimal(str(discount))
+        if not discount.is_finite():
+            raise ValueError(discount)
+    except (KeyError, TypeError, ValueError, InvalidOperation):
+        raise ValueError("Each line needs a store_product, a quantity and an optional discount.")
+    if quantity < 1:
+        raise ValueError("Quantity must be at least 1.")
+    if discount < 0:
+        raise ValueError("Discount cannot be negative.")
+    try:
+        Dispatch._meta.get_field("discount").run_validators(discount)
+    except ValidationError as exc:
+        raise ValueError(" ".join(exc.messages))
+    return store_product_id, quantity, discount
+
+
+def record_dispatch_batch(store, lines, sold_by=None):
+    """
+    Record a basket of dispatch lines for ``store`` all-or-nothing.
+
+    ``lines`` are mappings with ``store_product``, ``quantity`` and an
+    optional ``discount``. Ownership and stock of every line are checked
+    with one query, all decrements are applied by one conditional UPDATE
+    and the Dispatch rows are written with bulk_create, their totals
+    computed here rather than by Dispatch.save(). Raises DispatchBatchError
+    listing the bad lines, or InsufficientStock if stock ran out between the
+    check and the update; nothing is written in either case.
+    """
+    errors = []
+    cleaned = []
+    for number, line in enumerate(lines, start=1):
+        try:
+            cleaned.append(_clean_line(line))
+        except ValueError as exc:
+            errors.append({"line": number, "error": str(exc)})
+    if errors:
+        raise DispatchBatchError(errors)
+    if not cleaned:
+        raise DispatchBatchError([{"line": None, "error": "The batch has no lines."}])
+
+    # Units wanted per store product (a basket may repeat an item)
+    wanted = defaultdict(int)
+    for store_product_id, quantity, _ in cleaned:
+        wanted[store_product_id] += quantity
+
+    store_products = StoreProduct.objects.filter(store=store).in_bulk(list(wanted))
+    for number, (store_product_id, quantity, discount) in enumerate(cleaned, start=1):
+        store_product = store_products.get(store_product_id)
+        if store_product is None:
+            errors.append({"line": number, "error": "You cannot record a dispatch for this product."})
+        elif store_product.quantity < wanted[store_product_id]:
+            errors.append({"line": number, "error": "Not enough stock available."})
+        elif discount > store_product.price * quantity:
+            errors.append({"line": number, "error": "Discount cannot exceed the line total."})
+    if errors:
+        raise DispatchBatchError(errors)
+
+    with transaction.atomic():
+        # Every row must still hold enough stock: the WHERE clause re-checks
+        # it, and a short row count means someone else got there first.
+        enough = reduce(or_, (Q(pk=pk, quantity__gte=units) for pk, units in wanted.items()))
+        decrement = Case(
+            *(When(pk=pk, then=F("quantity") - units) for pk, units in wanted.items()),
+            default=F("quantity"),
+        )
+        store_products_left = StoreProduct.objects.filter(enough, store=store)
+        if store_products_left.update(quantity=decrement, updated=Now()) != len(wanted):
+            raise InsufficientStock("Stock changed while the batch was being recorded.")
+
+        dispatches = []
+        for store_product_id, quantity, discount in cleaned:
+            store_product = store_products[store_product_id]
+            dispatches.append(Dispatch(
+                store_product=store_product,
+                quantity_sold=quantity,
+                discount=discount,
+                total_amount=(store_product.price * quantity) - discount,
+                sold_by=sold_by,
+            ))
+        Dispatch.objects.bulk_create(dispatches)
+        StockMovement.objects.bulk_create(
+            movement(store_products[pk], -units, StockMovement.DISPATCH, user=sold_by)
+            for pk, units in wanted.items()
+        )
+        # bulk_create skips post_save, so feed the rollup directly
+        apply_dispatches(dispatches)
+
+    return dispatches
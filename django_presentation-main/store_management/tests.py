@@ -1,3 +1,921 @@
-from django.test import TestCase
+import datetime
+import json
+import tempfile
+import threading
+import zipfile
+from decimal import Decimal
+from io import BytesIO, StringIO
+from xml.etree import ElementTree
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, transaction
+from django.db.models import Sum
+from django.http import Http404
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from inventory_manage.sessions import session_config
+from inventory.models import Category, Product, StockMovement, Store, StoreProduct
+from inventory.async_views import AsyncProductListView
+from store_management import archive, async_views, profiling, roles, stock
+from store_management.models import DailyStoreProductSales, Dispatch, DispatchArchive
+from store_management.reports import DispatchReport
+
+
+class StoreDataMixin:
+    """A store manager with one store carrying a few products."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user(username='manager', password='secret')
+        cls.manager.groups.add(Group.objects.get_or_create(name='Store Manager')[0])
+        cls.store = Store.objects.create(name='Main', address='Main street', owner=cls.manager)
+        cls.category = Category.objects.create(name='Drinks')
+        cls.store_products = [
+            StoreProduct.objects.create(
+                store=cls.store,
+                product=Product.objects.create(name=f'Product {name}', category=cls.category),
+                price=Decimal('2.00'),
+                quantity=1000,
+            )
+            for name in 'ABC'
+        ]
+
+    def setUp(self):
+        # Cached roles outlive the per-test transaction
+        cache.clear()
+
+    def dispatch(self, store_product, quantity, discount=0):
+        return Dispatch.objects.create(
+            store_product=store_product, quantity_sold=quantity, discount=discount, sold_by=self.manager
+        )
+
+
+class CachedRolesTests(StoreDataMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.manager)
+
+    def dashboard_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('store_manager_dashboard'))
+        return response, len(queries)
+
+    def test_roles_are_resolved_once(self):
+        _, first = self.dashboard_queries()
+        response, second = self.dashboard_queries()
+
+        # The group check and the store lookup are served from the cache
+        self.assertEqual(second, first - 2)
+        self.assertEqual(response.context['store'], self.store)
+
+    def test_group_change_invalidates_roles(self):
+        self.dashboard_queries()
+        self.manager.groups.clear()
+
+        response, _ = self.dashboard_queries()
+        self.assertEqual(response.status_code, 302)
+
+    def test_per_process_cache_keeps_roles_briefly(self):
+        self.assertEqual(roles._timeout(), roles.LOCAL_CACHE_MAX_TIMEOUT)
+        # A shared cache sees every invalidation, so the full timeout applies
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}):
+            self.assertEqual(roles._timeout(), 3600)
+
+    def test_store_ownership_change_invalidates_roles(self):
+        self.dashboard_queries()
+        other = User.objects.create_user(username='other', password='secret')
+        self.store.owner = other
+        self.store.save()
+
+        response, _ = self.dashboard_queries()
+        self.assertIn('error', response.context)
+
+
+class StoreManagerDashboardTests(StoreDataMixin, TestCase):
+    def dashboard_queries(self, **params):
+        self.client.force_login(self.manager)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('store_manager_dashboard'), params)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_query_count_does_not_grow_with_products(self):
+        _, few = self.dashboard_queries()
+
+        other = Category.objects.create(name='Snacks')
+        for i in range(40):
+            StoreProduct.objects.create(
+                store=self.store,
+                product=Product.objects.create(name=f'Snack {i}', category=other),
+                price=Decimal('1.00'),
+                quantity=i,
+            )
+        response, many = self.dashboard_queries()
+
+        self.assertEqual(many, few)
+        self.assertEqual(len(response.context['store_products']), 25)
+
+    def test_filter_by_category_and_sort_by_stock(self):
+        StoreProduct.objects.filter(pk=self.store_products[1].pk).update(quantity=3)
+        other = Category.objects.create(name='Snacks')
+        StoreProduct.objects.create(
+            store=self.store, product=Product.objects.create(name='Chips', category=other),
+            price=Decimal('1.00'), quantity=1,
+        )
+
+        response, _ = self.dashboard_queries(category=self.category.pk, sort='stock')
+
+        names = [sp.product.name for sp in response.context['store_products']]
+        self.assertEqual(names, ['Product B', 'Product A', 'Product C'])
+
+
+class MultiStoreTests(StoreDataMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.second = Store.objects.create(name='Second', address='Side street', owner=self.manager)
+        self.second_product = StoreProduct.objects.create(
+            store=self.second, product=self.store_products[0].product,
+            price=Decimal('3.00'), quantity=4, reorder_threshold=5,
+        )
+        self.client.force_login(self.manager)
+
+    def select(self, store):
+        return self.client.post(reverse('select_store'), {'store': store, 'next': reverse('dispatch_report')})
+
+    def test_selected_store_is_kept_in_the_session(self):
+        response = self.client.get(reverse('store_manager_dashboard'))
+        self.assertEqual(response.context['store'], self.store)
+
+        response = self.select(self.second.pk)
+        self.assertRedirects(response, reverse('dispatch_report'))
+
+        response = self.client.get(reverse('store_manager_dashboard'))
+        self.assertEqual(response.context['store'], self.second)
+        self.assertEqual([sp.pk for sp in response.context['store_products']], [self.second_product.pk])
+
+    def test_cannot_select_a_store_of_another_manager(self):
+        other = Store.objects.create(name='Other', address='Far away', owner=User.objects.create_user('other'))
+
+        self.select(other.pk)
+
+        response = self.client.get(reverse('store_manager_dashboard'))
+        self.assertEqual(response.context['store'], self.store)
+
+    def test_combined_dashboard_groups_totals_per_store(self):
+        self.select('all')
+        self.client.get(reverse('store_manager_dashboard'))
+        with CaptureQueriesContext(connection) as few:
+            response = self.client.get(reverse('store_manager_dashboard'))
+
+        self.assertIsNone(response.context['store'])
+        self.assertEqual(len(response.context['store_products']), 4)
+        summaries = {store.name: store for store in response.context['store_summaries']}
+        self.assertEqual(summaries['Main'].sku_count, 3)
+        self.assertEqual(summaries['Main'].stock_value, Decimal('6000.00'))
+        self.assertEqual(summaries['Second'].stock_units, 4)
+        self.assertEqual(summaries['Second'].low_stock_count, 1)
+
+        third = Store.objects.create(name='Third', address='Back street', owner=self.manager)
+        StoreProduct.objects.create(store=third, product=self.store_products[1].product, price=1, quantity=1)
+        self.client.get(reverse('store_manager_dashboard'))
+        with CaptureQueriesContext(connection) as more:
+            self.client.get(reverse('store_manager_dashboard'))
+        self.assertEqual(len(more), len(few))
+
+    def test_combined_report_breaks_down_by_store(self):
+        self.dispatch(self.store_products[0], 2)
+        self.dispatch(self.second_product, 1)
+        self.select('all')
+
+        response = self.client.get(reverse('dispatch_report'))
+
+        self.assertEqual(response.context['totals']['dispatch_count'], 2)
+        self.assertEqual(
+            [(row['store_name'], row['revenue']) for row in response.context['by_store']],
+            [('Main', Decimal('4.00')), ('Second', Decimal('3.00'))],
+        )
+
+    def test_dispatch_for_unselected_store_is_refused(self):
+        self.select(self.second.pk)
+
+        response = self.client.post(reverse('record_dispatch'), {
+            'store_product': self.store_products[0].pk, 'quantity_sold': 1, 'discount': '0',
+        })
+
+        self.assertRedirects(response, reverse('record_dispatch'), fetch_redirect_response=False)
+        self.assertFalse(Dispatch.objects.exists())
+
+
+class AdminDashboardTests(StoreDataMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_superuser('admin', password='secret'))
+
+    def dashboard(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin_dashboard'), params)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_kpis_are_computed_per_store(self):
+        self.dispatch(self.store_products[0], 3)
+        yesterday = self.dispatch(self.store_products[1], 1)
+        Dispatch.objects.filter(pk=yesterday.pk).update(timestamp=timezone.now() - datetime.timedelta(days=1))
+        StoreProduct.objects.filter(pk=self.store_products[2].pk).update(quantity=0)
+        empty = Store.objects.create(name='Empty', address='Nowhere', owner=self.manager)
+
+        response, _ = self.dashboard()
+
+        stores = {store.pk: store for store in response.context['stores']}
+        main = stores[self.store.pk]
+        self.assertEqual(main.sku_count, 3)
+        self.assertEqual(main.stock_value, Decimal('4000.00'))  # (1000 + 1000 + 0) x 2.00
+        self.assertEqual(main.today_revenue, Decimal('6.00'))
+        self.assertEqual(main.low_stock_count, 1)
+        self.assertEqual(
+            (stores[empty.pk].sku_count, stores[empty.pk].stock_value, stores[empty.pk].today_revenue),
+            (0, Decimal('0.00'), Decimal('0.00')),
+        )
+
+    def test_sort_by_kpi_and_query_count_does_not_grow_with_stores(self):
+        _, few = self.dashboard(sort='-value')
+        for i in range(30):
+            store = Store.objects.create(name=f'Store {i:02}', address='Street', owner=self.manager)
+            StoreProduct.objects.create(
+                store=store, product=self.store_products[0].product, price=Decimal('1.00'), quantity=i,
+            )
+
+        response, many = self.dashboard(sort='-value')
+
+        self.assertEqual(many, few)
+        names = [store.name for store in response.context['stores']]
+        self.assertEqual(names[:3], ['Main', 'Store 29', 'Store 28'])
+        self.assertEqual(len(names), 25)
+
+
+class ProductSearchViewTests(StoreDataMixin, TestCase):
+    def test_manager_sees_stock_of_their_store(self):
+        self.client.force_login(self.manager)
+
+        response = self.client.get(reverse('product_search'), {'q': 'product a'})
+
+        results = response.json()['results']
+        self.assertEqual([result['name'] for result in results], ['Product A'])
+        self.assertEqual(results[0]['stock'], [{
+            'store_product': self.store_products[0].pk, 'store': self.store.pk,
+            'price': '2.00', 'quantity': 1000,
+        }])
+
+    def test_other_users_are_refused(self):
+        self.client.force_login(User.objects.create_user('clerk'))
+
+        response = self.client.get(reverse('product_search'), {'q': 'product'})
+
+        self.assertEqual(response.status_code, 302)
+
+
+class SessionProfileTests(StoreDataMixin, TestCase):
+    def test_cookie_profile_never_writes_sessions(self):
+        session_engine, message_storage = session_config('cookie')
+        with override_settings(SESSION_ENGINE=session_engine, MESSAGE_STORAGE=message_storage):
+            self.client.post(reverse('login'), {'username': 'manager', 'password': 'secret'})
+            response = self.client.post(reverse('record_dispatch'), {
+                'store_product': self.store_products[0].pk, 'quantity_sold': 1, 'discount': '0',
+            }, follow=True)
+
+        self.assertEqual(
+            [str(message) for message in response.context['messages']], ['Dispatch recorded successfully!']
+        )
+        self.assertEqual(Dispatch.objects.count(), 1)
+        self.assertFalse(Session.objects.exists())
+
+    def test_unknown_profile_is_refused(self):
+        with self.assertRaises(ValueError):
+            session_config('redis')
+
+    def test_cached_db_profile_needs_a_shared_cache(self):
+        locmem = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+        with self.assertRaises(ImproperlyConfigured):
+            session_config('cached_db', locmem)
+        redis = {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://cache:6379'}
+        self.assertEqual(session_config('cached_db', redis)[0], 'django.contrib.sessions.backends.cached_db')
+        self.assertEqual(session_config('db', locmem)[0], 'django.contrib.sessions.backends.db')
+
+    def test_purge_deletes_expired_sessions_in_batches(self):
+        now = timezone.now()
+        for i in range(5):
+            Session.objects.create(session_key=f'expired{i}', session_data='', expire_date=now - datetime.timedelta(days=1))
+        Session.objects.create(session_key='live', session_data='', expire_date=now + datetime.timedelta(days=1))
+        out = StringIO()
+
+        call_command('purge_sessions', batch_size=2, pause=0, stdout=out)
+
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['live'])
+        self.assertIn('Deleted 5 expired sessions in 3 batches', out.getvalue())
+
+
+@override_settings(PROFILING_ENABLED=True)
+class ProfilingTests(StoreDataMixin, TestCase):
+    def test_requests_are_recorded_per_view(self):
+        self.client.force_login(self.manager)
+        self.client.get(reverse('store_manager_dashboard'))
+        self.client.get(reverse('store_manager_dashboard'))
+
+        rows = {row['view']: row for row in profiling.summarize(profiling.collect())}
+        dashboard = rows['store_manager_dashboard']
+        self.assertEqual(dashboard['requests'], 2)
+        self.assertGreater(dashboard['queries_mean'], 0)
+        self.assertGreater(dashboard['bytes_mean'], 0)
+        self.assertEqual(dashboard['duplicate_queries'], 0)
+
+    def test_repeated_statements_are_flagged(self):
+        recorder = profiling.QueryRecorder()
+        for _ in range(3):
+            recorder(lambda *args: None, 'SELECT 1 WHERE id = %s', [1], False, {})
+        recorder(lambda *args: None, 'SELECT 2', [], False, {})
+
+        profiling.record('looping_view', 12.5, recorder, size=800)
+
+        row = profiling.summarize(profiling.collect())[0]
+        self.assertEqual(row['queries_p50'], 5)
+        self.assertEqual(row['wall_ms_p95'], 20)
+        self.assertEqual(row['duplicate_queries'], 2)
+        self.assertEqual(row['most_repeated'], ('SELECT 1 WHERE id = %s', 3))
+
+    def test_stats_endpoint_is_admin_only(self):
+        self.client.force_login(self.manager)
+        self.assertEqual(self.client.get(reverse('profiling_stats')).status_code, 302)
+
+        self.client.force_login(User.objects.create_superuser('admin', password='secret'))
+        self.client.get(reverse('admin_dashboard'))
+        response = self.client.get(reverse('profiling_stats'))
+
+        self.assertIn('admin_dashboard', [row['view'] for row in response.json()['views']])
+        self.assertFalse(response.json()['shared'])
+
+    def test_report_command_needs_a_shared_cache(self):
+        # The command runs in a process of its own, which never sees what
+        # the workers kept in their local memory
+        with self.assertRaisesMessage(CommandError, 'shared cache backend'):
+            call_command('profiling_report', stdout=StringIO())
+
+        with tempfile.TemporaryDirectory() as location, override_settings(
+            CACHES={
+                'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                'profiling': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location},
+            },
+            PROFILING_CACHE='profiling',
+        ):
+            self.client.force_login(self.manager)
+            self.client.get(reverse('store_manager_dashboard'))
+            out = StringIO()
+            call_command('profiling_report', stdout=out)
+        self.assertIn('store_manager_dashboard', out.getvalue())
+
+
+class LowStockTests(StoreDataMixin, TestCase):
+    def test_dispatch_below_threshold_lists_item(self):
+        store_product = self.store_products[0]
+        StoreProduct.objects.filter(pk=store_product.pk).update(reorder_threshold=10)
+        self.assertFalse(StoreProduct.objects.low_stock().exists())
+
+        stock.record_dispatch(store_product, 995, store=self.store)
+        self.client.force_login(self.manager)
+        response = self.client.get(reverse('low_stock'))
+
+        self.assertEqual(
+            [sp.pk for sp in response.context['store_products']], [store_product.pk]
+        )
+        self.assertContains(response, 'Product A')
+
+    def test_out_of_stock_is_low_with_default_threshold(self):
+        StoreProduct.objects.filter(pk=self.store_products[2].pk).update(quantity=0)
+
+        out = StringIO()
+        call_command('low_stock_report', stdout=out)
+
+        self.assertIn('Product C: 0 left', out.getvalue())
+        self.assertIn('1 store products below threshold.', out.getvalue())
+
+
+class DispatchReportTests(StoreDataMixin, TestCase):
+    def test_totals_are_aggregated_in_the_database(self):
+        for i in range(5):
+            self.dispatch(self.store_products[i % 3], 2, discount=Decimal('1.00'))
+
+        # One aggregate over the rollup for past days, one over today's rows
+        with self.assertNumQueries(2):
+            totals = DispatchReport(self.store).totals()
+
+        self.assertEqual(totals['dispatch_count'], 5)
+        self.assertEqual(totals['total_quantity'], 10)
+        self.assertEqual(totals['total_discount'], Decimal('5.00'))
+        self.assertEqual(totals['total_revenue'], Decimal('15.00'))
+
+    def test_keyset_pages_cover_every_row_once(self):
+        created = {self.dispatch(self.store_products[0], 1).pk for _ in range(7)}
+
+        report = DispatchReport(self.store)
+        seen, cursor = [], None
+        while True:
+            with self.assertNumQueries(1):
+                rows, cursor = report.page(cursor, page_size=3)
+            seen.extend(row['id'] for row in rows)
+            if cursor is None:
+                break
+
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(set(seen), created)
+
+    def test_report_view_renders_breakdowns(self):
+        self.dispatch(self.store_products[0], 3)
+        self.client.force_login(self.manager)
+
+        response = self.client.get(reverse('dispatch_report'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Product A')
+        self.assertEqual(response.context['totals']['total_quantity'], 3)
+
+
+class AsyncViewTests(StoreDataMixin, TestCase):
+    def arequest(self, path, **data):
+        """A GET request as the middleware would leave it for an async view."""
+        request = AsyncRequestFactory().get(path, data)
+        request.session = SessionStore()
+        request.user = self.manager
+
+        async def auser():
+            return self.manager
+
+        request.auser = auser
+        return request
+
+    async def test_async_report_matches_sync_report(self):
+        for i in range(5):
+            await Dispatch.objects.acreate(
+                store_product=self.store_products[i % 3], quantity_sold=2,
+                discount=Decimal('1.00'), sold_by=self.manager,
+            )
+        report = DispatchReport(self.store)
+
+        self.assertEqual(await report.atotals(), await sync_to_async(report.totals)())
+        self.assertEqual(await report.aby_product(), await sync_to_async(report.by_product)())
+        self.assertEqual(await report.aby_day(), await sync_to_async(report.by_day)())
+        self.assertEqual(await report.apage(None, page_size=3), await sync_to_async(report.page)(None, page_size=3))
+
+    async def test_async_dashboard_and_report_render(self):
+        await Dispatch.objects.acreate(
+            store_product=self.store_products[0], quantity_sold=3, discount=0, sold_by=self.manager,
+        )
+
+        dashboard = await async_views.store_manager_dashboard(self.arequest(reverse('store_manager_dashboard')))
+        report = await async_views.dispatch_report(self.arequest(reverse('dispatch_report')))
+
+        self.assertContains(dashboard, 'Product B')
+        self.assertContains(report, 'Product A')
+
+    async def test_async_dashboard_refuses_missing_pages_like_sync(self):
+        await sync_to_async(self.client.force_login)(self.manager)
+        response = await sync_to_async(self.client.get)(reverse('store_manager_dashboard'), {'page': 2})
+        self.assertEqual(response.status_code, 404)
+
+        with self.assertRaises(Http404):
+            await async_views.store_manager_dashboard(self.arequest(reverse('store_manager_dashboard'), page=2))
+
+    def test_async_catalog_page_is_served_from_cache(self):
+        view = async_to_sync(AsyncProductListView.as_view())
+        response = view(self.arequest(reverse('product-list')))
+        self.assertContains(response, 'Product C')
+
+        # The async ORM runs its queries on this thread's connection
+        with self.assertNumQueries(0):
+            response = view(self.arequest(reverse('product-list')))
+        self.assertContains(response, 'Product C')
+
+
+class DispatchExportTests(StoreDataMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.dispatch(self.store_products[0], 2, discount=Decimal('0.50'))
+        self.dispatch(self.store_products[1], 1)
+        self.client.force_login(self.manager)
+
+    def test_csv_export_streams_every_dispatch(self):
+        response = self.client.get(reverse('export_dispatches'), {'format': 'csv'})
+
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:4], ['id', 'timestamp', 'store', 'product'])
+        self.assertEqual(len(lines), 3)
+        self.assertIn('Product A', lines[1])
+
+    def test_xlsx_export_is_a_valid_workbook(self):
+        response = self.client.get(reverse('export_dispatches'), {'format': 'xlsx'})
+
+        workbook = zipfile.ZipFile(BytesIO(b''.join(response.streaming_content)))
+        self.assertIsNone(workbook.testzip())
+        sheet = ElementTree.fromstring(workbook.read('xl/worksheets/sheet1.xml'))
+        namespace = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+        rows = sheet.findall(f'{namespace}sheetData/{namespace}row')
+        self.assertEqual(len(rows), 3)
+
+    def test_all_stores_export_is_admin_only(self):
+        response = self.client.get(reverse('export_all_dispatches'))
+        self.assertEqual(response.status_code, 302)
+
+        admin = User.objects.create_superuser(username='admin', password='secret')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('export_all_dispatches'))
+        self.assertEqual(len(b''.join(response.streaming_content).decode().splitlines()), 3)
+
+
+class DailySalesRollupTests(StoreDataMixin, TestCase):
+    def backdate(self, dispatch, days):
+        Dispatch.objects.filter(pk=dispatch.pk).update(
+            timestamp=timezone.now() - datetime.timedelta(days=days)
+        )
+
+    def test_dispatches_are_rolled_up_incrementally(self):
+        self.dispatch(self.store_products[0], 2, discount=Decimal('0.50'))
+        self.dispatch(self.store_products[0], 3)
+
+        rollup = DailyStoreProductSales.objects.get(store_product=self.store_products[0])
+        self.assertEqual(rollup.date, timezone.localdate())
+        self.assertEqual(rollup.quantity_sold, 5)
+        self.assertEqual(rollup.revenue, Decimal('9.50'))
+        self.assertEqual(rollup.dispatch_count, 2)
+
+    def test_report_reads_rollup_for_past_days_and_raw_rows_for_today(self):
+        old = self.dispatch(self.store_products[0], 4)
+        self.backdate(old, days=3)
+        call_command('rebuild_sales_rollup', stdout=open('/dev/null', 'w'))
+        self.dispatch(self.store_products[1], 1)
+
+        # Raw rows from the past are no longer read for totals: deleting them
+        # leaves the report unchanged.
+        Dispatch.objects.filter(pk=old.pk).delete()
+        report = DispatchReport(self.store)
+
+        self.assertEqual(report.totals()['total_quantity'], 5)
+        self.assertEqual([row['quantity'] for row in report.by_day()], [4, 1])
+        self.assertEqual(
+            {row['product_name']: row['quantity'] for row in report.by_product()},
+            {'Product A': 4, 'Product B': 1},
+        )
+
+    def test_rebuild_matches_incremental_rollup(self):
+        for i in range(6):
+            self.dispatch(self.store_products[i % 2], i + 1, discount=Decimal('0.25'))
+        incremental = list(DailyStoreProductSales.objects.order_by('store_product').values_list(
+            'store_product', 'quantity_sold', 'revenue', 'discount', 'dispatch_count'
+        ))
+
+        call_command('rebuild_sales_rollup', stdout=open('/dev/null', 'w'))
+
+        rebuilt = list(DailyStoreProductSales.objects.order_by('store_product').values_list(
+            'store_product', 'quantity_sold', 'revenue', 'discount', 'dispatch_count'
+        ))
+        self.assertEqual(rebuilt, incremental)
+
+
+class DispatchArchiveTests(StoreDataMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.old = []
+        for days, quantity in ((40, 1), (30, 2), (20, 3)):
+            dispatch = self.dispatch(self.store_products[0], quantity)
+            Dispatch.objects.filter(pk=dispatch.pk).update(
+                timestamp=timezone.now() - datetime.timedelta(days=days)
+            )
+            self.old.append(dispatch)
+        self.recent = self.dispatch(self.store_products[1], 4)
+        call_command('rebuild_sales_rollup', stdout=StringIO())
+
+    def archive(self, **options):
+        call_command('archive_dispatches', days=10, pause=0, stdout=StringIO(), **options)
+
+    def test_old_dispatches_move_and_reports_are_unchanged(self):
+        report = DispatchReport(self.store)
+        totals, by_day = report.totals(), report.by_day()
+
+        self.archive()
+
+        self.assertEqual(
+            set(DispatchArchive.objects.values_list('pk', flat=True)), {d.pk for d in self.old}
+        )
+        self.assertEqual(list(Dispatch.objects.values_list('pk', flat=True)), [self.recent.pk])
+        self.assertEqual(report.totals(), totals)
+        self.assertEqual(report.by_day(), by_day)
+        rows, _ = report.page()
+        self.assertEqual([row['quantity_sold'] for row in rows], [4, 3, 2, 1])
+        self.assertEqual([row[4] for row in report.export_rows()], [1, 2, 3, 4])
+
+    def test_listing_skips_archive_when_range_starts_after_it(self):
+        self.archive()
+        report = DispatchReport(self.store, start_date=timezone.localdate() - datetime.timedelta(days=5))
+
+        self.assertFalse(report.reaches_archive())
+        rows, _ = report.page()
+        self.assertEqual([row['id'] for row in rows], [self.recent.pk])
+        earlier = DispatchReport(self.store, start_date=timezone.localdate() - datetime.timedelta(days=35))
+        self.assertTrue(earlier.reaches_archive())
+
+    def test_reports_see_an_archive_filled_by_another_process(self):
+        report = DispatchReport(self.store, start_date=timezone.localdate() - datetime.timedelta(days=35))
+        self.assertFalse(report.reaches_archive())
+        self.assertEqual(len(report.page()[0]), 3)
+
+        # Nothing this process caches or is told about changes with the
+        # archive, as when archive_dispatches runs from cron
+        with self.captureOnCommitCallbacks(execute=False):
+            self.archive()
+
+        self.assertTrue(report.reaches_archive())
+        self.assertTrue(async_to_sync(report.areaches_archive)())
+        self.assertEqual([row['quantity_sold'] for row in report.page()[0]], [4, 3, 2])
+        self.assertEqual([row[4] for row in report.export_rows()], [2, 3, 4])
+
+    def test_archiving_is_resumable_in_batches(self):
+        self.archive(batch_size=2, max_batches=1)
+        self.assertEqual(DispatchArchive.objects.count(), 2)
+        self.assertEqual(archive.archived_until(), DispatchArchive.objects.get(pk=self.old[1].pk).timestamp)
+
+        self.archive(batch_size=2)
+        self.assertEqual(DispatchArchive.objects.count(), 3)
+        self.assertEqual(Dispatch.objects.count(), 1)
+
+    def test_rebuild_counts_archived_dispatches(self):
+        before = list(DailyStoreProductSales.objects.order_by('date').values_list('date', 'quantity_sold'))
+        self.archive()
+
+        call_command('rebuild_sales_rollup', stdout=StringIO())
+
+        after = list(DailyStoreProductSales.objects.order_by('date').values_list('date', 'quantity_sold'))
+        self.assertEqual(after, before)
+
+
+class StockReservationTests(StoreDataMixin, TestCase):
+    def test_dispatch_decrements_stock_in_one_update(self):
+        store_product = self.store_products[0]
+        # Conditional UPDATE, stock movement and dispatch INSERTs plus the
+        # rollup UPDATE and INSERT, wrapped in savepoints
+        with self.assertNumQueries(9):
+            stock.record_dispatch(store_product, 10, sold_by=self.manager, store=self.store)
+
+        store_product.refresh_from_db()
+        self.assertEqual(store_product.quantity, 990)
+
+    def test_insufficient_stock_writes_nothing(self):
+        store_product = self.store_products[0]
+        with self.assertRaises(stock.InsufficientStock):
+            stock.record_dispatch(store_product, 1001, store=self.store)
+
+        store_product.refresh_from_db()
+        self.assertEqual(store_product.quantity, 1000)
+        self.assertFalse(Dispatch.objects.exists())
+
+    def test_view_reports_insufficient_stock(self):
+        self.client.force_login(self.manager)
+        response = self.client.post(reverse('record_dispatch'), {
+            'store_product': self.store_products[0].pk, 'quantity_sold': 5000, 'discount': 0,
+        }, follow=True)
+
+        self.assertContains(response, 'Not enough stock available.')
+        self.assertFalse(Dispatch.objects.exists())
+
+
+class DispatchBatchTests(StoreDataMixin, TestCase):
+    def post_batch(self, lines):
+        self.client.force_login(self.manager)
+        return self.client.post(
+            reverse('record_dispatch_batch'), json.dumps(lines), content_type='application/json'
+        )
+
+    def test_batch_is_recorded_atomically(self):
+        first, second = self.store_products[:2]
+        response = self.post_batch([
+            {'store_product': first.pk, 'quantity': 2, 'discount': '0.50'},
+            {'store_product': second.pk, 'quantity': 3},
+            {'store_product': first.pk, 'quantity': 1},
+        ])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['total_amount'], '11.50')
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.quantity, second.quantity), (997, 997))
+        self.assertEqual(Dispatch.objects.count(), 3)
+        self.assertEqual(DailyStoreProductSales.objects.get(store_product=first).quantity_sold, 3)
+
+    def test_batch_query_count_does_not_grow_with_lines(self):
+        lines = [{'store_product': sp.pk, 'quantity': 1} for sp in self.store_products]
+        # Creates today's rollup rows
+        stock.record_dispatch_batch(self.store, lines)
+
+        # Ownership/stock SELECT, stock UPDATE, dispatch and movement bulk
+        # INSERTs and rollup UPDATE, plus the transaction savepoints
+        with self.assertNumQueries(7):
+            stock.record_dispatch_batch(self.store, lines[:1])
+        with self.assertNumQueries(7):
+            stock.record_dispatch_batch(self.store, lines * 10)
+
+    def test_bad_line_rejects_whole_batch(self):
+        other_owner = User.objects.create_user(username='other', password='secret')
+        other_store = Store.objects.create(name='Other', address='Elsewhere', owner=other_owner)
+        foreign = StoreProduct.objects.create(
+            store=other_store, product=self.store_products[0].product, price=1, quantity=10,
+        )
+
+        response = self.post_batch([
+            {'store_product': self.store_products[0].pk, 'quantity': 1},
+            {'store_product': foreign.pk, 'quantity': 1},
+            {'store_product': self.store_products[1].pk, 'quantity': 5000},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['line'] for error in response.json()['errors']], [2, 3])
+        self.assertFalse(Dispatch.objects.exists())
+        self.store_products[0].refresh_from_db()
+        self.assertEqual(self.store_products[0].quantity, 1000)
+
+
+    def test_lines_are_validated_like_the_form(self):
+        store_product = self.store_products[0].pk
+        bad_lines = [
+            {'store_product': store_product, 'quantity': 2.9},
+            {'store_product': store_product, 'quantity': True},
+            {'store_product': store_product, 'quantity': 1, 'discount': '123456'},
+            {'store_product': store_product, 'quantity': 1, 'discount': '0.001'},
+            {'store_product': store_product, 'quantity': 1, 'discount': 'NaN'},
+        ]
+        response = self.post_batch(bad_lines + [{'store_product': store_product, 'quantity': '2'}])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['line'] for error in response.json()['errors']], [1, 2, 3, 4, 5])
+        self.assertFalse(Dispatch.objects.exists())
+
+    def test_discount_cannot_exceed_line_total(self):
+        # Two units at 2.00
+        response = self.post_batch([{'store_product': self.store_products[0].pk, 'quantity': 2, 'discount': '4.01'}])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'][0]['error'], 'Discount cannot exceed the line total.')
+        self.assertFalse(Dispatch.objects.exists())
+
+
+class StockContentionTests(TransactionTestCase):
+    """Many threads selling the same store product must never oversell it."""
+
+    threads = 8
+    attempts_per_thread = 10
+
+    def setUp(self):
+        owner = User.objects.create_user(username='owner', password='secret')
+        self.store = Store.objects.create(name='Busy', address='High street', owner=owner)
+        product = Product.objects.create(name='Bestseller', category=Category.objects.create(name='Hot'))
+        self.store_product = StoreProduct.objects.create(
+            store=self.store, product=product, price=Decimal('1.00'), quantity=50,
+        )
+
+    def sell(self, store_product, results):
+        try:
+            for _ in range(self.attempts_per_thread):
+                while True:
+                    try:
+                        stock.record_dispatch(store_product, 1, store=self.store)
+                        results.append(True)
+                    except stock.InsufficientStock:
+                        results.append(False)
+                    except OperationalError:
+                        # SQLite reports lock contention instead of waiting; retry
+                        continue
+                    break
+        finally:
+            connection.close()
+
+    def test_no_oversell_under_contention(self):
+        results = []
+        workers = [
+            threading.Thread(
+                target=self.sell,
+                args=(StoreProduct.objects.get(pk=self.store_product.pk), results),
+            )
+            for _ in range(self.threads)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.store_product.refresh_from_db()
+        sold = results.count(True)
+        self.assertEqual(len(results), self.threads * self.attempts_per_thread)
+        self.assertEqual(sold, 50)
+        self.assertEqual(self.store_product.quantity, 0)
+        self.assertEqual(Dispatch.objects.count(), sold)
+        self.assertEqual(
+            DailyStoreProductSales.objects.get(store_product=self.store_product).quantity_sold, sold
+        )
+
+
+class BenchmarkIndexesTests(StoreDataMixin, TestCase):
+    def benchmark(self, **options):
+        options = {'dispatches': 30, 'stores': 2, 'products': 3, 'days': 5, 'repeat': 1, **options}
+        call_command('benchmark_indexes', stdout=StringIO(), **options)
+
+    def test_refuses_to_seed_a_database_with_real_stores(self):
+        with self.assertRaisesMessage(CommandError, 'real data'):
+            self.benchmark()
+        self.assertFalse(User.objects.filter(username='benchmark-owner').exists())
+        self.assertEqual(Dispatch.objects.count(), 0)
+
+    def test_synthetic_products_stay_out_of_real_stores(self):
+        self.benchmark(yes=True)
+
+        self.assertEqual(Dispatch.objects.count(), 30)
+        self.assertEqual(self.store.store_products.count(), 3)
+        self.assertFalse(Dispatch.objects.filter(store_product__store=self.store).exists())
+        bench_products = StoreProduct.objects.filter(store__owner__username='benchmark-owner')
+        self.assertEqual(bench_products.count(), 2 * 3)
+        self.assertFalse(bench_products.filter(product__category=self.category).exists())
+
+
+class BenchmarkWorkflowsTests(StoreDataMixin, TestCase):
+    def test_refuses_to_write_to_a_database_with_real_stores(self):
+        with self.assertRaisesMessage(CommandError, 'real data'):
+            call_command('benchmark_workflows', scenarios=['record_dispatch'], stdout=StringIO())
+        self.assertEqual(Dispatch.objects.count(), 0)
+
+    def test_only_seeded_managers_are_targets(self):
+        with self.assertRaisesMessage(CommandError, 'No seeded store managers'):
+            call_command('benchmark_workflows', scenarios=['dispatch_report'], stdout=StringIO())
+
+
+class SeedInventoryTests(TestCase):
+    def seed(self, **options):
+        options = {'stores': 2, 'categories': 3, 'products': 5, 'dispatches': 40, 'days': 10, **options}
+        call_command('seed_inventory', stdout=StringIO(), **options)
+
+    def test_seeds_requested_scale(self):
+        self.seed()
+
+        self.assertEqual(Store.objects.count(), 2)
+        self.assertEqual(Product.objects.count(), 5)
+        self.assertEqual(StoreProduct.objects.count(), 10)
+        self.assertEqual(Dispatch.objects.count(), 40)
+        manager = User.objects.get(username='seed-manager-0')
+        self.assertTrue(manager.groups.filter(name='Store Manager').exists())
+        self.assertTrue(manager.check_password('benchmark'))
+        # Dispatches are spread over the past and the rollup covers all of them
+        self.assertGreater(Dispatch.objects.dates('timestamp', 'day').count(), 1)
+        self.assertEqual(
+            DailyStoreProductSales.objects.aggregate(total=Sum('quantity_sold'))['total'],
+            Dispatch.objects.aggregate(total=Sum('quantity_sold'))['total'],
+        )
+
+    def test_history_matches_rollup_and_ledger(self):
+        self.seed()
+
+        rollup_fields = ('store_product', 'date', 'quantity_sold', 'revenue', 'dispatch_count')
+        seeded = list(DailyStoreProductSales.objects.order_by('store_product', 'date').values_list(*rollup_fields))
+        call_command('rebuild_sales_rollup', stdout=StringIO())
+        rebuilt = list(DailyStoreProductSales.objects.order_by('store_product', 'date').values_list(*rollup_fields))
+        self.assertEqual(seeded, rebuilt)
+
+        # Opening stock minus the dispatches adds up to the seeded quantities
+        ledger = dict(StockMovement.objects.values('store_product').annotate(total=Sum('change'))
+                      .values_list('store_product', 'total'))
+        for pk, quantity in StoreProduct.objects.values_list('pk', 'quantity'):
+            self.assertEqual(ledger.get(pk, 0), quantity)
+        self.assertEqual(StockMovement.objects.filter(reason=StockMovement.DISPATCH).count(), 40)
+
+    def test_same_seed_gives_same_data(self):
+        def seeded_data(seed):
+            with transaction.atomic():
+                self.seed(seed=seed, end_date=datetime.date(2024, 3, 31))
+                data = (
+                    list(StoreProduct.objects.order_by('pk').values_list('store', 'product', 'price', 'quantity')),
+                    list(Dispatch.objects.order_by('pk').values_list('store_product', 'quantity_sold', 'timestamp')),
+                )
+                transaction.set_rollback(True)
+            return data
+
+        first = seeded_data(seed=1)
+        self.assertEqual(seeded_data(seed=1), first)
+        self.assertNotEqual(seeded_data(seed=2), first)
+        self.assertEqual(max(timestamp for _, _, timestamp in first[1]).date(), datetime.date(2024, 3, 31))
+
+    def test_refuses_to_seed_twice(self):
+        self.seed()
+        with self.assertRaises(CommandError):
+            self.seed()
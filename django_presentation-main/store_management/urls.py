@@ -1,13 +1,24 @@
+from django.conf import settings
 from django.urls import path
-from .views import dispatch_report, login_view, logout_view, admin_dashboard, record_dispatch, store_manager_dashboard, update_product
+from .views import dispatch_report, login_view, logout_view, admin_dashboard, record_dispatch, record_dispatch_batch, store_manager_dashboard, update_product, low_stock, export_dispatches, export_all_dispatches, select_store, product_search, profiling_stats
+
+if settings.ASYNC_VIEWS:
+    from .async_views import dispatch_report, store_manager_dashboard
 
 urlpatterns = [
     path("login/", login_view, name="login"),
     path("logout/", logout_view, name="logout"),
     path("admin-dashboard/", admin_dashboard, name="admin_dashboard"),
+    path("admin-dashboard/profiling/", profiling_stats, name="profiling_stats"),
+    path("select-store/", select_store, name="select_store"),
     path("store-manager-dashboard/", store_manager_dashboard, name="store_manager_dashboard"),
     path('update-product/<int:product_id>/', update_product, name='update_product'),
+    path("low-stock/", low_stock, name="low_stock"),
     path("record-dispatch/", record_dispatch, name="record_dispatch"),
+    path("record-dispatch/batch/", record_dispatch_batch, name="record_dispatch_batch"),
+    path("products/search/", product_search, name="product_search"),
     path("dispatch-report/", dispatch_report, name="dispatch_report"),
+    path("dispatch-report/export/", export_dispatches, name="export_dispatches"),
+    path("dispatch-report/export/all/", export_all_dispatches, name="export_all_dispatches"),
 ]
 
@@ -1,19 +1,63 @@
-from django.db.models import Sum
+import json
+
+from django.conf import settings
+from django.core.paginator import InvalidPage, Paginator
+from django.db import transaction
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, render, redirect
+from django.urls import reverse
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.http import require_POST
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
-from inventory.models import Product, Store, StoreProduct
+from inventory.ledger import adjust_quantity
+from inventory.models import Category, Product, Store, StoreProduct
+from inventory.search import search_products
 from django.contrib import messages
+from store_management import profiling, stock
 from store_management.forms import DispatchForm, ProductUpdateForm
-from store_management.models import Dispatch
+from store_management.exports import EXPORT_FORMATS
+from store_management.reports import DispatchReport, parse_date, store_kpis
+from store_management.roles import (
+    ALL_STORES, SELECTED_STORE_SESSION_KEY, get_roles, roles_required, selected_stores, store_manager_required,
+)
+
+
+DASHBOARD_PAGE_SIZE = 25
+
+# Sort keys accepted by the store manager dashboard
+DASHBOARD_SORTS = {
+    "name": "product__name",
+    "-name": "-product__name",
+    "stock": "quantity",
+    "-stock": "-quantity",
+    "price": "price",
+    "-price": "-price",
+}
 
+ADMIN_PAGE_SIZE = 25
+SEARCH_LIMIT = 20
+
+# Sort keys accepted by the admin dashboard, one per KPI column
+ADMIN_SORTS = {
+    "name": "name",
+    "-name": "-name",
+    "skus": "sku_count",
+    "-skus": "-sku_count",
+    "value": "stock_value",
+    "-value": "-stock_value",
+    "revenue": "today_revenue",
+    "-revenue": "-today_revenue",
+    "low": "low_stock_count",
+    "-low": "-low_stock_count",
+}
 
 # Utility functions for role-based access
 def is_admin(user):
     return user.is_superuser
 
 def is_store_manager(user):
-    return user.groups.filter(name="Store Manager").exists()
+    return get_roles(user).is_store_manager
 
 # Authentication Views
 def login_view(request):
@@ -41,36 +85,137 @@ def logout_view(request):
 @login_required
 @user_passes_test(is_admin)
 def admin_dashboard(request):
-    stores = Store.objects.all()
-    return render(request, "store_management/admin_dashboard.html", {"stores": stores})
+    # Every KPI comes from one grouped query per page, however many stores there are
+    sort = request.GET.get("sort", "name")
+    if sort not in ADMIN_SORTS:
+        sort = "name"
+    stores = store_kpis().order_by(ADMIN_SORTS[sort], "pk")
+    page = Paginator(stores, ADMIN_PAGE_SIZE).get_page(request.GET.get("page"))
+    return render(request, "store_management/admin_dashboard.html", {
+        "page_obj": page,
+        "stores": page.object_list,
+        "sort": sort,
+    })
 
 # Store Manager Views
 @login_required
-@user_passes_test(is_store_manager)
+@store_manager_required
+@require_POST
+def select_store(request):
+    """Remember the store (or the combined view) the manager works on in the session."""
+    selected = request.POST.get("store")
+    if selected == ALL_STORES:
+        request.session[SELECTED_STORE_SESSION_KEY] = ALL_STORES
+    else:
+        store = request.roles.get_store(selected)
+        if store is None:
+            messages.error(request, "You do not manage that store.")
+        else:
+            request.session[SELECTED_STORE_SESSION_KEY] = store.pk
+
+    next_url = request.POST.get("next")
+    if not url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()},
+                                           require_https=request.is_secure()):
+        next_url = reverse("store_manager_dashboard")
+    return redirect(next_url)
+
+def dashboard_queryset(request, stores):
+    """Return (store products, category, sort) for the dashboard's filters and sort order."""
+    # Fetch the stores' products with their product and category joined in,
+    # so the page costs the same number of queries whatever the stores carry
+    store_products = StoreProduct.objects.filter(store__in=stores).select_related("product__category", "store")
+
+    category = request.GET.get("category", "")
+    if category.isdigit():
+        store_products = store_products.filter(product__category_id=category)
+
+    sort = request.GET.get("sort", "name")
+    if sort not in DASHBOARD_SORTS:
+        sort = "name"
+    return store_products.order_by(DASHBOARD_SORTS[sort], "pk"), category, sort
+
+
+def dashboard_page(paginator, number):
+    """The dashboard page ``number`` (the first when not given); Http404 for one that does not exist."""
+    try:
+        return paginator.page(number or 1)
+    except InvalidPage:
+        raise Http404("No such page.")
+
+
+def store_summaries(stores):
+    """The stores with their stock totals (see StoreQuerySet.with_stock_totals)."""
+    return Store.objects.filter(pk__in=[s.pk for s in stores]).with_stock_totals().order_by("name", "pk")
+
+
+@login_required
+@store_manager_required
 def store_manager_dashboard(request):
-    store = request.user.stores.first()  # Fetch the first store the user manages
-    if store is None:
+    # The store picked in the selector, or None for the combined view;
+    # read from the roles cached per user
+    store, stores = selected_stores(request)
+    if not stores:
         # If the user does not have a store assigned, handle accordingly
         return render(request, "store_management/store_manager_dashboard.html", {
             "error": "You are not managing any store at the moment."
         })
 
-    # Fetch products for the store using StoreProduct model
-    store_products = store.store_products.all()  # Get all StoreProduct instances for this store
-    products = [store_product.product for store_product in store_products]  # Extract the actual products
+    store_products, category, sort = dashboard_queryset(request, stores)
+    page = dashboard_page(Paginator(store_products, DASHBOARD_PAGE_SIZE), request.GET.get("page"))
+
+    # The combined view opens with one row of stock totals per store,
+    # grouped by the database in a single query
+    summaries = None
+    if store is None:
+        summaries = store_summaries(stores)
 
     return render(request, "store_management/store_manager_dashboard.html", {
         "store": store,
-        "products": products,
+        "store_summaries": summaries,
+        "page_obj": page,
+        "store_products": page.object_list,
+        "categories": Category.objects.order_by("name"),
+        "category": category,
+        "sort": sort,
+    })
+
+@login_required
+@store_manager_required
+def low_stock(request):
+    store, stores = selected_stores(request)
+    if not stores:
+        return render(request, "store_management/low_stock.html", {
+            "error": "You are not managing any store at the moment."
+        })
+
+    # Served from the partial low-stock index, not a scan of the store's products
+    store_products = (
+        StoreProduct.objects.filter(store__in=stores)
+        .low_stock()
+        .select_related("product__category", "store")
+        .order_by("quantity", "pk")
+    )
+    page = Paginator(store_products, DASHBOARD_PAGE_SIZE).get_page(request.GET.get("page"))
+
+    return render(request, "store_management/low_stock.html", {
+        "store": store,
+        "stores": stores,
+        "page_obj": page,
+        "store_products": page.object_list,
     })
 
 @login_required
-@user_passes_test(is_store_manager)
+@store_manager_required
 def update_product(request, product_id):
     product = get_object_or_404(Product, id=product_id)
     
-    # Check if the user has permission to update the product in their store
-    store_product = StoreProduct.objects.filter(product=product, store__owner=request.user).first()
+    # Check if the user has permission to update the product in their store;
+    # links from the combined view name the store the row belongs to
+    _, stores = selected_stores(request)
+    requested = request.roles.get_store(request.GET.get("store"))
+    if requested is not None:
+        stores = [requested]
+    store_product = StoreProduct.objects.filter(product=product, store__in=stores).first()
 
     if not store_product:
         messages.error(request, "You don't have permission to update this product.")
@@ -80,7 +225,12 @@ def update_product(request, product_id):
         form = ProductUpdateForm(request.POST, instance=store_product)
 
         if form.is_valid():
-            form.save()
+            # The new stock is applied as a logged restock or adjustment
+            # rather than written over whatever dispatches did meanwhile
+            with transaction.atomic():
+                store_product = form.save(commit=False)
+                adjust_quantity(store_product, form.cleaned_data["quantity"], user=request.user)
+                store_product.save(update_fields=["price", "reorder_threshold", "updated"])
             messages.success(request, "Product updated successfully.")
             return redirect("store_manager_dashboard")
         else:
@@ -94,37 +244,46 @@ def update_product(request, product_id):
     })
 
 @login_required
-@user_passes_test(is_store_manager)
+@store_manager_required
 def record_dispatch(request):
-    store = request.user.stores.first()
+    store, stores = selected_stores(request)
+    if not stores:
+        messages.error(request, "You are not managing any store at the moment.")
+        return redirect("store_manager_dashboard")
+    store_ids = {s.pk for s in stores}
 
     if request.method == "POST":
         form = DispatchForm(request.POST)
         if form.is_valid():
             dispatch = form.save(commit=False)
 
-            # Ensure the product belongs to the store
-            if dispatch.store_product.store != store:
+            # Ensure the product belongs to the selected store(s)
+            if dispatch.store_product.store_id not in store_ids:
                 messages.error(request, "You cannot record a dispatch for this product.")
                 return redirect("record_dispatch")
 
-            # Check if there is enough stock
-            if dispatch.quantity_sold > dispatch.store_product.quantity:
+            # Deduct the stock and save the dispatch atomically; the stock
+            # check is part of the UPDATE so concurrent sales cannot oversell
+            try:
+                stock.record_dispatch(
+                    dispatch.store_product,
+                    dispatch.quantity_sold,
+                    discount=dispatch.discount,
+                    sold_by=request.user,
+                    store=dispatch.store_product.store_id,
+                )
+            except stock.InsufficientStock:
                 messages.error(request, "Not enough stock available.")
                 return redirect("record_dispatch")
 
-            # Deduct the stock and save
-            dispatch.store_product.quantity -= dispatch.quantity_sold
-            dispatch.store_product.save()
-            dispatch.sold_by = request.user
-            dispatch.save()
-
             messages.success(request, "Dispatch recorded successfully!")
             return redirect("store_manager_dashboard")
     else:
-        # Limit products in the form to the store the manager is associated with
+        # Limit products in the form to the selected store(s)
         form = DispatchForm()
-        form.fields["store_product"].queryset = StoreProduct.objects.filter(store=store)
+        form.fields["store_product"].queryset = StoreProduct.objects.filter(
+            store__in=stores
+        ).select_related("product", "store")
 
     return render(
         request,
@@ -133,34 +292,154 @@ def record_dispatch(request):
     )
 
 @login_required
-@user_passes_test(is_store_manager)
+@store_manager_required
+@require_POST
+def record_dispatch_batch(request):
+    """
+    Record a whole basket in one request. The body is a JSON list of
+    {"store_product": id, "quantity": n, "discount": "0.00"} lines.
+    """
+    store, stores = selected_stores(request)
+    if not stores:
+        return JsonResponse({"errors": [{"line": None, "error": "You are not assigned to any store."}]}, status=403)
+    if store is None:
+        return JsonResponse({"errors": [{"line": None, "error": "Select a single store to record a batch."}]}, status=400)
+
+    try:
+        lines = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"errors": [{"line": None, "error": "The body must be valid JSON."}]}, status=400)
+    if isinstance(lines, dict):
+        lines = lines.get("lines")
+    if not isinstance(lines, list) or not all(isinstance(line, dict) for line in lines):
+        return JsonResponse({"errors": [{"line": None, "error": "Expected a list of dispatch lines."}]}, status=400)
+
+    try:
+        dispatches = stock.record_dispatch_batch(store, lines, sold_by=request.user)
+    except stock.DispatchBatchError as exc:
+        return JsonResponse({"errors": exc.errors}, status=400)
+    except stock.InsufficientStock:
+        return JsonResponse({"errors": [{"line": None, "error": "Not enough stock available."}]}, status=409)
+
+    return JsonResponse({
+        "dispatches": [
+            {
+                "id": dispatch.pk,
+                "store_product": dispatch.store_product_id,
+                "quantity_sold": dispatch.quantity_sold,
+                "total_amount": str(dispatch.total_amount),
+            }
+            for dispatch in dispatches
+        ],
+        "total_amount": str(sum(dispatch.total_amount for dispatch in dispatches)),
+    }, status=201)
+
+@login_required
+@store_manager_required
 def dispatch_report(request):
-    # Get the store the current store manager manages
-    store = request.user.stores.first()
-    if not store:
+    # Get the selected store, or every store for the combined report
+    store, stores = selected_stores(request)
+    if not stores:
         return render(request, "store_management/dispatch_report.html", {
             "error": "You are not assigned to any store."
         })
 
-    # Retrieve all dispatches related to the store
-    dispatches = Dispatch.objects.filter(store_product__store=store)
-
     # Filter by date range if specified
     start_date = request.GET.get("start_date")
     end_date = request.GET.get("end_date")
-    if start_date and end_date:
-        dispatches = dispatches.filter(timestamp__date__range=[start_date, end_date])
+    report = DispatchReport(stores, parse_date(start_date), parse_date(end_date))
 
-    # Calculate totals
-    total_quantity = dispatches.aggregate(Sum("quantity_sold"))["quantity_sold__sum"] or 0
-    total_revenue = sum(d.total_amount for d in dispatches)
+    # Totals and breakdowns are aggregated by the database, the listing is
+    # read one keyset page at a time
+    dispatches, next_cursor = report.page(request.GET.get("cursor"))
 
     context = {
         "store": store,
         "dispatches": dispatches,
-        "total_quantity": total_quantity,
-        "total_revenue": total_revenue,
+        "next_cursor": next_cursor,
+        "totals": report.totals(),
+        "by_product": report.by_product(),
+        "by_store": report.by_store() if store is None else None,
+        "by_day": report.by_day(),
         "start_date": start_date,
         "end_date": end_date,
     }
-    return render(request, "store_management/dispatch_report.html", context)
\ No newline at end of file
+    return render(request, "store_management/dispatch_report.html", context)
+
+
+def _export_response(request, stores, label):
+    """Stream the dispatches matching the report filters as CSV or XLSX."""
+    export_format = request.GET.get("format", "csv")
+    if export_format not in EXPORT_FORMATS:
+        raise Http404("Unknown export format.")
+    stream, content_type, extension = EXPORT_FORMATS[export_format]
+
+    start_date = parse_date(request.GET.get("start_date"))
+    end_date = parse_date(request.GET.get("end_date"))
+    report = DispatchReport(stores, start_date, end_date)
+
+    name = "-".join(str(part) for part in ("dispatches", label, start_date, end_date) if part)
+    response = StreamingHttpResponse(stream(report.export_rows()), content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{name}.{extension}"'
+    return response
+
+@login_required
+@store_manager_required
+def export_dispatches(request):
+    store, stores = selected_stores(request)
+    if not stores:
+        raise Http404("You are not assigned to any store.")
+    return _export_response(request, stores, store.pk if store else "combined")
+
+@login_required
+@user_passes_test(is_admin)
+def export_all_dispatches(request):
+    return _export_response(request, None, "all")
+
+@login_required
+@user_passes_test(is_admin)
+def profiling_stats(request):
+    """Per-view percentiles from ProfilingMiddleware as JSON, slowest first."""
+    windows = request.GET.get("windows", "")
+    stats = profiling.collect(int(windows) if windows.isdigit() and int(windows) > 0 else None)
+    return JsonResponse({
+        "enabled": settings.PROFILING_ENABLED,
+        # False when each worker keeps its own stats (see PROFILING_CACHE)
+        "shared": profiling.is_shared(),
+        "window_seconds": profiling.get_window(),
+        "views": profiling.summarize(stats),
+    })
+
+@login_required
+@roles_required(lambda roles: roles.is_admin or roles.is_store_manager)
+def product_search(request):
+    """
+    Ranked prefix search over the catalog as JSON. Managers also get the
+    price and stock of each product in their selected store(s).
+    """
+    products = search_products(request.GET.get("q", ""), limit=SEARCH_LIMIT)
+
+    stock_by_product = {}
+    _, stores = selected_stores(request)
+    if products and stores:
+        for row in StoreProduct.objects.filter(
+            store__in=stores, product__in=[product.pk for product in products]
+        ).values("id", "product_id", "store_id", "price", "quantity"):
+            stock_by_product.setdefault(row["product_id"], []).append({
+                "store_product": row["id"],
+                "store": row["store_id"],
+                "price": str(row["price"]),
+                "quantity": row["quantity"],
+            })
+
+    return JsonResponse({
+        "results": [
+            {
+                "id": product.pk,
+                "name": product.name,
+                "category": product.category.name,
+                "stock": stock_by_product.get(product.pk, []),
+            }
+            for product in products
+        ],
+    })
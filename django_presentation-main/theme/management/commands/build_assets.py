@@ -0,0 +1,36 @@
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+STYLESHEET = 'css/dist/styles.css'
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the production stylesheet (Tailwind, purged of classes no template uses, and "
+        "minified) and collect every static file into STATIC_ROOT under fingerprinted names, "
+        "with gzip/brotli variants (see theme.storage)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--skip-css', action='store_true',
+            help="Keep the committed theme/static/css/dist/styles.css instead of rebuilding it.",
+        )
+
+    def handle(self, *args, **options):
+        if not options['skip_css']:
+            call_command('tailwind', 'build')
+        call_command('collectstatic', interactive=False, verbosity=options['verbosity'] - 1)
+
+        if not isinstance(staticfiles_storage, ManifestStaticFilesStorage):
+            self.stdout.write(self.style.WARNING(
+                "Static files were collected under their plain names: DEBUG is on."
+            ))
+            return
+        name = staticfiles_storage.stored_name(STYLESHEET)
+        sizes = [
+            f"{variant} {staticfiles_storage.size(variant):,} bytes"
+            for variant in (name, name + '.gz', name + '.br') if staticfiles_storage.exists(variant)
+        ]
+        self.stdout.write(self.style.SUCCESS(f"{STYLESHEET} -> " + ", ".join(sizes)))
@@ -0,0 +1,63 @@
+# theme/storage.py
+"""
+Static files storage for production: ManifestStaticFilesStorage (each
+file is copied under a content-hashed name, e.g. styles.4f1c9a.css, so
+it can be cached forever) that also writes precompressed ``.gz`` and,
+when the ``brotli`` package is installed, ``.br`` variants of every
+text asset next to it at collectstatic time. theme.views.serve_static
+and front-end servers (nginx ``gzip_static``/``brotli_static``) pick
+them up according to Accept-Encoding.
+"""
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always written
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.txt', '.html', '.json', '.map', '.xml')
+
+# Files smaller than this gain nothing once headers are counted
+MIN_COMPRESS_SIZE = 256
+
+
+def _gzip(content):
+    # mtime=0 keeps the output identical between builds
+    return gzip.compress(content, compresslevel=9, mtime=0)
+
+
+def _brotli(content):
+    return brotli.compress(content, quality=11)
+
+
+ENCODINGS = {'gzip': ('.gz', _gzip)}
+if brotli is not None:
+    ENCODINGS['br'] = ('.br', _brotli)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for original, name in self.hashed_files.items():
+            yield from self.compress(original, name)
+
+    def compress(self, original, name):
+        """Write the compressed variants of ``name`` that are smaller than it."""
+        if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+            return
+        with self.open(name) as source:
+            content = source.read()
+        if len(content) < MIN_COMPRESS_SIZE:
+            return
+        for suffix, compress in ENCODINGS.values():
+            compressed = compress(content)
+            if len(compressed) < len(content):
+                if self.exists(name + suffix):
+                    self.delete(name + suffix)
+                self._save(name + suffix, ContentFile(compressed))
+                yield original, name + suffix, True
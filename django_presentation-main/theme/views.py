@@ -0,0 +1,63 @@
+# theme/views.py
+import mimetypes
+import posixpath
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import require_safe
+
+from theme.storage import ENCODINGS
+
+# A fingerprinted name changes with its content, so it can be cached for good
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+# ManifestStaticFilesStorage names: styles.4f1c9a0be2d3.css
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}(\.[^./]+)?$')
+
+
+def get_unhashed_max_age():
+    return getattr(settings, 'STATIC_UNHASHED_MAX_AGE', 300)
+
+
+def _accepted_encodings(request):
+    accepted = request.headers.get('Accept-Encoding', '')
+    return {part.split(';')[0].strip() for part in accepted.split(',')}
+
+
+@require_safe
+def serve_static(request, path):
+    """
+    Serve a collected file from STATIC_ROOT, for deployments without a
+    front-end server (e.g. the store terminals). Fingerprinted names get
+    far-future, immutable caching; the precompressed variant written by
+    CompressedManifestStaticFilesStorage is sent when the client accepts it.
+    """
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        full_path = Path(safe_join(settings.STATIC_ROOT, path))
+    except ValueError:  # outside STATIC_ROOT
+        raise Http404(path)
+    if not full_path.is_file():
+        raise Http404(path)
+
+    content_type, _ = mimetypes.guess_type(path)
+    encoding = None
+    accepted = _accepted_encodings(request)
+    for name, (suffix, _) in sorted(ENCODINGS.items(), reverse=True):  # br before gzip
+        if name in accepted and full_path.with_name(full_path.name + suffix).is_file():
+            full_path, encoding = full_path.with_name(full_path.name + suffix), name
+            break
+
+    response = FileResponse(full_path.open('rb'), content_type=content_type or 'application/octet-stream')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    patch_vary_headers(response, ['Accept-Encoding'])
+    if HASHED_NAME.search(path):
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=get_unhashed_max_age())
+    return response